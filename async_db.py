@@ -0,0 +1,87 @@
+# async_db.py
+"""
+Async access to SQLite for handlers.
+Queries run on a dedicated DB thread pool (pooled connections from
+database.py), so the python-telegram-bot event loop never blocks on disk I/O.
+
+    row = await async_db.fetch_one("SELECT ... WHERE id = ?", (id,))
+    rows = await async_db.fetch_all("SELECT ...")
+    changed = await async_db.execute("UPDATE ...", (...))   # rowcount
+    new_id = await async_db.insert("INSERT ...", (...))     # lastrowid
+    result = await async_db.transaction(lambda conn: ...)   # several statements, one commit
+    result = await async_db.run(blocking_helper, arg)        # any existing sync DB helper
+"""
+
+import asyncio
+import functools
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional
+
+import config
+from database import db_session
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=config.DB_THREADS, thread_name_prefix="db")
+
+
+async def run(fn: Callable, *args, **kwargs) -> Any:
+    """Run a blocking function on the DB thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+def _fetch_one(sql: str, params: Iterable) -> Optional[sqlite3.Row]:
+    with db_session() as conn:
+        return conn.execute(sql, tuple(params)).fetchone()
+
+
+def _fetch_all(sql: str, params: Iterable) -> List[sqlite3.Row]:
+    with db_session() as conn:
+        return conn.execute(sql, tuple(params)).fetchall()
+
+
+def _execute(sql: str, params: Iterable) -> int:
+    with db_session() as conn:
+        return conn.execute(sql, tuple(params)).rowcount
+
+
+def _insert(sql: str, params: Iterable) -> Optional[int]:
+    # lastrowid is per connection: only meaningful right after an INSERT
+    with db_session() as conn:
+        return conn.execute(sql, tuple(params)).lastrowid
+
+
+def _transaction(fn: Callable[[sqlite3.Connection], Any]) -> Any:
+    with db_session() as conn:
+        return fn(conn)
+
+
+async def fetch_one(sql: str, params: Iterable = ()) -> Optional[sqlite3.Row]:
+    return await run(_fetch_one, sql, params)
+
+
+async def fetch_all(sql: str, params: Iterable = ()) -> List[sqlite3.Row]:
+    return await run(_fetch_all, sql, params)
+
+
+async def execute(sql: str, params: Iterable = ()) -> int:
+    """Run one write statement and commit. Returns the number of rows changed."""
+    return await run(_execute, sql, params)
+
+
+async def insert(sql: str, params: Iterable = ()) -> Optional[int]:
+    """Run one INSERT and commit. Returns the new row's rowid."""
+    return await run(_insert, sql, params)
+
+
+async def transaction(fn: Callable[[sqlite3.Connection], Any]) -> Any:
+    """Run fn(conn) in one transaction: committed on return, rolled back on error."""
+    return await run(_transaction, fn)
+
+
+def shutdown():
+    """Wait for queued queries and stop the DB threads (on shutdown)."""
+    _executor.shutdown(wait=True)
@@ -0,0 +1,194 @@
+# browser_pool.py
+"""
+Long-lived Playwright Chromium pool for HTML -> PNG rendering.
+One browser is launched at startup and N warm pages (each in its own
+context) are leased per render instead of launching Chromium every time.
+Configurable via config.py:
+  BROWSER_POOL_SIZE        — number of warm pages (default: 2)
+  BROWSER_POOL_MAX_RENDERS — recycle a page after this many renders (default: 100)
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Optional, Set
+
+from playwright.async_api import async_playwright
+
+import config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VIEWPORT = {"width": 1280, "height": 720}
+
+CHROME_FALLBACK_PATHS = (
+    "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe",
+    "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe",
+)
+
+
+async def _launch_browser(playwright):
+    """Launch bundled Chromium, falling back to an installed Chrome."""
+    try:
+        return await playwright.chromium.launch()
+    except Exception:
+        logger.warning("Gagal lancar Chromium Playwright. Cuba guna Chrome sedia ada.")
+
+    for chrome_path in CHROME_FALLBACK_PATHS:
+        if os.path.exists(chrome_path):
+            browser = await playwright.chromium.launch(
+                channel="chrome",
+                executable_path=chrome_path
+            )
+            logger.info(f"Berjaya lancar Chrome dari: {chrome_path}")
+            return browser
+
+    raise RuntimeError(
+        "GAGAL LANCAR SEMUA BROWSER. Sila jalankan 'playwright install' di terminal anda."
+    )
+
+
+class _PooledPage:
+    """A warm page plus its isolated context and render counter."""
+
+    def __init__(self, context=None, page=None):
+        self.context = context
+        self.page = page
+        self.renders = 0
+        self.broken = page is None
+
+
+class BrowserPool:
+    """Fixed-size pool of warm Chromium pages sharing one browser process."""
+
+    def __init__(self, size: int, max_renders: int):
+        self._size = max(1, size)
+        self._max_renders = max(1, max_renders)
+        self._playwright = None
+        self._browser = None
+        self._idle: Optional[asyncio.Queue] = None
+        # Every open slot, idle or leased, so stop() can close leased pages too
+        self._slots: Set[_PooledPage] = set()
+        self._lock = asyncio.Lock()
+        self._started = False
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    async def start(self):
+        """Launch the browser and pre-warm the pages. Safe to call twice."""
+        async with self._lock:
+            if self._started:
+                return
+            self._playwright = await async_playwright().start()
+            try:
+                self._browser = await _launch_browser(self._playwright)
+            except Exception:
+                await self._playwright.stop()
+                self._playwright = None
+                raise
+
+            self._idle = asyncio.Queue()
+            for _ in range(self._size):
+                self._idle.put_nowait(await self._new_slot())
+            self._started = True
+            logger.info(f"[BrowserPool] Started with {self._size} warm page(s).")
+
+    async def stop(self):
+        """Close every page, the browser and Playwright."""
+        async with self._lock:
+            if not self._started:
+                return
+            self._started = False
+            for slot in list(self._slots):
+                await self._close_slot(slot)
+            self._idle = None
+            try:
+                if self._browser:
+                    await self._browser.close()
+            except Exception as e:
+                logger.warning(f"[BrowserPool] Browser close failed: {e}")
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.warning(f"[BrowserPool] Playwright stop failed: {e}")
+            self._browser = None
+            self._playwright = None
+            logger.info("[BrowserPool] Stopped.")
+
+    @asynccontextmanager
+    async def page(self, viewport: Optional[dict] = None):
+        """
+        Lease a warm page for one render.
+        The page is health-checked before use and recycled after
+        BROWSER_POOL_MAX_RENDERS renders or on any error.
+        """
+        if not self._started:
+            await self.start()
+
+        idle = self._idle
+        slot = await idle.get()
+        try:
+            if not self._is_healthy(slot):
+                slot = await self._replace(slot)
+            await slot.page.set_viewport_size(viewport or DEFAULT_VIEWPORT)
+            yield slot.page
+            slot.renders += 1
+        except BaseException:
+            slot.broken = True
+            raise
+        finally:
+            if idle is not self._idle:
+                # Pool stopped (or restarted) while this page was leased
+                await self._close_slot(slot)
+            else:
+                if slot.broken or slot.renders >= self._max_renders:
+                    try:
+                        slot = await self._replace(slot)
+                    except Exception as e:
+                        logger.error(f"[BrowserPool] Failed to recycle page: {e}")
+                        slot = _PooledPage()
+                idle.put_nowait(slot)
+
+    def _is_healthy(self, slot: _PooledPage) -> bool:
+        return (
+            not slot.broken
+            and slot.page is not None
+            and not slot.page.is_closed()
+            and self._browser is not None
+            and self._browser.is_connected()
+        )
+
+    async def _new_slot(self) -> _PooledPage:
+        context = await self._browser.new_context()
+        try:
+            page = await context.new_page()
+        except Exception:
+            await context.close()
+            raise
+        slot = _PooledPage(context, page)
+        self._slots.add(slot)
+        return slot
+
+    async def _close_slot(self, slot: _PooledPage):
+        self._slots.discard(slot)
+        if slot.context is None:
+            return
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+
+    async def _replace(self, slot: _PooledPage) -> _PooledPage:
+        """Close a used/broken page and open a fresh one, relaunching Chromium if it died."""
+        await self._close_slot(slot)
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                logger.warning("[BrowserPool] Browser disconnected, relaunching.")
+                self._browser = await _launch_browser(self._playwright)
+        return await self._new_slot()
+
+
+browser_pool = BrowserPool(config.BROWSER_POOL_SIZE, config.BROWSER_POOL_MAX_RENDERS)
@@ -0,0 +1,216 @@
+# card_cache.py
+"""
+Content-addressed cache for rendered search result cards.
+Cards are keyed by a hash of (template name, rendered data), so an unchanged
+profile/report is never rendered twice. PNG bytes live on disk under
+CARD_CACHE_DIR (LRU eviction once CARD_CACHE_MAX_MB is exceeded); the index and
+the Telegram file_id of the uploaded photo live in SQLite so repeat views can
+skip both rendering and upload.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+import config
+from database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def init_card_cache_table():
+    """Create card_cache table and cache directory if not exists"""
+    os.makedirs(config.CARD_CACHE_DIR, exist_ok=True)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS card_cache (
+            cache_key TEXT PRIMARY KEY,
+            template TEXT NOT NULL,
+            entity_key TEXT,
+            file_path TEXT,
+            size_bytes INTEGER DEFAULT 0,
+            telegram_file_id TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_used_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_card_cache_entity ON card_cache(entity_key)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_card_cache_last_used ON card_cache(last_used_at)")
+
+    conn.commit()
+    conn.close()
+
+
+def card_cache_key(template_file: str, data: dict) -> str:
+    """Stable hash of the template name and the data rendered into it."""
+    payload = json.dumps(
+        {"template": template_file, "data": data},
+        sort_keys=True, default=str, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def card_entity_key(result_type: str, data: dict) -> str:
+    """Entity a card belongs to, used for invalidation ('profile:<id>' / 'report:<id>')."""
+    if result_type == "profile":
+        return f"profile:{data.get('profile_id')}"
+    return f"report:{data.get('report_id')}"
+
+
+def _remove_file(file_path: Optional[str]):
+    if not file_path:
+        return
+    try:
+        os.unlink(file_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"[CardCache] Failed to remove {file_path}: {e}")
+
+
+def get_cached_card(cache_key: str) -> Optional[dict]:
+    """
+    Return {'file_id': str|None, 'png': bytes|None} for a cached card, or None.
+    Marks the entry as recently used.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT file_path, telegram_file_id FROM card_cache WHERE cache_key = ?",
+            (cache_key,)
+        )
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        cursor.execute(
+            "UPDATE card_cache SET last_used_at = CURRENT_TIMESTAMP WHERE cache_key = ?",
+            (cache_key,)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    png = None
+    if row['file_path'] and not row['telegram_file_id']:
+        try:
+            with open(row['file_path'], "rb") as f:
+                png = f.read()
+        except OSError:
+            png = None
+
+    if not png and not row['telegram_file_id']:
+        return None
+
+    return {'file_id': row['telegram_file_id'], 'png': png}
+
+
+def save_card_png(cache_key: str, template_file: str, entity_key: str, png: bytes):
+    """Write rendered PNG to disk and index it, then evict least-recently used cards."""
+    file_path = os.path.join(config.CARD_CACHE_DIR, f"{cache_key}.png")
+    try:
+        os.makedirs(config.CARD_CACHE_DIR, exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(png)
+    except OSError as e:
+        logger.warning(f"[CardCache] Failed to write card: {e}")
+        return
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO card_cache (cache_key, template, entity_key, file_path, size_bytes)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(cache_key) DO UPDATE SET
+                file_path = excluded.file_path,
+                size_bytes = excluded.size_bytes,
+                last_used_at = CURRENT_TIMESTAMP
+        """, (cache_key, template_file, entity_key, file_path, len(png)))
+        _evict_lru(cursor)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _evict_lru(cursor):
+    """Drop PNGs of least-recently used cards until total size fits CARD_CACHE_MAX_MB."""
+    max_bytes = config.CARD_CACHE_MAX_MB * 1024 * 1024
+    cursor.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM card_cache")
+    total = cursor.fetchone()[0]
+    if total <= max_bytes:
+        return
+
+    cursor.execute("""
+        SELECT cache_key, file_path, size_bytes, telegram_file_id
+        FROM card_cache
+        WHERE size_bytes > 0
+        ORDER BY last_used_at ASC
+    """)
+    for row in cursor.fetchall():
+        if total <= max_bytes:
+            break
+        _remove_file(row['file_path'])
+        total -= row['size_bytes']
+        if row['telegram_file_id']:
+            # file_id alone is still enough to resend the card
+            cursor.execute(
+                "UPDATE card_cache SET file_path = NULL, size_bytes = 0 WHERE cache_key = ?",
+                (row['cache_key'],)
+            )
+        else:
+            cursor.execute("DELETE FROM card_cache WHERE cache_key = ?", (row['cache_key'],))
+
+
+def save_card_file_id(cache_key: str, file_id: str):
+    """Remember the Telegram file_id returned after uploading a card."""
+    if not file_id:
+        return
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            "UPDATE card_cache SET telegram_file_id = ? WHERE cache_key = ?",
+            (file_id, cache_key)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def forget_card_file_id(cache_key: str):
+    """Drop a file_id Telegram refused so the card is re-uploaded next time."""
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            "UPDATE card_cache SET telegram_file_id = NULL WHERE cache_key = ?",
+            (cache_key,)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def invalidate_cards(entity_key: str):
+    """Remove every cached card of a profile/report (e.g. after aggregation)."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT file_path FROM card_cache WHERE entity_key = ?", (entity_key,))
+        for row in cursor.fetchall():
+            _remove_file(row['file_path'])
+        cursor.execute("DELETE FROM card_cache WHERE entity_key = ?", (entity_key,))
+        conn.commit()
+        if cursor.rowcount:
+            logger.info(f"[CardCache] Invalidated {cursor.rowcount} card(s) for {entity_key}")
+    finally:
+        conn.close()
+
+
+# Initialize table on import
+init_card_cache_table()
@@ -34,12 +34,130 @@ DEMO_SOCIAL_TRACKER_FOUND = os.environ.get('DEMO_SOCIAL_TRACKER_FOUND', 'true').
 RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
 RATE_LIMIT_MAX = int(os.environ.get('RATE_LIMIT_MAX', '2'))
 RATE_LIMIT_WINDOW_HOURS = int(os.environ.get('RATE_LIMIT_WINDOW_HOURS', '5'))
+# 'sqlite' (persistent, shared between processes) or 'memory' (per-process)
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'sqlite').lower()
+
+# === SQLite ===
+# Pooled connections kept open + per-connection page cache / mmap / lock wait
+DB_POOL_MAX_IDLE = int(os.environ.get('DB_POOL_MAX_IDLE', '8'))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', '16384'))
+SQLITE_MMAP_SIZE_MB = int(os.environ.get('SQLITE_MMAP_SIZE_MB', '64'))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+# Worker threads that run handler queries off the event loop (async_db)
+DB_THREADS = int(os.environ.get('DB_THREADS', '4'))
+
+# === Statistics ===
+# How often stats_counters is recomputed from scratch (drift fix + active users)
+STATS_RECONCILE_INTERVAL_SECONDS = int(os.environ.get('STATS_RECONCILE_INTERVAL_SECONDS', '1800'))
+# Rendered statistics image: max age, background re-render interval, and an
+# optional chat (e.g. private log channel) to pre-upload it to for a file_id
+STATS_IMAGE_TTL_SECONDS = int(os.environ.get('STATS_IMAGE_TTL_SECONDS', '900'))
+STATS_IMAGE_REFRESH_SECONDS = int(os.environ.get('STATS_IMAGE_REFRESH_SECONDS', '300'))
+STATS_IMAGE_UPLOAD_CHAT_ID = os.environ.get('STATS_IMAGE_UPLOAD_CHAT_ID', '')
+
+# === Search Sources ===
+# Per-source timeout + total deadline for the search reply (seconds).
+# Sources still running at the deadline show as "pending" and finish in the background.
+# Keep each per-source timeout at or below the total deadline, or it never applies.
+SEMAKMULE_TIMEOUT_SECONDS = float(os.environ.get('SEMAKMULE_TIMEOUT_SECONDS', '6'))
+TRUECALLER_TIMEOUT_SECONDS = float(os.environ.get('TRUECALLER_TIMEOUT_SECONDS', '7'))
+SOCIAL_TRACKER_TIMEOUT_SECONDS = float(os.environ.get('SOCIAL_TRACKER_TIMEOUT_SECONDS', '7'))
+SEARCH_TOTAL_DEADLINE_SECONDS = float(os.environ.get('SEARCH_TOTAL_DEADLINE_SECONDS', '8'))
+
+# === Truecaller Live API ===
+# Without a sessions file the dummy/demo Truecaller API is used.
+# Sessions file: {"sessions": [{"name": "acc1", "token": "<installation id>"}]}
+TRUECALLER_SESSIONS_FILE = os.environ.get('TRUECALLER_SESSIONS_FILE', '')
+TRUECALLER_API_URL = os.environ.get('TRUECALLER_API_URL', 'https://search5-noneu.truecaller.com/v2/search')
+TRUECALLER_REQUEST_TIMEOUT_SECONDS = float(os.environ.get('TRUECALLER_REQUEST_TIMEOUT_SECONDS', '5'))
+# Sessions tried per lookup before giving up
+TRUECALLER_MAX_ATTEMPTS = int(os.environ.get('TRUECALLER_MAX_ATTEMPTS', '2'))
+# Eject a session after N consecutive failures; backoff doubles per ejection up to the max
+TRUECALLER_SESSION_MAX_FAILS = int(os.environ.get('TRUECALLER_SESSION_MAX_FAILS', '3'))
+TRUECALLER_SESSION_BACKOFF_SECONDS = int(os.environ.get('TRUECALLER_SESSION_BACKOFF_SECONDS', '60'))
+TRUECALLER_SESSION_BACKOFF_MAX_SECONDS = int(os.environ.get('TRUECALLER_SESSION_BACKOFF_MAX_SECONDS', '3600'))
+# Circuit breaker: open after N failed lookups in a row, answer "cooldown" for this long
+TRUECALLER_BREAKER_THRESHOLD = int(os.environ.get('TRUECALLER_BREAKER_THRESHOLD', '5'))
+TRUECALLER_BREAKER_COOLDOWN_SECONDS = int(os.environ.get('TRUECALLER_BREAKER_COOLDOWN_SECONDS', '120'))
+
+# === Truecaller Cache ===
+# Found numbers / "no_data" numbers are reused for their own TTL; after that the
+# row is still served for the stale-while-revalidate window while a background
+# lookup refreshes it (0 = disabled). Rows past TTL + window are purged.
+TRUECALLER_CACHE_TTL_SECONDS = int(os.environ.get('TRUECALLER_CACHE_TTL_SECONDS', str(30 * 86400)))
+TRUECALLER_NEGATIVE_TTL_SECONDS = int(os.environ.get('TRUECALLER_NEGATIVE_TTL_SECONDS', str(86400)))
+TRUECALLER_STALE_WHILE_REVALIDATE_SECONDS = int(os.environ.get('TRUECALLER_STALE_WHILE_REVALIDATE_SECONDS', str(7 * 86400)))
+# In-process LRU in front of the SQLite cache (entries, seconds; size 0 = off)
+TRUECALLER_MEMORY_CACHE_SIZE = int(os.environ.get('TRUECALLER_MEMORY_CACHE_SIZE', '2048'))
+TRUECALLER_MEMORY_CACHE_TTL_SECONDS = int(os.environ.get('TRUECALLER_MEMORY_CACHE_TTL_SECONDS', '600'))
+
+# === SemakMule Live API ===
+# Without a URL the dummy/demo SemakMule API is used
+SEMAKMULE_API_URL = os.environ.get('SEMAKMULE_API_URL', '')
+SEMAKMULE_REQUEST_TIMEOUT_SECONDS = float(os.environ.get('SEMAKMULE_REQUEST_TIMEOUT_SECONDS', '4'))
+# Whole lookup incl. retries must finish within this
+SEMAKMULE_DEADLINE_SECONDS = float(os.environ.get('SEMAKMULE_DEADLINE_SECONDS', '5'))
+SEMAKMULE_MAX_RETRIES = int(os.environ.get('SEMAKMULE_MAX_RETRIES', '2'))
+SEMAKMULE_RETRY_BACKOFF_SECONDS = float(os.environ.get('SEMAKMULE_RETRY_BACKOFF_SECONDS', '0.5'))
+# Max concurrent requests (and pooled connections) to SemakMule
+SEMAKMULE_MAX_CONCURRENCY = int(os.environ.get('SEMAKMULE_MAX_CONCURRENCY', '4'))
+
+# === SemakMule Cache ===
+# Police report counts change slowly: reuse a result for this long (seconds)
+SEMAKMULE_CACHE_TTL_SECONDS = int(os.environ.get('SEMAKMULE_CACHE_TTL_SECONDS', str(6 * 3600)))
+# In-process LRU in front of the SQLite cache (entries, seconds; size 0 = off)
+SEMAKMULE_MEMORY_CACHE_SIZE = int(os.environ.get('SEMAKMULE_MEMORY_CACHE_SIZE', '1024'))
+SEMAKMULE_MEMORY_CACHE_TTL_SECONDS = int(os.environ.get('SEMAKMULE_MEMORY_CACHE_TTL_SECONDS', '300'))
+
+# === Upstream Quota ===
+# Global token bucket per upstream (all users together); 0 = unlimited.
+TRUECALLER_QUOTA_PER_HOUR = float(os.environ.get('TRUECALLER_QUOTA_PER_HOUR', '120'))
+TRUECALLER_QUOTA_BURST = int(os.environ.get('TRUECALLER_QUOTA_BURST', '10'))
+SEMAKMULE_QUOTA_PER_HOUR = float(os.environ.get('SEMAKMULE_QUOTA_PER_HOUR', '600'))
+SEMAKMULE_QUOTA_BURST = int(os.environ.get('SEMAKMULE_QUOTA_BURST', '30'))
+# Last N tokens of each bucket are for admins only
+QUOTA_ADMIN_RESERVE = int(os.environ.get('QUOTA_ADMIN_RESERVE', '2'))
+# How long a search waits in line for a token (keep below the source timeouts)
+QUOTA_WAIT_SECONDS = float(os.environ.get('QUOTA_WAIT_SECONDS', '3'))
+
+# === Social Profile Re-verification ===
+# Every tracked account is re-checked once per period; the job runs every
+# interval and takes just that run's share (capped per platform).
+SOCIAL_RECHECK_PERIOD_HOURS = int(os.environ.get('SOCIAL_RECHECK_PERIOD_HOURS', '24'))
+SOCIAL_RECHECK_INTERVAL_SECONDS = int(os.environ.get('SOCIAL_RECHECK_INTERVAL_SECONDS', '600'))
+SOCIAL_RECHECK_MAX_BATCH = int(os.environ.get('SOCIAL_RECHECK_MAX_BATCH', '20'))
+# Gap between lookups on the same platform
+SOCIAL_RECHECK_DELAY_SECONDS = float(os.environ.get('SOCIAL_RECHECK_DELAY_SECONDS', '5'))
+
+# === QR Decoding ===
+# Worker processes for QR search decoding + per-image limits
+QR_DECODE_WORKERS = int(os.environ.get('QR_DECODE_WORKERS', '2'))
+QR_DECODE_MAX_DIMENSION = int(os.environ.get('QR_DECODE_MAX_DIMENSION', '1600'))
+QR_DECODE_TIMEOUT_SECONDS = float(os.environ.get('QR_DECODE_TIMEOUT_SECONDS', '10'))
+# Run the search straight away on the decoded identifier + holder name
+QR_AUTO_SEARCH = os.environ.get('QR_AUTO_SEARCH', 'true').lower() == 'true'
+
+# === QR Decode Cache ===
+# Decoded QR photos keyed by Telegram file_unique_id
+QR_CACHE_TTL_SECONDS = int(os.environ.get('QR_CACHE_TTL_SECONDS', str(30 * 86400)))
+QR_CACHE_MEMORY_SIZE = int(os.environ.get('QR_CACHE_MEMORY_SIZE', '512'))
+QR_CACHE_MEMORY_TTL_SECONDS = int(os.environ.get('QR_CACHE_MEMORY_TTL_SECONDS', '3600'))
 
 # === Templates ===
 TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'templates')
 VERIFIED_CARD_TEMPLATE = "card_verified.html"
 UNVERIFIED_CARD_TEMPLATE = "card_unverified.html"
 
+# === Browser Pool (image rendering) ===
+# Warm Chromium pages kept open + renders per page before it is recycled
+BROWSER_POOL_SIZE = int(os.environ.get('BROWSER_POOL_SIZE', '2'))
+BROWSER_POOL_MAX_RENDERS = int(os.environ.get('BROWSER_POOL_MAX_RENDERS', '100'))
+
+# === Card Cache ===
+# Rendered search cards (PNG on disk + Telegram file_id), LRU-evicted past max size
+CARD_CACHE_DIR = os.environ.get('CARD_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'card_cache'))
+CARD_CACHE_MAX_MB = int(os.environ.get('CARD_CACHE_MAX_MB', '200'))
+
 
 # === ConversationHandler States ===
 # Report flow
@@ -1,7 +1,13 @@
 # database.py
 import sqlite3
 import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+import config
 from config import DB_NAME # Import dari config
+from social_tracker import PLATFORM_KEY_ALIASES
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +21,8 @@ def setup_database():
         conn = sqlite3.connect(DB_NAME)
         cursor = conn.cursor()
         cursor.execute("PRAGMA foreign_keys = ON;")
+        # WAL: admin writes tak block pembaca (setting kekal dalam fail DB)
+        cursor.execute("PRAGMA journal_mode = WAL;")
         
         # Guna 'executescript' untuk run berbilang arahan
         sql_schema = """
@@ -132,6 +140,7 @@ def migrate_social_media_columns():
         ("profile_social_media", "last_checked_at", "DATETIME"),
         ("profile_social_media", "sec_uid", "TEXT"),
         ("profile_social_media", "hidden", "INTEGER DEFAULT 0"),
+        ("profile_social_media", "platform_key", "TEXT"),
     ]
     for table, column, col_type in migrations:
         try:
@@ -139,8 +148,51 @@ def migrate_social_media_columns():
             logger.info(f"Added column {column} to {table}")
         except sqlite3.OperationalError:
             pass
+    # platform_key: LOWER(platform_name), Threads = Instagram (same account ID).
+    # Kekal sama dengan social_tracker.platform_key().
+    platform_key_sql = f"""
+        CASE LOWER(TRIM(NEW.platform_name))
+            {" ".join(f"WHEN '{alias}' THEN '{key}'" for alias, key in PLATFORM_KEY_ALIASES.items())}
+            ELSE LOWER(TRIM(NEW.platform_name))
+        END
+    """
     try:
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_social_platform_user_id ON profile_social_media(platform_user_id)")
+        cursor.executescript(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_social_platform_key_insert
+            AFTER INSERT ON profile_social_media
+            BEGIN
+                UPDATE profile_social_media SET platform_key = {platform_key_sql}
+                WHERE social_id = NEW.social_id;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_social_platform_key_update
+            AFTER UPDATE OF platform_name ON profile_social_media
+            BEGIN
+                UPDATE profile_social_media SET platform_key = {platform_key_sql}
+                WHERE social_id = NEW.social_id;
+            END;
+        """)
+        cursor.execute(f"""
+            UPDATE profile_social_media SET platform_key = {platform_key_sql.replace('NEW.', '')}
+            WHERE platform_key IS NULL AND platform_name IS NOT NULL
+        """)
+        if cursor.rowcount > 0:
+            logger.info(f"profile_social_media: platform_key diisi untuk {cursor.rowcount} baris.")
+        # Composite (platform_user_id, platform_key) ganti index lama platform_user_id sahaja
+        cursor.execute("DROP INDEX IF EXISTS idx_social_platform_user_id")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_social_platform_user_key "
+            "ON profile_social_media(platform_user_id, platform_key)"
+        )
+    except sqlite3.OperationalError as e:
+        logger.error(f"Ralat semasa migrate platform_key: {e}")
+    try:
+        # Background re-verification: per platform_key, oldest last_checked_at first
+        cursor.execute("DROP INDEX IF EXISTS idx_social_last_checked")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_social_recheck "
+            "ON profile_social_media(platform_key, last_checked_at)"
+        )
     except sqlite3.OperationalError:
         pass
     conn.commit()
@@ -168,9 +220,243 @@ def migrate_reports_columns():
     conn.close()
 
 
-def get_db_connection() -> sqlite3.Connection:
-    """Helper function untuk dapatkan connection DB (dengan row_factory)."""
+def migrate_report_identifiers():
+    """
+    Create report_identifiers (one row per phone/bank/social of a report)
+    and backfill it from reports that have no rows yet.
+    """
+    from identifiers import sync_report_identifiers
+
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS report_identifiers (
+            identifier_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            report_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            canonical_value TEXT NOT NULL,
+            raw_value TEXT,
+            is_primary INTEGER DEFAULT 0,
+            FOREIGN KEY (report_id) REFERENCES reports(report_id) ON DELETE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS idx_report_identifiers_value ON report_identifiers(kind, canonical_value);
+        CREATE INDEX IF NOT EXISTS idx_report_identifiers_report ON report_identifiers(report_id, kind);
+        CREATE INDEX IF NOT EXISTS idx_reports_linked_profile ON reports(linked_profile_id);
+    """)
+
+    cursor.execute("""
+        SELECT report_id FROM reports r
+        WHERE NOT EXISTS (SELECT 1 FROM report_identifiers ri WHERE ri.report_id = r.report_id)
+    """)
+    pending = [row[0] for row in cursor.fetchall()]
+    for report_id in pending:
+        sync_report_identifiers(cursor, report_id)
+    conn.commit()
+    conn.close()
+    if pending:
+        logger.info(f"report_identifiers: {len(pending)} laporan diproses (backfill).")
+
+
+def migrate_profile_search_indexes():
+    """
+    Covering indexes for the LIKE profile search (_find_matching_profiles_like):
+    a '%term%' match can't seek, but scanning these narrow indexes beats
+    scanning the full rows, and the UNION branches never touch the tables.
+    """
     conn = sqlite3.connect(DB_NAME)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    conn.row_factory = sqlite3.Row 
-    return conn
\ No newline at end of file
+    conn.executescript("""
+        CREATE INDEX IF NOT EXISTS idx_profiles_search
+            ON profiles(main_identifier, unconfirmed_names, profile_id);
+        CREATE INDEX IF NOT EXISTS idx_bank_accounts_search
+            ON profile_bank_accounts(account_number, holder_name, profile_id);
+    """)
+    conn.commit()
+    conn.close()
+
+
+def migrate_username_history():
+    """
+    Create social_username_history (one row per handle an account has used;
+    seen_to NULL = current handle). Triggers on profile_social_media keep it
+    in sync with extracted_username. Existing rows are backfilled once from
+    extracted_username + the old username_history JSON.
+    """
+    import json
+
+    conn = sqlite3.connect(DB_NAME)
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'social_username_history'")
+    needs_backfill = cursor.fetchone() is None
+
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS social_username_history (
+            history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            social_id INTEGER NOT NULL,
+            username TEXT NOT NULL,
+            seen_from DATETIME,
+            seen_to DATETIME,
+            FOREIGN KEY (social_id) REFERENCES profile_social_media(social_id) ON DELETE CASCADE
+        );
+        CREATE INDEX IF NOT EXISTS idx_username_history_username ON social_username_history(LOWER(username));
+        CREATE INDEX IF NOT EXISTS idx_username_history_social ON social_username_history(social_id, seen_to);
+
+        CREATE TRIGGER IF NOT EXISTS trg_username_history_insert
+        AFTER INSERT ON profile_social_media
+        WHEN COALESCE(NEW.extracted_username, '') != ''
+        BEGIN
+            INSERT INTO social_username_history (social_id, username, seen_from)
+            VALUES (NEW.social_id, NEW.extracted_username, CURRENT_TIMESTAMP);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_username_history_update
+        AFTER UPDATE OF extracted_username ON profile_social_media
+        WHEN COALESCE(NEW.extracted_username, '') != ''
+         AND LOWER(COALESCE(OLD.extracted_username, '')) != LOWER(NEW.extracted_username)
+        BEGIN
+            UPDATE social_username_history SET seen_to = CURRENT_TIMESTAMP
+            WHERE social_id = NEW.social_id AND seen_to IS NULL;
+            INSERT INTO social_username_history (social_id, username, seen_from)
+            VALUES (NEW.social_id, NEW.extracted_username, CURRENT_TIMESTAMP);
+        END;
+    """)
+
+    backfilled = 0
+    if needs_backfill:
+        cursor.execute("""
+            SELECT social_id, extracted_username, username_history FROM profile_social_media
+            WHERE COALESCE(extracted_username, '') != '' OR COALESCE(username_history, '') != ''
+        """)
+        for social_id, current, history_json in cursor.fetchall():
+            try:
+                history = json.loads(history_json) if history_json else []
+            except ValueError:
+                history = []
+            seen_from = None
+            for entry in history if isinstance(history, list) else []:
+                if isinstance(entry, dict):
+                    username, changed_at = entry.get('username'), entry.get('changed_at')
+                else:
+                    username, changed_at = entry, None
+                if not username:
+                    continue
+                cursor.execute("""
+                    INSERT INTO social_username_history (social_id, username, seen_from, seen_to)
+                    VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                """, (social_id, str(username).lstrip('@'), seen_from, changed_at))
+                seen_from = changed_at
+            if current:
+                cursor.execute("""
+                    INSERT INTO social_username_history (social_id, username, seen_from)
+                    VALUES (?, ?, ?)
+                """, (social_id, current, seen_from))
+            backfilled += 1
+
+    conn.commit()
+    conn.close()
+    if backfilled:
+        logger.info(f"social_username_history: {backfilled} akaun sosial diproses (backfill).")
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that goes back to the pool on close() instead of
+    being torn down. Uncommitted work is rolled back first, same as a real
+    close().
+    """
+
+    def close(self):
+        _pool.release(self)
+
+    def close_for_real(self):
+        super().close()
+
+
+class ConnectionPool:
+    """Small pool of pre-configured SQLite connections (WAL + tuned pragmas)."""
+
+    def __init__(self, db_name: str, max_idle: int):
+        self._db_name = db_name
+        self._max_idle = max(0, max_idle)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._wal_checked = False
+
+    def _connect(self) -> PooledConnection:
+        # check_same_thread=False: a connection is only used by one caller at a
+        # time, but callers may run in asyncio.to_thread() workers.
+        conn = sqlite3.connect(self._db_name, factory=PooledConnection, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+        conn.execute(f"PRAGMA cache_size = -{int(config.SQLITE_CACHE_SIZE_KB)};")
+        conn.execute(f"PRAGMA mmap_size = {int(config.SQLITE_MMAP_SIZE_MB) * 1024 * 1024};")
+        conn.execute(f"PRAGMA busy_timeout = {int(config.SQLITE_BUSY_TIMEOUT_MS)};")
+        if not self._wal_checked:
+            conn.execute("PRAGMA journal_mode = WAL;")
+            self._wal_checked = True
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn: PooledConnection):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            conn.close_for_real()
+            return
+        with self._lock:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(conn)
+                return
+        conn.close_for_real()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            try:
+                conn.close_for_real()
+            except sqlite3.Error:
+                pass
+
+
+_pool = ConnectionPool(DB_NAME, config.DB_POOL_MAX_IDLE)
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """
+    Helper function untuk dapatkan connection DB (dengan row_factory).
+    Connection diambil dari pool; conn.close() memulangkannya ke pool.
+    """
+    return _pool.acquire()
+
+
+@contextmanager
+def db_session() -> Iterator[sqlite3.Connection]:
+    """
+    Pooled connection for one unit of work: commit on success, rollback on
+    error, connection returned to the pool either way.
+
+        with db_session() as conn:
+            conn.execute(...)
+    """
+    conn = _pool.acquire()
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def close_db_connections():
+    """Close every idle pooled connection (on shutdown)."""
+    _pool.close_all()
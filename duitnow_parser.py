@@ -1,120 +1,265 @@
+# duitnow_parser.py
+"""
+DuitNow QR (EMVCo merchant-presented QR) parser.
+
+parse_duitnow(payload) -> DuitNowQR with the fields the bot cares about
+(holder/merchant name, identifier, bank, amount, city, MCC, reference...)
+and whether the tag 63 CRC matches. A malformed payload never raises:
+fields read before the bad spot are kept and `error` says what was wrong.
+A bad nested template (26-51, 62) only loses that template; the other
+top-level fields are still read.
+parse_duitnow_qr() returns the same as a plain dict (JSON-safe, used by
+the QR search handler and qr_cache).
+
+Benchmark:
+    python duitnow_parser.py --bench [N]
+"""
+
+import sys
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+from emv_tlv import TLVError, check_crc, iter_tlv, with_crc
+
+# Mapping minimum bank/acquirer code → bank name
+BANK_CODE_MAP = {
+    "629295": "AEON Bank (M) Berhad",
+    "501664": "Affin Bank Berhad",
+    "432134": "Al Rajhi Banking & Investment Corporation (Malaysia) Berhad",
+    "504374": "Alliance Bank Malaysia Berhad",
+    "564169": "AmBank Malaysia Berhad",
+    "890293": "Ampersand Pay Sdn Bhd",
+    "890061": "Axiata Digital eCode Sdn Bhd",
+    "603346": "Bank Islam Malaysia Berhad",
+    "589267": "Bank Kerjasama Rakyat Malaysia Berhad",
+    "564167": "Bank Muamalat Malaysia Berhad",
+    "629188": "Bank of America (M) Berhad",
+    "629152": "Bank of China (M) Berhad",
+    "589373": "Bank Pertanian Malaysia Berhad (Agrobank)",
+    "420709": "Bank Simpanan Nasional",
+    "890236": "Beez Fintech Sdn Bhd",
+    "890012": "BigPay Malaysia Sdn Bhd",
+    "629204": "BNP Paribas Malaysia Berhad",
+    "629303": "Boost Bank Berhad",
+    "890244": "Boost Connect Sdn Bhd",
+    "629261": "China Construction Bank (Malaysia) Berhad",
+    "501854": "CIMB Bank Berhad",
+    "589170": "Citibank Berhad",
+    "890160": "Curlec Sdn Bhd",
+    "629246": "Deutsche Bank (M) Berhad",
+    "890145": "Fass Payment Solutions Sdn Bhd",
+    "890020": "Fave Asia Technologies Sdn Bhd",
+    "890038": "Finexus Cards Sdn Bhd",
+    "890103": "GHL Cardpay Sdn Bhd",
+    "890186": "Global Payments Asia-Pacific Limited",
+    "890046": "GPay Network (M) Sdn Bhd (GrabPay)",
+    "629279": "GX Bank Berhad",
+    "588830": "Hong Leong Bank Berhad",
+    "589836": "HSBC Bank Berhad",
+    "629253": "Industrial and Commercial Bank of China (M) Berhad",
+    "890178": "Instapay Technologies Sdn Bhd",
+    "890079": "iPay88 (M) Sdn Bhd",
+    "629212": "JP Morgan Chase Bank Berhad",
+    "629311": "KAF Investment Bank Berhad",
+    "890152": "Kiplepay Sdn Bhd",
+    "890228": "Koperasi Co-opbank Pertama Malaysia Berhad",
+    "639406": "Kuwait Finance House (Malaysia) Berhad",
+    "588734": "Malayan Banking Berhad (Maybank)",
+    "890301": "ManagePay Systems Sdn Bhd",
+    "432310": "MBSB Bank Berhad",
+    "890111": "Merchantrade Asia Sdn Bhd",
+    "629220": "Mizuho Bank (Malaysia) Berhad",
+    "890210": "MobilityOne Sdn Bhd",
+    "890277": "Mobiedge E-commerce Sdn Bhd",
+    "890327": "MRuncit Commerce Sdn Bhd",
+    "629196": "MUFG Bank (Malaysia) Berhad",
+    "504324": "OCBC Bank Berhad",
+    "890269": "Paydibs Sdn Bhd",
+    "890194": "Payex PLT",
+    "564162": "Public Bank Berhad",
+    "890087": "Razer Merchant Services Sdn Bhd",
+    "890095": "Revenue Solution Sdn Bhd",
+    "564160": "RHB Bank Berhad",
+    "890129": "Setel Ventures Sdn Bhd",
+    "890004": "ShopeePay Malaysia Sdn Bhd",
+    "890202": "SiliconNet Technologies Sdn Bhd",
+    "539981": "Standard Chartered Bank Malaysia Berhad",
+    "890137": "Stripe Payments Singapore Pte Ltd",
+    "629238": "Sumitomo Mitsui Banking Corporation (M) Berhad",
+    "890053": "TNG Digital Sdn Bhd",
+    "890251": "UniPin (M) Sdn Bhd",
+    "519469": "United Overseas Bank (Malaysia) Berhad",
+    "890319": "Wannapay Sdn Bhd",
+    "629287": "YTL Digital Bank Berhad",
+    "890285": "2C2P System Sdn Bhd",
+    "898989": "JomPAY"
+}
+
+# Merchant account information templates
+ACCOUNT_INFO_TAGS = frozenset(f"{t:02d}" for t in range(26, 52))
+
+# Point of initiation (tag 01)
+INITIATION_METHODS = {"11": "static", "12": "dynamic"}
+
+
+@dataclass
+class DuitNowQR:
+    merchant_name: Optional[str] = None
+    identifier: Optional[str] = None       # account / phone / security ID
+    bank_code: Optional[str] = None
+    bank_name: Optional[str] = None
+    guid: Optional[str] = None             # e.g. MY.COM.PAYNET
+    initiation: Optional[str] = None       # 'static' / 'dynamic'
+    mcc: Optional[str] = None
+    currency: Optional[str] = None         # ISO 4217 numeric, 458 = MYR
+    amount: Optional[str] = None
+    country: Optional[str] = None
+    merchant_city: Optional[str] = None
+    postal_code: Optional[str] = None
+    bill_number: Optional[str] = None
+    reference: Optional[str] = None
+    terminal_id: Optional[str] = None
+    purpose: Optional[str] = None
+    crc_valid: Optional[bool] = None       # None = payload has no CRC
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _bank_name(code: str) -> str:
+    return BANK_CODE_MAP.get(code, f"Unknown Bank Code {code}")
+
+
+def _parse_account_info(result: DuitNowQR, payload: str, start: int, end: int):
+    """Merchant account info template (26-51); first identifier / bank wins."""
+    for sub_tag, vs, ve in iter_tlv(payload, start, end):
+        if sub_tag == "00" and not result.guid:
+            result.guid = payload[vs:ve].strip()
+        elif sub_tag == "01" and not result.bank_code:
+            result.bank_code = payload[vs:ve].strip()
+            result.bank_name = _bank_name(result.bank_code)
+        elif sub_tag == "02" and not result.identifier:
+            result.identifier = payload[vs:ve].strip()
+
+
+def _parse_additional_data(result: DuitNowQR, payload: str, start: int, end: int):
+    """Additional data template (62)."""
+    for sub_tag, vs, ve in iter_tlv(payload, start, end):
+        value = payload[vs:ve].strip()
+        if sub_tag == "01":
+            result.bill_number = value
+        elif sub_tag == "05":
+            result.reference = value
+        elif sub_tag == "07":
+            result.terminal_id = value
+        elif sub_tag == "08":
+            result.purpose = value
+
+
+# Simple top-level tags -> DuitNowQR attribute
+_SIMPLE_TAGS = {
+    "52": "mcc",
+    "53": "currency",
+    "54": "amount",
+    "58": "country",
+    "59": "merchant_name",
+    "60": "merchant_city",
+    "61": "postal_code",
+}
+
+
+def _parse_template(result: DuitNowQR, parse, tag: str, payload: str, start: int, end: int):
+    """Run a template parser; a malformed template is recorded, not fatal."""
+    try:
+        parse(result, payload, start, end)
+    except TLVError as e:
+        if result.error is None:
+            result.error = f"Tag {tag}: {e}"
+
+
+def parse_duitnow(payload: str) -> DuitNowQR:
+    """Parse a DuitNow QR payload. Never raises on malformed input."""
+    result = DuitNowQR()
+    payload = (payload or "").strip()
+    result.crc_valid = check_crc(payload)
+
+    try:
+        for tag, vs, ve in iter_tlv(payload):
+            attr = _SIMPLE_TAGS.get(tag)
+            if attr:
+                if getattr(result, attr) is None:
+                    setattr(result, attr, payload[vs:ve].strip())
+            elif tag == "01":
+                result.initiation = INITIATION_METHODS.get(payload[vs:ve], payload[vs:ve])
+            elif tag in ACCOUNT_INFO_TAGS:
+                _parse_template(result, _parse_account_info, tag, payload, vs, ve)
+            elif tag == "62":
+                _parse_template(result, _parse_additional_data, tag, payload, vs, ve)
+    except TLVError as e:
+        if result.error is None:
+            result.error = str(e)
+
+    return result
+
+
 def parse_duitnow_qr(payload: str) -> dict:
     """
-    Extract ONLY important info from DuitNow QR:
-    - Merchant Name
-    - Identifier (Account / Phone / Security ID)
-    - Bank Name
+    Extract info from DuitNow QR as a dict:
+    merchant_name, identifier, bank_name (+ every DuitNowQR field).
     """
+    return parse_duitnow(payload).to_dict()
 
-    # Mapping minimum bank/acquirer code → bank name
-    BANK_CODE_MAP = {
-        "629295": "AEON Bank (M) Berhad",
-        "501664": "Affin Bank Berhad",
-        "432134": "Al Rajhi Banking & Investment Corporation (Malaysia) Berhad",
-        "504374": "Alliance Bank Malaysia Berhad",
-        "564169": "AmBank Malaysia Berhad",
-        "890293": "Ampersand Pay Sdn Bhd",
-        "890061": "Axiata Digital eCode Sdn Bhd",
-        "603346": "Bank Islam Malaysia Berhad",
-        "589267": "Bank Kerjasama Rakyat Malaysia Berhad",
-        "564167": "Bank Muamalat Malaysia Berhad",
-        "629188": "Bank of America (M) Berhad",
-        "629152": "Bank of China (M) Berhad",
-        "589373": "Bank Pertanian Malaysia Berhad (Agrobank)",
-        "420709": "Bank Simpanan Nasional",
-        "890236": "Beez Fintech Sdn Bhd",
-        "890012": "BigPay Malaysia Sdn Bhd",
-        "629204": "BNP Paribas Malaysia Berhad",
-        "629303": "Boost Bank Berhad",
-        "890244": "Boost Connect Sdn Bhd",
-        "629261": "China Construction Bank (Malaysia) Berhad",
-        "501854": "CIMB Bank Berhad",
-        "589170": "Citibank Berhad",
-        "890160": "Curlec Sdn Bhd",
-        "629246": "Deutsche Bank (M) Berhad",
-        "890145": "Fass Payment Solutions Sdn Bhd",
-        "890020": "Fave Asia Technologies Sdn Bhd",
-        "890038": "Finexus Cards Sdn Bhd",
-        "890103": "GHL Cardpay Sdn Bhd",
-        "890186": "Global Payments Asia-Pacific Limited",
-        "890046": "GPay Network (M) Sdn Bhd (GrabPay)",
-        "629279": "GX Bank Berhad",
-        "588830": "Hong Leong Bank Berhad",
-        "589836": "HSBC Bank Berhad",
-        "629253": "Industrial and Commercial Bank of China (M) Berhad",
-        "890178": "Instapay Technologies Sdn Bhd",
-        "890079": "iPay88 (M) Sdn Bhd",
-        "629212": "JP Morgan Chase Bank Berhad",
-        "629311": "KAF Investment Bank Berhad",
-        "890152": "Kiplepay Sdn Bhd",
-        "890228": "Koperasi Co-opbank Pertama Malaysia Berhad",
-        "639406": "Kuwait Finance House (Malaysia) Berhad",
-        "588734": "Malayan Banking Berhad (Maybank)",
-        "890301": "ManagePay Systems Sdn Bhd",
-        "432310": "MBSB Bank Berhad",
-        "890111": "Merchantrade Asia Sdn Bhd",
-        "629220": "Mizuho Bank (Malaysia) Berhad",
-        "890210": "MobilityOne Sdn Bhd",
-        "890277": "Mobiedge E-commerce Sdn Bhd",
-        "890327": "MRuncit Commerce Sdn Bhd",
-        "629196": "MUFG Bank (Malaysia) Berhad",
-        "504324": "OCBC Bank Berhad",
-        "890269": "Paydibs Sdn Bhd",
-        "890194": "Payex PLT",
-        "564162": "Public Bank Berhad",
-        "890087": "Razer Merchant Services Sdn Bhd",
-        "890095": "Revenue Solution Sdn Bhd",
-        "564160": "RHB Bank Berhad",
-        "890129": "Setel Ventures Sdn Bhd",
-        "890004": "ShopeePay Malaysia Sdn Bhd",
-        "890202": "SiliconNet Technologies Sdn Bhd",
-        "539981": "Standard Chartered Bank Malaysia Berhad",
-        "890137": "Stripe Payments Singapore Pte Ltd",
-        "629238": "Sumitomo Mitsui Banking Corporation (M) Berhad",
-        "890053": "TNG Digital Sdn Bhd",
-        "890251": "UniPin (M) Sdn Bhd",
-        "519469": "United Overseas Bank (Malaysia) Berhad",
-        "890319": "Wannapay Sdn Bhd",
-        "629287": "YTL Digital Bank Berhad",
-        "890285": "2C2P System Sdn Bhd",
-        "898989": "JomPAY"
-    }
-
-
-    result = {
-        "merchant_name": None,
-        "identifier": None,
-        "bank_name": None
-    }
-
-    i = 0
-    while i + 4 <= len(payload):
-        tag = payload[i:i+2]
-        length = int(payload[i+2:i+4])
-        value = payload[i+4:i+4+length]
-
-        # 1️. Merchant Name
-        if tag == "59":
-            result["merchant_name"] = value.strip()
-
-        # 2️. Merchant Account Information (26–51)
-        if tag.isdigit() and 26 <= int(tag) <= 51:
-            j = 0
-            while j + 4 <= len(value):
-                sub_tag = value[j:j+2]
-                sub_len = int(value[j+2:j+4])
-                sub_val = value[j+4:j+4+sub_len]
-
-                # Identifier (account / phone / security ID)
-                if sub_tag == "02" and not result["identifier"]:
-                    result["identifier"] = sub_val.strip()
-
-                # Bank / Acquirer code
-                if sub_tag == "01" and not result["bank_name"]:
-                    result["bank_name"] = BANK_CODE_MAP.get(sub_val, f"Unknown Bank Code {sub_val}")
-
-                j += 4 + sub_len
-
-        i += 4 + length
 
-    return result
+# ============================================================
+#  BENCHMARK
+# ============================================================
+
+def _tlv(tag: str, value: str) -> str:
+    return f"{tag}{len(value):02d}{value}"
+
+
+def _sample_payloads(count: int) -> list:
+    """Mix of valid, bad-CRC and truncated DuitNow payloads."""
+    import random
+
+    rng = random.Random(7)
+    codes = list(BANK_CODE_MAP)
+    payloads = []
+    for i in range(count):
+        account = "".join(rng.choice("0123456789") for _ in range(rng.randint(10, 16)))
+        body = (
+            _tlv("00", "01") + _tlv("01", rng.choice(["11", "12"]))
+            + _tlv("26", _tlv("00", "MY.COM.PAYNET") + _tlv("01", rng.choice(codes)) + _tlv("02", account))
+            + _tlv("52", "5999") + _tlv("53", "458")
+            + (_tlv("54", f"{rng.randint(1, 99999) / 100:.2f}") if i % 3 == 0 else "")
+            + _tlv("58", "MY") + _tlv("59", f"MERCHANT {i}") + _tlv("60", "KUALA LUMPUR")
+            + _tlv("62", _tlv("05", f"REF{i:08d}"))
+        )
+        payload = with_crc(body)
+        if i % 10 == 1:
+            payload = payload[:-4] + "0000"          # bad CRC
+        elif i % 10 == 2:
+            payload = payload[:rng.randint(10, len(payload) - 10)]   # truncated
+        payloads.append(payload)
+    return payloads
+
+
+def _bench(count: int):
+    payloads = _sample_payloads(count)
+    started = time.perf_counter()
+    results = [parse_duitnow(p) for p in payloads]
+    elapsed = time.perf_counter() - started
+
+    crc_ok = sum(r.crc_valid is True for r in results)
+    malformed = sum(r.error is not None for r in results)
+    print(f"{count} payloads in {elapsed:.3f}s: {count / elapsed:,.0f} payloads/s")
+    print(f"crc ok {crc_ok}, crc bad/missing {count - crc_ok}, malformed {malformed}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        _bench(int(sys.argv[2]) if len(sys.argv) > 2 else 50000)
+    else:
+        print("Usage: python duitnow_parser.py --bench [N]")
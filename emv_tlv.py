@@ -0,0 +1,83 @@
+# emv_tlv.py
+"""
+EMVCo merchant-presented QR (DuitNow QR) TLV helpers.
+
+A payload is a run of <tag:2 digits><length:2 digits><value> fields; some
+tags (26-51 merchant account info, 62 additional data, 64 language
+template, 80-99 unreserved) hold nested TLV in their value. The payload
+ends with tag 63: a CRC16-CCITT (poly 0x1021, init 0xFFFF) over
+everything up to and including "6304", as 4 upper-case hex digits.
+
+iter_tlv() raises TLVError (a ValueError) with the offset of
+the first bad field instead of mis-reading the rest of the payload.
+"""
+
+from typing import Iterator, Optional, Tuple
+
+CRC_TAG = "63"
+
+
+class TLVError(ValueError):
+    def __init__(self, message: str, offset: int):
+        super().__init__(f"{message} at offset {offset}")
+        self.offset = offset
+
+
+def _crc16_table() -> Tuple[int, ...]:
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return tuple(table)
+
+
+_CRC16_TABLE = _crc16_table()
+
+
+def crc16_ccitt(data: bytes, crc: int = 0xFFFF) -> int:
+    """CRC16-CCITT (FALSE variant), table-driven."""
+    table = _CRC16_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+def with_crc(payload_without_crc: str) -> str:
+    """Append tag 63 (CRC) to a payload."""
+    body = payload_without_crc + CRC_TAG + "04"
+    return body + f"{crc16_ccitt(body.encode('utf-8')):04X}"
+
+
+def iter_tlv(payload: str, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[str, int, int]]:
+    """
+    Yield (tag, value_start, value_end) for each field in payload[start:end],
+    without copying values. Raises TLVError on a bad length or overrun.
+    """
+    end = len(payload) if end is None else end
+    i = start
+    while i < end:
+        if i + 4 > end:
+            raise TLVError("Truncated field header", i)
+        length_text = payload[i + 2:i + 4]
+        # ASCII only: str.isdigit() also accepts e.g. '²', which int() rejects
+        if not (length_text.isascii() and length_text.isdecimal()):
+            raise TLVError(f"Invalid length {length_text!r}", i)
+        value_start = i + 4
+        value_end = value_start + int(length_text)
+        if value_end > end:
+            raise TLVError(f"Field {payload[i:i + 2]!r} overruns payload", i)
+        yield payload[i:i + 2], value_start, value_end
+        i = value_end
+
+
+def check_crc(payload: str) -> Optional[bool]:
+    """True/False if the payload ends with a tag 63 CRC, None if it has none."""
+    if len(payload) < 8 or payload[-8:-4] != CRC_TAG + "04":
+        return None
+    crc_text = payload[-4:]
+    if not (crc_text.isascii() and all(c in "0123456789ABCDEFabcdef" for c in crc_text)):
+        return False
+    expected = int(crc_text, 16)
+    return crc16_ccitt(payload[:-4].encode('utf-8')) == expected
@@ -18,8 +18,10 @@ from telegram.constants import ParseMode
 # Import dari fail lain
 import config
 from database import get_db_connection
+import async_db
 from bot_utils import _safe_edit_message, _safe_delete_message, _format_confirmation_message
 from handlers_general import start # Perlu untuk 'cancel' & 'start'
+from card_cache import invalidate_cards
 
 logger = logging.getLogger(__name__)
 
@@ -52,9 +54,7 @@ async def admin_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
     
     return config.ADMIN_MENU
 
-async def _get_next_unverified_report(context):
-    skipped = context.user_data.get("skipped_reports", set())
-
+def _load_next_unverified_report(skipped: set):
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
@@ -78,16 +78,24 @@ async def _get_next_unverified_report(context):
 
             return dict(row), screenshots
 
-        # Semua UNVERIFIED dah diskip dalam session
-        context.user_data["skipped_reports"] = set()
         return None, None
 
+    finally:
+        conn.close()
+
+async def _get_next_unverified_report(context):
+    skipped = context.user_data.get("skipped_reports", set())
+
+    try:
+        report, screenshots = await async_db.run(_load_next_unverified_report, set(skipped))
     except sqlite3.Error as e:
         logger.error(f"DB error in _get_next_unverified_report: {e}")
         return None, None
 
-    finally:
-        conn.close()
+    if report is None:
+        # Semua UNVERIFIED dah diskip dalam session
+        context.user_data["skipped_reports"] = set()
+    return report, screenshots
 
 async def admin_review_next_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
@@ -169,19 +177,14 @@ async def admin_update_report_status(update: Update, context: ContextTypes.DEFAU
         
     report_data = context.user_data.get('admin_current_report_data')
 
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute(
+        await async_db.execute(
             "UPDATE reports SET report_status = ? WHERE report_id = ?",
             (new_status, report_id)
         )
-        conn.commit()
         logger.info(f"Admin menukar status Laporan ID: {report_id} kepada {new_status}")
     except sqlite3.Error as e:
         logger.error(f"Ralat DB semasa 'dispute' laporan: {e}")
-    finally:
-        conn.close()
 
     # Send notification to reporter
     if new_status == "DISPUTED" and report_data:
@@ -243,17 +246,14 @@ async def admin_verify_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         return config.ADMIN_REVIEW_REPORT
 
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
         query_sql = f"""
         SELECT p.profile_id, p.main_identifier
         FROM profiles p
         JOIN {search_table} t ON p.profile_id = t.profile_id
         WHERE t.{search_key} = ?
         """
-        cursor.execute(query_sql, (search_value,))
-        existing_profiles = cursor.fetchall()
+        existing_profiles = await async_db.fetch_all(query_sql, (search_value,))
         
     except sqlite3.Error as e:
         logger.error(f"Ralat DB semasa semak pautan admin: {e}")
@@ -262,8 +262,6 @@ async def admin_verify_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
             f"Ralat DB: {e}", reply_markup=query.message.reply_markup
         )
         return config.ADMIN_REVIEW_REPORT
-    finally:
-        conn.close()
 
     if existing_profiles:
         logger.info(f"Semakan Laporan ID {report_id}: Menjumpai {len(existing_profiles)} profil sedia ada.")
@@ -455,6 +453,10 @@ def _run_aggregation_in_db(report_data: dict, profile_id: str):
         
         conn.commit()
         logger.info(f"AGREGASI BERJAYA: Laporan ID {report_id} dipautkan ke Profil ID {profile_id}")
+
+        # Kad lama profil/laporan ini sudah basi
+        invalidate_cards(f"profile:{profile_id}")
+        invalidate_cards(f"report:{report_id}")
         
     except sqlite3.Error as e:
         conn.rollback()
@@ -476,7 +478,7 @@ async def admin_link_profile(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return ConversationHandler.END
         
     try:
-        _run_aggregation_in_db(report_data, profile_id)
+        await async_db.run(_run_aggregation_in_db, report_data, profile_id)
 
         text = (
             f"✅ Berjaya! Laporan ID `{report_data['report_id']}` telah dipautkan "
@@ -560,24 +562,21 @@ async def admin_get_new_profile_name(update: Update, context: ContextTypes.DEFAU
 
     profile_id = f"pid-{uuid.uuid4().hex[:8]}"
 
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-
         # Cipta profil
-        cursor.execute(
+        await async_db.execute(
             """
             INSERT INTO profiles (profile_id, main_identifier, created_at, updated_at)
             VALUES (?, ?, ?, ?)
             """,
             (profile_id, profile_name, datetime.now(), datetime.now())
         )
-        conn.commit()
 
         logger.info(f"Profil baru dicipta: {profile_name} (ID: {profile_id})")
+        await async_db.run(invalidate_cards, f"profile:{profile_id}")
 
         # Jalankan agregasi
-        _run_aggregation_in_db(report_data, profile_id)
+        await async_db.run(_run_aggregation_in_db, report_data, profile_id)
 
         # HANTAR mesej baru (JANGAN edit)
         await context.bot.send_message(
@@ -609,9 +608,6 @@ async def admin_get_new_profile_name(update: Update, context: ContextTypes.DEFAU
         )
         return ConversationHandler.END
 
-    finally:
-        conn.close()
-
     # RESET STATE
     context.user_data.clear()
 
@@ -687,22 +683,17 @@ async def _set_needs_info(update: Update, context: ContextTypes.DEFAULT_TYPE, re
         await context.bot.send_message(chat_id=chat_id, text="Session expired. Please restart.")
         return ConversationHandler.END
 
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute("""
+        await async_db.execute("""
             UPDATE reports
             SET report_status = 'NEEDS_INFO',
                 needs_info_since = CURRENT_TIMESTAMP,
                 admin_note = ?
             WHERE report_id = ?
         """, (reason, report_id))
-        conn.commit()
         logger.info(f"Report {report_id} set to NEEDS_INFO (reason: {reason})")
     except sqlite3.Error as e:
         logger.error(f"DB error setting NEEDS_INFO: {e}")
-    finally:
-        conn.close()
 
     # Send notification to reporter
     reporter_user_id = report_data.get('submitter_user_id')
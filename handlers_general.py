@@ -4,21 +4,21 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, Callbac
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.constants import ChatMemberStatus
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
 from typing import Union
 import config
 from config import ADMIN_USER_IDS
 from bot_utils import _safe_edit_message, _safe_delete_message, send_report_notification
 from datetime import datetime
 from database import get_db_connection
-from playwright.async_api import async_playwright
-import tempfile
-import os
+import async_db
+from stats_counters import read_stats_counters, reconcile_stats_counters
+from browser_pool import browser_pool
+from image_generator import jinja_env
+from stats_image_cache import stats_image_cache, stats_version
 
 logger = logging.getLogger(__name__)
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
-
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
     user = update.effective_user
@@ -30,13 +30,8 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     logger.info(f"{user_id} started/restarted the bot - clearing conversation state")
 
     if user:
-        register_user(user)
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        touch_user_activity(cursor, user_id)
-        conn.commit()
-        conn.close()
+        await async_db.run(register_user, user)
+        await async_db.transaction(lambda conn: touch_user_activity(conn.cursor(), user_id))
 
     if not await ensure_user_joined(update, context):
         return ConversationHandler.END
@@ -158,186 +153,47 @@ def register_user(tg_user):
 
 
 def get_system_statistics():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Semua nombor datang dari stats_counters (dikemas kini oleh triggers)
+    counters = read_stats_counters()
 
     stats = {}
 
     # =====================
     # USERS STATS
     # =====================
-
-    # Total users
-    cursor.execute("SELECT COUNT(*) FROM users")
-    stats["total_users"] = cursor.fetchone()[0]
-
-    # New users today
-    cursor.execute("""
-        SELECT COUNT(*)
-        FROM users
-        WHERE date(created_date) = date('now')
-    """)
-    stats["new_users_today"] = cursor.fetchone()[0]
-
-    # New users yesterday
-    cursor.execute("""
-        SELECT COUNT(*)
-        FROM users
-        WHERE date(created_date) = date('now','-1 day')
-    """)
-    stats["new_users_yesterday"] = cursor.fetchone()[0]
-
-    # Active Base (last 30 days, bot interaction based)
-    cursor.execute("""
-        SELECT COUNT(*)
-        FROM users
-        WHERE last_active_datetime >= datetime('now','-30 day')
-    """)
-    stats["active_users_30d"] = cursor.fetchone()[0]
-
-    # Active Base %
-    cursor.execute("""
-        SELECT ROUND(
-            SUM(last_active_datetime >= datetime('now','-30 day')) * 100.0 / COUNT(*),
-            1
-        )
-        FROM users
-    """)
-    stats["active_base_percent"] = cursor.fetchone()[0]
+    stats["total_users"] = int(counters["total_users"])
+    stats["new_users_today"] = int(counters["new_users_today"])
+    stats["new_users_yesterday"] = int(counters["new_users_yesterday"])
+
+    # Active Base (last 30 days, bot interaction based) — refreshed by reconcile job
+    stats["active_users_30d"] = int(counters["active_users_30d"])
+    stats["active_base_percent"] = (
+        round(stats["active_users_30d"] * 100.0 / stats["total_users"], 1)
+        if stats["total_users"] else None
+    )
 
     # =====================
     # REPORTS STATS
     # =====================
-
-    # Total reports
-    cursor.execute("SELECT COUNT(*) FROM reports")
-    stats["total_reports"] = cursor.fetchone()[0]
+    stats["total_reports"] = int(counters["total_reports"])
 
     # =====================
     # BANK / PHONE / SOCIAL
     # =====================
-
-    splitter_cte = """
-        WITH RECURSIVE split(part, rest) AS (
-          SELECT '',
-                 TRIM(REPLACE(REPLACE(REPLACE(additional_info,'[',''),']',''),'"',''))
-          FROM reports
-          WHERE additional_info IS NOT NULL
-            AND additional_info != '[]'
-
-          UNION ALL
-
-          SELECT
-            TRIM(
-              CASE
-                WHEN instr(rest, ', ') > 0
-                THEN substr(rest,1,instr(rest,', ')-1)
-                ELSE rest
-              END
-            ),
-            CASE
-              WHEN instr(rest, ', ') > 0
-              THEN substr(rest,instr(rest,', ')+2)
-              ELSE ''
-            END
-          FROM split
-          WHERE rest != ''
-        )
-    """
-
-    # Total bank accounts
-    cursor.execute(splitter_cte + """
-        SELECT COUNT(DISTINCT bank) FROM (
-          SELECT TRIM(substr(part, instr(part,'Bank:')+5)) AS bank
-          FROM split
-          WHERE part LIKE 'Bank:%'
-
-          UNION ALL
-
-          SELECT TRIM(against_bank_number)
-          FROM reports
-          WHERE against_bank_number IS NOT NULL
-            AND against_bank_number != ''
-        )
-    """)
-    stats["total_banks"] = cursor.fetchone()[0]
-
-    # Total phone numbers
-    cursor.execute(splitter_cte + """
-        SELECT COUNT(DISTINCT phone) FROM (
-          SELECT TRIM(substr(part, instr(part,'Telefon:')+8)) AS phone
-          FROM split
-          WHERE part LIKE 'Telefon:%'
-
-          UNION ALL
-
-          SELECT TRIM(against_phone_number)
-          FROM reports
-          WHERE against_phone_number IS NOT NULL
-            AND against_phone_number != ''
-        )
-    """)
-    stats["total_phones"] = cursor.fetchone()[0]
-
-    # Total social media
-    cursor.execute(splitter_cte + """
-        SELECT COUNT(DISTINCT social) FROM (
-          SELECT
-            rtrim(
-              replace(
-                substr(part, instr(part,'Sosial:')+7),
-                'www.',
-                ''
-              ),
-              '/'
-            ) AS social
-          FROM split
-          WHERE part LIKE 'Sosial:%'
-
-          UNION ALL
-
-          SELECT
-            rtrim(
-              replace(against_social_url,'www.',''),
-              '/'
-            )
-          FROM reports
-          WHERE against_social_url IS NOT NULL
-            AND against_social_url != ''
-        )
-    """)
-    stats["total_socials"] = cursor.fetchone()[0]
+    stats["total_banks"] = int(counters["distinct_bank"])
+    stats["total_phones"] = int(counters["distinct_phone"])
+    stats["total_socials"] = int(counters["distinct_social"])
 
     # =====================
     # LOSSES
     # =====================
-
-    # Cumulative verified losses
-    cursor.execute("""
-        SELECT COALESCE(SUM(amount_scammed),0)
-        FROM reports
-        WHERE report_status = 'VERIFIED'
-    """)
-    stats["total_verified_loss"] = cursor.fetchone()[0]
-
-    # Highest single loss
-    cursor.execute("""
-        SELECT COALESCE(MAX(amount_scammed),0)
-        FROM reports
-        WHERE report_status = 'VERIFIED'
-    """)
-    stats["highest_single_loss"] = cursor.fetchone()[0]
+    stats["total_verified_loss"] = counters["total_verified_loss"]
+    stats["highest_single_loss"] = counters["highest_single_loss"]
 
     # =====================
     # TRUECALLER CACHE COUNT
     # =====================
-    try:
-        cursor.execute("SELECT COUNT(*) FROM truecaller_cache")
-        stats["tc_cache_count"] = cursor.fetchone()[0]
-    except Exception:
-        stats["tc_cache_count"] = 0
-
-    conn.close()
+    stats["tc_cache_count"] = int(counters["tc_cache_count"])
 
     # =====================
     # API STATUS (Demo Mode)
@@ -350,57 +206,94 @@ def get_system_statistics():
     return stats
 
 
-async def render_html_to_image(html: str) -> str:
-    tmp_html = tempfile.NamedTemporaryFile(delete=False, suffix=".html")
-    tmp_html.write(html.encode("utf-8"))
-    tmp_html.close()
-
-    output_png = tmp_html.name.replace(".html", ".png")
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page(
-            viewport={"width": 920, "height": 520}
-        )
-        await page.goto(f"file:///{tmp_html.name}")
+async def render_html_to_image(html: str) -> bytes:
+    async with browser_pool.page(viewport={"width": 920, "height": 520}) as page:
+        await page.set_content(html)
         await page.wait_for_timeout(300)
-        await page.screenshot(path=output_png, full_page=True)
-        await browser.close()
+        return await page.screenshot(type="png", full_page=True)
 
-    os.unlink(tmp_html.name)
-    return output_png
 
 def build_statistic_html(stats: dict) -> str:
-    template_path = os.path.join(TEMPLATE_DIR, "modern_stats.html")
-
-    with open(template_path, "r", encoding="utf-8") as f:
-        html = f.read()
-
-    return (
-        html
+    view = {
         # ===== USERS =====
-        .replace("{{ stats.total_users }}", f"{stats['total_users']:,}")
-        .replace("{{ stats.new_users_today }}", f"{stats['new_users_today']:,}")
-        .replace("{{ stats.new_users_yesterday }}", f"{stats['new_users_yesterday']:,}")
-        .replace("{{ stats.active_base_percent }}", f"{stats['active_base_percent']}")
+        "total_users": f"{stats['total_users']:,}",
+        "new_users_today": f"{stats['new_users_today']:,}",
+        "new_users_yesterday": f"{stats['new_users_yesterday']:,}",
+        "active_base_percent": f"{stats['active_base_percent']}",
 
         # ===== REPORTS / DATABASE =====
-        .replace("{{ stats.total_reports }}", f"{stats['total_reports']:,}")
-        .replace("{{ stats.total_banks }}", f"{stats['total_banks']:,}")
-        .replace("{{ stats.total_phones }}", f"{stats['total_phones']:,}")
-        .replace("{{ stats.total_socials }}", f"{stats['total_socials']:,}")
+        "total_reports": f"{stats['total_reports']:,}",
+        "total_banks": f"{stats['total_banks']:,}",
+        "total_phones": f"{stats['total_phones']:,}",
+        "total_socials": f"{stats['total_socials']:,}",
 
         # ===== LOSSES =====
-        .replace("{{ stats.total_verified_loss }}", f"{stats['total_verified_loss']:,.2f}")
-        .replace("{{ stats.highest_single_loss }}", f"{stats['highest_single_loss']:,.2f}")
+        "total_verified_loss": f"{stats['total_verified_loss']:,.2f}",
+        "highest_single_loss": f"{stats['highest_single_loss']:,.2f}",
 
         # ===== API STATUS =====
-        .replace("{{ stats.tc_status_color }}", stats['tc_status_color'])
-        .replace("{{ stats.tc_status }}", stats['tc_status'])
-        .replace("{{ stats.sm_status_color }}", stats['sm_status_color'])
-        .replace("{{ stats.sm_status }}", stats['sm_status'])
-        .replace("{{ stats.tc_cache_count }}", f"{stats['tc_cache_count']:,}")
-    )
+        "tc_status_color": stats['tc_status_color'],
+        "tc_status": stats['tc_status'],
+        "sm_status_color": stats['sm_status_color'],
+        "sm_status": stats['sm_status'],
+        "tc_cache_count": f"{stats['tc_cache_count']:,}",
+    }
+    return jinja_env.get_template("modern_stats.html").render(stats=view)
+
+
+async def refresh_statistics_image(bot=None, force: bool = False) -> bool:
+    """
+    Render the Statistics image if the cached one is stale or about to
+    expire, and pre-upload it to STATS_IMAGE_UPLOAD_CHAT_ID when set so
+    users get a file_id. Returns True if a new image was rendered.
+    """
+    async with stats_image_cache.lock:
+        stats = await async_db.run(get_system_statistics)
+        version = stats_version(stats)
+        if not force and not stats_image_cache.needs_refresh(
+            version, lead_seconds=config.STATS_IMAGE_REFRESH_SECONDS
+        ):
+            return False
+
+        png = await render_html_to_image(build_statistic_html(stats))
+        stats_image_cache.store(version, png)
+
+    if bot and config.STATS_IMAGE_UPLOAD_CHAT_ID:
+        try:
+            msg = await bot.send_photo(
+                chat_id=config.STATS_IMAGE_UPLOAD_CHAT_ID,
+                photo=png,
+                disable_notification=True
+            )
+            if msg.photo:
+                stats_image_cache.set_file_id(version, msg.photo[-1].file_id)
+        except Exception as e:
+            logger.warning(f"Gagal pre-upload imej statistik: {e}")
+    return True
+
+
+async def prerender_statistics_image(context: ContextTypes.DEFAULT_TYPE):
+    """JobQueue callback: keep the Statistics image rendered ahead of expiry."""
+    try:
+        await refresh_statistics_image(context.bot)
+    except Exception as e:
+        logger.error(f"Error in prerender_statistics_image: {e}")
+
+
+async def _send_statistics_photo(context: ContextTypes.DEFAULT_TYPE, chat_id: int):
+    photo = stats_image_cache.photo()
+    version = stats_image_cache.version
+    try:
+        msg = await context.bot.send_photo(chat_id=chat_id, photo=photo)
+    except BadRequest:
+        if not isinstance(photo, str):
+            raise
+        # file_id ditolak Telegram — hantar PNG
+        stats_image_cache.forget_file_id()
+        msg = await context.bot.send_photo(chat_id=chat_id, photo=stats_image_cache.photo())
+
+    if msg.photo:
+        stats_image_cache.set_file_id(version, msg.photo[-1].file_id)
 
 
 async def show_statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -413,11 +306,7 @@ async def show_statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"{user_id} get statistics.")
     
     # === TRACK ACTIVITY ===
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    touch_user_activity(cursor, user_id)
-    conn.commit()
-    conn.close()
+    await async_db.transaction(lambda conn: touch_user_activity(conn.cursor(), user_id))
 
     # === 1) DELETE CURRENT MESSAGE ===
     try:
@@ -425,16 +314,17 @@ async def show_statistics(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception:
         pass  # kalau gagal, ignore
 
-    # === 2) GENERATE + SEND STAT IMAGE ===
-    stats = get_system_statistics()
-    html = build_statistic_html(stats)
-    image_path = await render_html_to_image(html)
+    # === 2) SEND STAT IMAGE (CACHED) ===
+    if stats_image_cache.photo() is None:
+        # Cold start: belum ada imej langsung, render sekarang
+        await refresh_statistics_image(context.bot)
+    else:
+        stats = await async_db.run(get_system_statistics)
+        if not stats_image_cache.is_fresh(stats_version(stats)):
+            # Hantar imej lama dulu, render semula di belakang
+            context.application.create_task(refresh_statistics_image(context.bot))
 
-    with open(image_path, "rb") as img:
-        await context.bot.send_photo(
-            chat_id=chat_id,
-            photo=img
-        )
+    await _send_statistics_photo(context, chat_id)
 
     # === 3) SEND START MESSAGE FRESH ===
     await start(update, context)
@@ -523,46 +413,58 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return ConversationHandler.END
 
 
+def _archive_expired_needs_info(conn) -> list:
+    """Reject NEEDS_INFO reports older than 30 days; returns the archived rows."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT report_id, submitter_user_id
+        FROM reports
+        WHERE report_status = 'NEEDS_INFO'
+          AND needs_info_since <= datetime('now', '-30 days')
+    """)
+    expired_reports = cursor.fetchall()
+
+    for row in expired_reports:
+        cursor.execute("""
+            UPDATE reports
+            SET report_status = 'REJECTED',
+                auto_rejected = 1,
+                rejection_reason = 'Auto-archived: no response within 30 days'
+            WHERE report_id = ?
+        """, (row['report_id'],))
+
+    return expired_reports
+
+
 async def auto_archive_needs_info(context: ContextTypes.DEFAULT_TYPE):
     """JobQueue callback: auto-archive NEEDS_INFO reports older than 30 days."""
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT report_id, submitter_user_id
-            FROM reports
-            WHERE report_status = 'NEEDS_INFO'
-              AND needs_info_since <= datetime('now', '-30 days')
-        """)
-        expired_reports = cursor.fetchall()
-
-        if not expired_reports:
-            return
-
-        for row in expired_reports:
-            report_id = row['report_id']
-            reporter_id = row['submitter_user_id']
-
-            cursor.execute("""
-                UPDATE reports
-                SET report_status = 'REJECTED',
-                    auto_rejected = 1,
-                    rejection_reason = 'Auto-archived: no response within 30 days'
-                WHERE report_id = ?
-            """, (report_id,))
-
-            # Notify reporter
-            try:
-                await send_report_notification(
-                    context.bot, reporter_id, report_id, 'auto_archived'
-                )
-            except Exception as e:
-                logger.warning(f"Failed to notify reporter {reporter_id} for auto-archived report {report_id}: {e}")
+        expired_reports = await async_db.transaction(_archive_expired_needs_info)
+    except Exception as e:
+        logger.error(f"Error in auto_archive_needs_info: {e}")
+        return
+
+    if not expired_reports:
+        return
+
+    for row in expired_reports:
+        report_id = row['report_id']
+        reporter_id = row['submitter_user_id']
+
+        # Notify reporter
+        try:
+            await send_report_notification(
+                context.bot, reporter_id, report_id, 'auto_archived'
+            )
+        except Exception as e:
+            logger.warning(f"Failed to notify reporter {reporter_id} for auto-archived report {report_id}: {e}")
+
+    logger.info(f"Auto-archived {len(expired_reports)} NEEDS_INFO report(s)")
 
-        conn.commit()
-        logger.info(f"Auto-archived {len(expired_reports)} NEEDS_INFO report(s)")
 
+async def reconcile_statistics(context: ContextTypes.DEFAULT_TYPE):
+    """JobQueue callback: recompute stats_counters to fix drift and refresh active users."""
+    try:
+        await async_db.run(reconcile_stats_counters)
     except Exception as e:
-        logger.error(f"Error in auto_archive_needs_info: {e}")
-    finally:
-        conn.close()
\ No newline at end of file
+        logger.error(f"Error in reconcile_statistics: {e}")
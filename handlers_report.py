@@ -14,7 +14,8 @@ from telegram.constants import ParseMode
 
 # Import dari fail lain
 import config
-from database import get_db_connection
+import async_db
+from identifiers import identifiers_for_report, parse_evidence_item, save_report_identifiers
 from bot_utils import _safe_edit_message, _safe_delete_message, _format_confirmation_message
 from handlers_general import start # Perlu untuk 'submit'
 
@@ -659,6 +660,60 @@ async def show_tos(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return config.CONFIRMATION
 
 
+def _save_report(conn, user_id: str, data: dict, linked_profile_id) -> int:
+    """Insert report + identifiers + screenshots (runs on the DB thread, caller commits)."""
+    cursor = conn.cursor()
+
+    additional_evidence_list = data.get('additional_evidence', [])
+    additional_info_json = json.dumps(additional_evidence_list)
+    
+    report_sql = """
+    INSERT INTO reports (
+        submitter_user_id, title, description, reporter_status, amount_scammed, 
+        report_against_type, against_phone_number, against_phone_name, 
+        against_bank_number, against_bank_name, against_bank_holder_name, 
+        against_social_url, additional_info, linked_profile_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    report_values = (
+        user_id,
+        data.get('title'),
+        data.get('description'),
+        data.get('reporter_status'),
+        data.get('amount_scammed', 0),
+        data.get('report_against_type'),
+        data.get('against_phone_number'),
+        data.get('against_phone_name'),
+        data.get('against_bank_number'),
+        data.get('against_bank_name'),
+        data.get('against_bank_holder_name'),
+        data.get('against_social_url'),
+        additional_info_json,
+        linked_profile_id
+    )
+    
+    cursor.execute(report_sql, report_values)
+    new_report_id = cursor.lastrowid
+
+    save_report_identifiers(
+        cursor, new_report_id,
+        identifiers_for_report(
+            {**data, 'additional_info': additional_info_json},
+            additional=data.get('additional_identifiers')
+        )
+    )
+    
+    logger.info(f"Laporan baru (ID: {new_report_id}) berjaya disimpan.")
+    
+    screenshots = data.get('screenshots', [])
+    if screenshots:
+        screenshot_sql = "INSERT INTO screenshots (report_id, file_path) VALUES (?, ?)"
+        screenshot_values = [(new_report_id, file_id) for file_id in screenshots]
+        cursor.executemany(screenshot_sql, screenshot_values)
+        logger.info(f"{len(screenshots)} screenshots disimpan untuk report ID: {new_report_id}")
+
+    return new_report_id
+
 async def submit_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer("Processing report...")
@@ -686,17 +741,14 @@ async def submit_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         search_table = "profile_social_media"
 
     if search_value and search_table:
-        conn_check = get_db_connection()
         try:
-            cursor_check = conn_check.cursor()
             query_sql = f"""
             SELECT p.profile_id
             FROM profiles p
             JOIN {search_table} t ON p.profile_id = t.profile_id
             WHERE t.{search_key} = ?
             """
-            cursor_check.execute(query_sql, (search_value,))
-            existing_profiles = cursor_check.fetchall()
+            existing_profiles = await async_db.fetch_all(query_sql, (search_value,))
             
             if len(existing_profiles) == 1:
                 linked_profile_id = existing_profiles[0]['profile_id']
@@ -704,55 +756,12 @@ async def submit_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     
         except sqlite3.Error as e:
             logger.error(f"Ralat DB semasa auto-link check: {e}")
-        finally:
-            conn_check.close()
     
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        
-        additional_evidence_list = data.get('additional_evidence', [])
-        additional_info_json = json.dumps(additional_evidence_list)
-        
-        report_sql = """
-        INSERT INTO reports (
-            submitter_user_id, title, description, reporter_status, amount_scammed, 
-            report_against_type, against_phone_number, against_phone_name, 
-            against_bank_number, against_bank_name, against_bank_holder_name, 
-            against_social_url, additional_info, linked_profile_id
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        report_values = (
-            user_id,
-            data.get('title'),
-            data.get('description'),
-            data.get('reporter_status'),
-            data.get('amount_scammed', 0),
-            data.get('report_against_type'),
-            data.get('against_phone_number'),
-            data.get('against_phone_name'),
-            data.get('against_bank_number'),
-            data.get('against_bank_name'),
-            data.get('against_bank_holder_name'),
-            data.get('against_social_url'),
-            additional_info_json,
-            linked_profile_id
+        new_report_id = await async_db.transaction(
+            lambda conn: _save_report(conn, user_id, data, linked_profile_id)
         )
         
-        cursor.execute(report_sql, report_values)
-        new_report_id = cursor.lastrowid
-        
-        logger.info(f"Laporan baru (ID: {new_report_id}) berjaya disimpan.")
-        
-        screenshots = data.get('screenshots', [])
-        if screenshots:
-            screenshot_sql = "INSERT INTO screenshots (report_id, file_path) VALUES (?, ?)"
-            screenshot_values = [(new_report_id, file_id) for file_id in screenshots]
-            cursor.executemany(screenshot_sql, screenshot_values)
-            logger.info(f"{len(screenshots)} screenshots disimpan untuk report ID: {new_report_id}")
-            
-        conn.commit()
-        
         text = (
             "✅ Your report has been successfully submitted and will be reviewed by admin.\n\n"
             f"**Report ID:** `{new_report_id}`\n"
@@ -786,9 +795,6 @@ async def submit_report(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
             text="Sorry, an error occurred while saving your report.",
             reply_markup=None
         )
-    finally:
-        if conn:
-            conn.close()
             
     context.user_data.clear()
         
@@ -842,24 +848,32 @@ async def ask_add_social(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     )
     return config.ADD_SOCIAL
 
+def _add_evidence(context: ContextTypes.DEFAULT_TYPE, item: str):
+    """Simpan maklumat tambahan (teks untuk additional_info + identifier ternormal)."""
+    report_data = context.user_data['report_data']
+    report_data['additional_evidence'].append(item)
+    parsed = parse_evidence_item(item)
+    if parsed:
+        report_data.setdefault('additional_identifiers', []).append(parsed)
+
 async def get_add_phone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     await update.message.delete()
     data = update.message.text
-    context.user_data['report_data']['additional_evidence'].append(f"Telefon: {data}")
+    _add_evidence(context, f"Telefon: {data}")
     logger.info(f"Maklumat tambahan ditambah: {data}")
     return await _return_to_confirmation(update, context)
 
 async def get_add_bank(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     await update.message.delete()
     data = update.message.text
-    context.user_data['report_data']['additional_evidence'].append(f"Bank: {data}")
+    _add_evidence(context, f"Bank: {data}")
     logger.info(f"Maklumat tambahan ditambah: {data}")
     return await _return_to_confirmation(update, context)
 
 async def get_add_social(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     await update.message.delete()
     data = update.message.text
-    context.user_data['report_data']['additional_evidence'].append(f"Sosial: {data}")
+    _add_evidence(context, f"Sosial: {data}")
     logger.info(f"Maklumat tambahan ditambah: {data}")
     return await _return_to_confirmation(update, context)
 
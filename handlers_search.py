@@ -1,30 +1,51 @@
 # handlers_search.py
 import logging
-import json
 import re
 import sqlite3
 from datetime import datetime
 from typing import Union, List, Dict, Any
 from telegram import (
     Update, InlineKeyboardButton, InlineKeyboardMarkup, 
-    InputMediaPhoto
+    InputMediaPhoto, Message
 )
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
 from telegram.helpers import escape_markdown
 
 # Import dari fail lain
 import asyncio
 import config
-from database import get_db_connection
+from database import get_db_connection, db_session
+import async_db
+from search_index import is_search_index_ready, match_expression
+from identifiers import (
+    REPORT_TYPE_KINDS, bank_details, canonical_bank, canonical_phone,
+    card_identifiers, identifier_candidates
+)
 from bot_utils import _safe_edit_message, _safe_delete_message, _format_confirmation_message
 from image_generator import generate_profile_image
+from card_cache import (
+    card_cache_key, card_entity_key, get_cached_card,
+    save_card_png, save_card_file_id, forget_card_file_id
+)
 from handlers_general import start # Perlu untuk 'cancel'
-from semakmule_apiv2 import semakmule_lookup
+from semakmule_apiv2 import semakmule_lookup_async, semakmule_metrics
+from semakmule_cache import (
+    get_semakmule_cache, save_semakmule_result, purge_semakmule_cache, semakmule_memory_cache_stats
+)
 from truecaller_api import TruecallerAPI
-from truecaller_db import get_truecaller_cache, save_truecaller_result
-from social_tracker import parse_social_url, SocialTracker
+from truecaller_db import (
+    get_truecaller_cache, save_truecaller_result, purge_truecaller_cache, truecaller_memory_cache_stats
+)
+from social_tracker import parse_social_url, platform_key, SocialTracker
 from rate_limit import rate_limit_check, rate_limit_increment
+from singleflight import upstream_flights
+from upstream_quota import truecaller_quota, semakmule_quota, quota_metrics
+from qr_utils import decode_qr_codes_async
+from qr_cache import get_qr_cache, save_qr_result, purge_qr_cache, qr_memory_cache_stats
+from duitnow_parser import parse_duitnow_qr
+from social_recheck import record_username_change
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -72,30 +93,47 @@ def _detect_social_media(term: str) -> Optional[Dict]:
     return None
 
 
-def _find_by_platform_user_id(platform_user_id: str, platform: str) -> List[Dict]:
-    """Search profile_social_media by permanent platform_user_id."""
-    conn = get_db_connection()
+def _find_profiles_by_past_username(term: str) -> List[Dict[str, Any]]:
+    """
+    Profiles linked to any account that has ever used this handle
+    (social_username_history), including other profiles sharing the same
+    platform_user_id. Each row carries matched_username / current_username.
+    """
+    social_parse = _detect_social_media(term)
+    if social_parse:
+        username = social_parse.get('username') or ''
+        platform = social_parse.get('platform')
+    elif ' ' not in term.strip():
+        username, platform = term.strip().lstrip('@'), 'unknown'
+    else:
+        return []
+    if not username:
+        return []
+
+    platform_filter, params = "", [username]
+    if platform and platform != 'unknown':
+        platform_filter = "AND ps.platform_key = ?"
+        params.append(platform_key(platform))
+
+    query = f"""
+    SELECT p.*, h.username AS matched_username, cur.extracted_username AS current_username,
+           cur.platform_user_id, cur.platform_name
+    FROM social_username_history h
+    JOIN profile_social_media ps ON ps.social_id = h.social_id
+    JOIN profile_social_media cur
+      ON cur.social_id = ps.social_id
+      OR (ps.platform_user_id IS NOT NULL AND cur.platform_user_id = ps.platform_user_id
+          AND cur.platform_key = ps.platform_key)
+    JOIN profiles p ON p.profile_id = cur.profile_id
+    WHERE LOWER(h.username) = LOWER(?) {platform_filter}
+    """
     try:
-        cursor = conn.cursor()
-        # Normalize platform variants
-        platform_variants = [platform.lower(), platform.capitalize(), platform.upper()]
-        if platform.lower() in ('instagram', 'threads'):
-            platform_variants.extend(['instagram', 'Instagram', 'threads', 'Threads'])
-        placeholders = ','.join(['?'] * len(platform_variants))
-        cursor.execute(f"""
-            SELECT p.*, ps.platform_user_id, ps.extracted_username, ps.display_name AS social_display_name,
-                   ps.platform_name, ps.url AS social_url
-            FROM profiles p
-            JOIN profile_social_media ps ON p.profile_id = ps.profile_id
-            WHERE ps.platform_user_id = ? AND LOWER(ps.platform_name) IN ({','.join(['?' for _ in platform_variants])})
-        """, (platform_user_id, *[v.lower() for v in platform_variants]))
-        results = cursor.fetchall()
-        return [{key: row[key] for key in row.keys()} for row in results]
+        with db_session() as conn:
+            results = conn.execute(query, params).fetchall()
+        return _merge_unique([{key: row[key] for key in row.keys()} for row in results], [], "profile_id")
     except sqlite3.Error as e:
-        logger.error(f"Error searching by platform_user_id: {e}")
+        logger.error(f"Error DB semasa cari username lama: {e}")
         return []
-    finally:
-        conn.close()
 
 
 async def search_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -133,39 +171,199 @@ async def search_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     
     return config.SEARCH_TERM
 
+def _merge_unique(first: List[Dict[str, Any]], second: List[Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+    seen = set()
+    merged = []
+    for item in first + second:
+        if item[key] not in seen:
+            seen.add(item[key])
+            merged.append(item)
+    return merged
+
+def _identifier_filter(term: str):
+    """WHERE fragment + params for exact report_identifiers matches of a term."""
+    candidates = identifier_candidates(term)
+    if not candidates:
+        return None, []
+    clause = " OR ".join("(ri.kind = ? AND ri.canonical_value = ?)" for _ in candidates)
+    params = [value for pair in candidates for value in pair]
+    return f"({clause})", params
+
+def _find_profiles_by_identifier(term: str) -> List[Dict[str, Any]]:
+    """Exact match (any format, e.g. '+6012-345 6789') on identifiers of linked reports."""
+    clause, params = _identifier_filter(term)
+    if not clause:
+        return []
+    query = f"""
+    SELECT p.*
+    FROM profiles p
+    WHERE p.profile_id IN (
+        SELECT r.linked_profile_id
+        FROM report_identifiers ri
+        JOIN reports r ON r.report_id = ri.report_id
+        WHERE {clause}
+    )
+    """
+    try:
+        with db_session() as conn:
+            results = conn.execute(query, params).fetchall()
+        return [{key: row[key] for key in row.keys()} for row in results]
+    except sqlite3.Error as e:
+        logger.error(f"Error DB semasa cari profil ikut identifier: {e}")
+        return []
+
+def _find_reports_by_identifier(term: str) -> List[Dict[str, Any]]:
+    clause, params = _identifier_filter(term)
+    if not clause:
+        return []
+    query = f"""
+    SELECT r.*
+    FROM reports r
+    WHERE r.report_status = 'UNVERIFIED'
+      AND r.report_id IN (SELECT ri.report_id FROM report_identifiers ri WHERE {clause})
+    ORDER BY r.submitted_at DESC
+    """
+    try:
+        with db_session() as conn:
+            results = conn.execute(query, params).fetchall()
+        return [{key: row[key] for key in row.keys()} for row in results]
+    except sqlite3.Error as e:
+        logger.error(f"Error DB semasa cari laporan ikut identifier: {e}")
+        return []
+
 def _find_matching_profiles(term: str) -> List[Dict[str, Any]]:
+    exact = _find_profiles_by_identifier(term)
+    if is_search_index_ready() and match_expression(term):
+        return _merge_unique(exact, _find_matching_profiles_fts(term), "profile_id")
+    return _merge_unique(exact, _find_matching_profiles_like(term), "profile_id")
+
+def _find_matching_profiles_fts(term: str) -> List[Dict[str, Any]]:
+    name_match = match_expression(term)
+
+    # Satu MATCH per jadual FTS, digabung ikut profile_id (rank terbaik = bm25 terendah)
     query = """
     SELECT p.*
     FROM profiles p
-    LEFT JOIN profile_bank_accounts pb ON p.profile_id = pb.profile_id
-    LEFT JOIN profile_phone_numbers pp ON p.profile_id = pp.profile_id
-    LEFT JOIN profile_social_media ps ON p.profile_id = ps.profile_id
-    LEFT JOIN reports rp ON p.profile_id = rp.linked_profile_id
-    WHERE 
-        p.main_identifier LIKE ? OR
-        p.unconfirmed_names LIKE ? OR
-        pb.account_number LIKE ? OR
-        pb.holder_name LIKE ? OR
-        pp.phone_number LIKE ? OR
-        ps.url LIKE ? OR
-        rp.additional_info LIKE ?
-    GROUP BY p.profile_id
+    JOIN (
+        SELECT profile_id, MIN(rank) AS search_rank
+        FROM (
+            SELECT pr.profile_id, f.rank
+            FROM profiles_fts f JOIN profiles pr ON pr.rowid = f.rowid
+            WHERE profiles_fts MATCH ?
+
+            UNION ALL
+
+            SELECT pb.profile_id, f.rank
+            FROM bank_accounts_fts f JOIN profile_bank_accounts pb ON pb.account_id = f.rowid
+            WHERE bank_accounts_fts MATCH ?
+
+            UNION ALL
+
+            SELECT pp.profile_id, f.rank
+            FROM phone_numbers_fts f JOIN profile_phone_numbers pp ON pp.phone_id = f.rowid
+            WHERE phone_numbers_fts MATCH ?
+
+            UNION ALL
+
+            SELECT ps.profile_id, f.rank
+            FROM social_media_fts f JOIN profile_social_media ps ON ps.social_id = f.rowid
+            WHERE social_media_fts MATCH ?
+
+            UNION ALL
+
+            SELECT rp.linked_profile_id, f.rank
+            FROM reports_fts f JOIN reports rp ON rp.report_id = f.rowid
+            WHERE reports_fts MATCH ? AND rp.linked_profile_id IS NOT NULL
+        )
+        GROUP BY profile_id
+    ) hits ON hits.profile_id = p.profile_id
+    ORDER BY hits.search_rank
+    """
+    params = [name_match] * 4 + [match_expression(term, "additional_info")]
+    try:
+        with db_session() as conn:
+            results = conn.execute(query, params).fetchall()
+        return [{key: row[key] for key in row.keys()} for row in results]
+    except sqlite3.Error as e:
+        logger.error(f"Error DB semasa cari 'matching profiles': {e}")
+        return []
+
+# LIKE fallback: one indexed lookup per table, UNIONed on profile_id
+# (tests/test_search_plan.py checks the plan)
+PROFILES_LIKE_QUERY = """
+    SELECT p.*
+    FROM profiles p
+    WHERE p.profile_id IN (
+        SELECT profile_id FROM profiles
+        WHERE main_identifier LIKE ? OR unconfirmed_names LIKE ?
+
+        UNION
+
+        SELECT profile_id FROM profile_bank_accounts
+        WHERE account_number LIKE ? OR holder_name LIKE ?
+
+        UNION
+
+        SELECT profile_id FROM profile_phone_numbers
+        WHERE phone_number LIKE ?
+
+        UNION
+
+        SELECT profile_id FROM profile_social_media
+        WHERE url LIKE ?
+
+        UNION
+
+        -- > '' rather than IS NOT NULL: range search on idx_reports_linked_profile
+        SELECT linked_profile_id FROM reports
+        WHERE linked_profile_id > '' AND additional_info LIKE ?
+    )
+    """
+
+
+def _find_matching_profiles_like(term: str) -> List[Dict[str, Any]]:
+    """
+    Fallback bila FTS5 tiada: LIKE scan atas semua lajur.
+    Setiap jadual dicari berasingan dan digabung ikut profile_id (UNION),
+    supaya baris tidak berganda (banks x phones x socials x reports) untuk
+    profil yang ada banyak identifier.
     """
     like_term = f"%{term}%"
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute(query, [like_term] * 7)
-        #cursor.execute(query, (like_term, like_term, like_term, like_term, like_term, like_term))
-        results = cursor.fetchall()
+        with db_session() as conn:
+            results = conn.execute(PROFILES_LIKE_QUERY, [like_term] * 7).fetchall()
         return [{key: row[key] for key in row.keys()} for row in results]
     except sqlite3.Error as e:
         logger.error(f"Error DB semasa cari 'matching profiles': {e}")
         return []
-    finally:
-        conn.close()
 
 def _find_matching_reports(term: str) -> List[Dict[str, Any]]:
+    exact = _find_reports_by_identifier(term)
+    if is_search_index_ready() and match_expression(term):
+        return _merge_unique(exact, _find_matching_reports_fts(term), "report_id")
+    return _merge_unique(exact, _find_matching_reports_like(term), "report_id")
+
+def _find_matching_reports_fts(term: str) -> List[Dict[str, Any]]:
+    fts_match = match_expression(term)
+
+    query = """
+    SELECT r.*
+    FROM reports_fts f
+    JOIN reports r ON r.report_id = f.rowid
+    WHERE reports_fts MATCH ?
+      AND r.report_status = 'UNVERIFIED'
+    ORDER BY f.rank, r.submitted_at DESC
+    """
+    try:
+        with db_session() as conn:
+            results = conn.execute(query, (fts_match,)).fetchall()
+        return [{key: row[key] for key in row.keys()} for row in results]
+    except sqlite3.Error as e:
+        logger.error(f"Error DB semasa cari 'matching reports': {e}")
+        return []
+
+def _find_matching_reports_like(term: str) -> List[Dict[str, Any]]:
+    """Fallback bila FTS5 tiada: LIKE scan atas 7 lajur."""
     query = """
     SELECT *
     FROM reports
@@ -183,17 +381,365 @@ def _find_matching_reports(term: str) -> List[Dict[str, Any]]:
     ORDER BY submitted_at DESC
     """
     like_term = f"%{term}%"
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute(query, (like_term, like_term, like_term, like_term, like_term, like_term, like_term))
-        results = cursor.fetchall()
+        with db_session() as conn:
+            results = conn.execute(query, (like_term, like_term, like_term, like_term, like_term, like_term, like_term)).fetchall()
         return [{key: row[key] for key in row.keys()} for row in results]
     except sqlite3.Error as e:
         logger.error(f"Error DB semasa cari 'matching reports': {e}")
         return []
-    finally:
-        conn.close()
+
+def _sync_social_tracker_db(search_term: str, social_lookup_result: Dict) -> Optional[tuple]:
+    """Username-change check + auto-add to tracker (blocking DB work, run in a thread)."""
+    username_change_warning = None
+    pid = social_lookup_result.get('platform_user_id')
+    platform = social_lookup_result.get('platform')
+    if pid:
+        # Check for username change in DB
+        try:
+            conn_check = get_db_connection()
+            cursor_check = conn_check.cursor()
+            cursor_check.execute("""
+                SELECT social_id, extracted_username FROM profile_social_media
+                WHERE platform_user_id = ? AND platform_key = ?
+            """, (pid, platform_key(platform)))
+            current_username = social_lookup_result.get('username', '')
+            for db_row in cursor_check.fetchall():
+                if db_row['extracted_username'] and db_row['extracted_username'].lower() != current_username.lower():
+                    username_change_warning = (db_row['extracted_username'], current_username)
+                    # Auto-update username in DB (old handle kekal dalam social_username_history)
+                    record_username_change(cursor_check, db_row['social_id'], current_username)
+            conn_check.commit()
+            conn_check.close()
+        except Exception:
+            pass
+
+        # Auto-add to tracker if not already tracked
+        try:
+            conn_add = get_db_connection()
+            cursor_add = conn_add.cursor()
+            cursor_add.execute(
+                "SELECT social_id FROM profile_social_media WHERE platform_user_id = ? AND platform_key = ?",
+                (pid, platform_key(platform))
+            )
+            if not cursor_add.fetchone():
+                url_map = {
+                    'instagram': f'https://www.instagram.com/{social_lookup_result.get("username")}',
+                    'threads': f'https://www.threads.net/@{social_lookup_result.get("username")}',
+                    'tiktok': f'https://www.tiktok.com/@{social_lookup_result.get("username")}',
+                    'telegram': f'https://t.me/{social_lookup_result.get("username")}',
+                    'facebook': f'https://www.facebook.com/{social_lookup_result.get("username")}',
+                    'twitter': f'https://x.com/{social_lookup_result.get("username")}',
+                }
+                auto_url = url_map.get(platform, search_term)
+                cursor_add.execute("""
+                    INSERT INTO profile_social_media
+                        (profile_id, url, platform_name, extracted_username, platform_user_id,
+                         display_name, profile_pic_url, report_count, lookup_status, last_checked_at)
+                    VALUES ('__manual__', ?, ?, ?, ?, ?, ?, 0, 'success', CURRENT_TIMESTAMP)
+                """, (auto_url, platform.capitalize(), social_lookup_result.get('username'),
+                      pid, social_lookup_result.get('display_name'),
+                      social_lookup_result.get('profile_pic_url')))
+                conn_add.commit()
+                logger.info(f"[SocialTracker] Auto-added @{social_lookup_result.get('username')} ({platform}) to tracker")
+            conn_add.close()
+        except Exception as e:
+            logger.warning(f"[SocialTracker] Auto-add failed: {e}")
+
+    return username_change_warning
+
+
+async def _social_tracker_source(search_term: str, social_parse: Dict) -> Dict:
+    tracker = SocialTracker()
+    username, platform = social_parse['username'], social_parse['platform']
+    try:
+        social_lookup_result, _shared = await upstream_flights.do(
+            ('social_tracker', platform, (username or '').lower()),
+            lambda: asyncio.to_thread(tracker.lookup, username, platform)
+        )
+    except Exception as e:
+        logger.error(f"SocialTracker lookup failed: {e}")
+        social_lookup_result = {'status': 'error', 'message': str(e)}
+
+    username_change_warning = None
+    if social_lookup_result and social_lookup_result.get('status') == 'success':
+        username_change_warning = await async_db.run(
+            _sync_social_tracker_db, search_term, social_lookup_result
+        )
+
+    return {'result': social_lookup_result, 'username_change_warning': username_change_warning}
+
+
+async def _semakmule_live_lookup(search_type: str, keyword: str, priority: bool = False) -> Dict:
+    # Token diambil dalam flight: caller yang join flight sama tak guna quota
+    if not await semakmule_quota.acquire(priority=priority, timeout=config.QUOTA_WAIT_SECONDS):
+        return {
+            'ok': False, 'status': 'quota_exceeded', 'category': search_type, 'keyword': keyword,
+            'message': 'SemakMule quota exhausted, try again later.'
+        }
+    result = await semakmule_lookup_async(search_type, keyword)
+    await async_db.run(save_semakmule_result, search_type, keyword, result)
+    return result
+
+
+async def _semakmule_source(search_type: str, search_term: str, force: bool = False,
+                            priority: bool = False) -> Dict:
+    normalize = canonical_phone if search_type == "phone" else canonical_bank
+    keyword = normalize(search_term)
+
+    if not force:
+        cached = await async_db.run(get_semakmule_cache, search_type, keyword)
+        if cached:
+            return cached
+
+    result, _shared = await upstream_flights.do(
+        ('semakmule', search_type, keyword),
+        lambda: _semakmule_live_lookup(search_type, keyword, priority or force)
+    )
+    return result
+
+
+def _format_age(seconds: int) -> str:
+    """Age of cached data for captions ('just now', '5m ago', '3h ago', '2d ago')."""
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{seconds // 60}m ago"
+    if seconds < 86400:
+        return f"{seconds // 3600}h ago"
+    return f"{seconds // 86400}d ago"
+
+
+async def _refresh_truecaller_cache(phone: str, user_id: int) -> Dict:
+    """
+    Background refresh. Shares the ('truecaller', phone) flight with live
+    lookups, so it always returns a result dict for searches that join it.
+    """
+    # Refresh latar belakang tak menunggu quota; cache lama masih dipakai
+    if not await truecaller_quota.acquire():
+        return {
+            'status': 'rate_limited',
+            'message': "Truecaller lookups are busy right now, please try again in a few minutes."
+        }
+    try:
+        result = await TruecallerAPI().lookup(phone)
+        if result.get('status') in ('success', 'no_data'):
+            await async_db.run(save_truecaller_result, phone, result, user_id)
+        return result
+    except Exception as e:
+        logger.warning(f"Truecaller background refresh failed for {phone}: {e}")
+        return {'status': 'error', 'message': f'Truecaller check failed: {str(e)}'}
+
+
+def _schedule_truecaller_refresh(phone: str, user_id: int):
+    """Refresh a stale cache row once; not counted against the user's rate limit."""
+    upstream_flights.start(('truecaller', phone), lambda: _refresh_truecaller_cache(phone, user_id))
+
+
+async def _truecaller_live_lookup(phone: str, user_id: int) -> Dict:
+    """One live lookup, charged to user_id (the caller that started the flight)."""
+    # Token diambil dalam flight: caller yang join flight sama tak guna quota
+    if not await truecaller_quota.acquire(
+        priority=user_id in config.ADMIN_USER_IDS, timeout=config.QUOTA_WAIT_SECONDS
+    ):
+        return {
+            'status': 'rate_limited',
+            'message': "Truecaller lookups are busy right now, please try again in a few minutes."
+        }
+
+    api = TruecallerAPI()
+    logger.info(f"[DEBUG] TruecallerAPI initialized, calling lookup...")
+    result = await api.lookup(phone)
+    logger.info(f"[DEBUG] Lookup completed, result status: {result.get('status')}")
+
+    # Save to DB (found or no_data, negative TTL) + increment rate limit
+    if result.get('status') in ('success', 'no_data'):
+        await async_db.run(save_truecaller_result, phone, result, user_id)
+        await async_db.run(rate_limit_increment, user_id)
+    return result
+
+
+async def purge_lookup_caches_job(context: ContextTypes.DEFAULT_TYPE):
+    """JobQueue callback: drop expired Truecaller / SemakMule / QR decode cache rows."""
+    try:
+        await async_db.run(purge_truecaller_cache)
+        await async_db.run(purge_semakmule_cache)
+        await async_db.run(purge_qr_cache)
+        logger.info(f"Truecaller memory cache: {truecaller_memory_cache_stats()}")
+        logger.info(f"SemakMule memory cache: {semakmule_memory_cache_stats()}")
+        logger.info(f"QR decode memory cache: {qr_memory_cache_stats()}")
+        logger.info(f"SemakMule API: {semakmule_metrics()}")
+        logger.info(f"Upstream quota: {quota_metrics()}")
+    except Exception as e:
+        logger.error(f"Error in purge_lookup_caches_job: {e}")
+
+
+async def _truecaller_source(search_term: str, user_id: int) -> Optional[Dict]:
+    truecaller_result = None
+
+    # Sanitize phone number
+    sanitized_phone = _sanitize_phone_number(search_term)
+    logger.info(f"[DEBUG] Sanitized phone: {sanitized_phone}")
+
+    # Check cache first
+    logger.info(f"[DEBUG] Checking cache for: {sanitized_phone}")
+    cached = await async_db.run(get_truecaller_cache, sanitized_phone)
+    logger.info(f"[DEBUG] Cache result: {cached}")
+
+    if cached:
+        logger.info(f"[DEBUG] Using cached result")
+        truecaller_result = cached
+        if cached.get('stale'):
+            # Stale-while-revalidate: jawab dengan cache, refresh di belakang
+            _schedule_truecaller_refresh(sanitized_phone, user_id)
+    else:
+        # Check if phone number already exists in local reports DB
+        # If it does, skip live Truecaller lookup to save rate limit
+        phone_in_reports = False
+        try:
+            phone_in_reports = await async_db.fetch_one(
+                "SELECT 1 FROM report_identifiers WHERE kind = 'phone' AND canonical_value = ? LIMIT 1",
+                (canonical_phone(sanitized_phone),)
+            ) is not None
+        except Exception:
+            pass
+
+        if phone_in_reports:
+            logger.info(f"[DEBUG] Phone {sanitized_phone} already in reports DB, skipping live Truecaller lookup")
+            truecaller_result = {
+                'status': 'skipped',
+                'message': 'API call not initiated to conserve resources.'
+            }
+        else:
+            flight_key = ('truecaller', sanitized_phone)
+            # Joining someone else's in-flight lookup is free; only a new lookup is rate limited
+            allowed, limit_msg = (True, None)
+            if not upstream_flights.in_flight(flight_key):
+                allowed, limit_msg = await async_db.run(rate_limit_check, user_id)
+                if not allowed and upstream_flights.in_flight(flight_key):
+                    # Someone else started it while we checked
+                    allowed, limit_msg = (True, None)
+            if not allowed:
+                truecaller_result = {
+                    'status': 'rate_limited',
+                    'message': limit_msg
+                }
+            else:
+                # Do fresh lookup — this is a truly unknown number
+                logger.info(f"[DEBUG] No cache & not in reports, doing fresh Truecaller lookup")
+                try:
+                    truecaller_result, _shared = await upstream_flights.do(
+                        flight_key, lambda: _truecaller_live_lookup(sanitized_phone, user_id)
+                    )
+
+                except Exception as e:
+                    # Failed lookups do NOT count towards rate limit
+                    logger.error(f"Truecaller lookup failed: {e}")
+                    logger.error(f"[DEBUG] Exception details:", exc_info=True)
+                    truecaller_result = {
+                        'status': 'error',
+                        'message': f'Truecaller check failed: {str(e)}'
+                    }
+
+    logger.info(f"[DEBUG] Final truecaller_result: {truecaller_result}")
+    return truecaller_result
+
+
+# Placeholder results when a source misses its own timeout / the total deadline
+SOURCE_TIMEOUT_RESULTS = {
+    'semakmule': {'ok': False, 'status': 'timeout'},
+    'truecaller': {'status': 'timeout', 'message': 'Truecaller did not respond in time.'},
+    'social_tracker': {'result': {'status': 'timeout', 'message': 'Lookup timed out.'}, 'username_change_warning': None},
+}
+SOURCE_ERROR_RESULTS = {
+    'semakmule': {'ok': False, 'status': 'error'},
+    'truecaller': {'status': 'error', 'message': 'Truecaller check failed.'},
+    'social_tracker': {'result': {'status': 'error', 'message': 'Lookup failed.'}, 'username_change_warning': None},
+}
+SOURCE_PENDING_RESULTS = {
+    'semakmule': {'ok': False, 'status': 'pending'},
+    'truecaller': {'status': 'pending', 'message': 'Truecaller check still in progress.'},
+    'social_tracker': {'result': {'status': 'pending', 'message': 'Lookup still in progress.'}, 'username_change_warning': None},
+}
+
+
+# Sources left running after the deadline (the loop only keeps weak references)
+_background_sources = set()
+
+
+def _log_background_source(name: str):
+    def _done(task: asyncio.Task):
+        _background_sources.discard(task)
+        if task.cancelled():
+            return
+        if task.exception():
+            logger.warning(f"[Search] {name} failed after deadline: {task.exception()}")
+        else:
+            logger.info(f"[Search] {name} completed after deadline.")
+    return _done
+
+
+async def _run_source(name: str, coro, timeout: float):
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"[Search] {name} timed out after {timeout}s")
+        return SOURCE_TIMEOUT_RESULTS[name]
+    except Exception as e:
+        # One broken source must not take the whole search reply down
+        logger.error(f"[Search] {name} failed: {e}", exc_info=True)
+        return SOURCE_ERROR_RESULTS[name]
+
+
+async def _lookup_sources(search_term: str, search_type: Optional[str], user_id: int) -> Dict:
+    """
+    Run every applicable external source concurrently, each under its own
+    timeout. Sources still running at SEARCH_TOTAL_DEADLINE_SECONDS are
+    reported as 'pending' and left to finish in the background (their
+    caches are still filled for the next search).
+    """
+    sources = {}
+    if search_type in ("phone", "bank"):
+        sources['semakmule'] = _run_source(
+            'semakmule', _semakmule_source(search_type, search_term, priority=user_id in config.ADMIN_USER_IDS),
+            config.SEMAKMULE_TIMEOUT_SECONDS
+        )
+
+    social_parse = _detect_social_media(search_term)
+    if social_parse and social_parse.get('platform') != 'unknown':
+        sources['social_tracker'] = _run_source(
+            'social_tracker', _social_tracker_source(search_term, social_parse),
+            config.SOCIAL_TRACKER_TIMEOUT_SECONDS
+        )
+
+    logger.info(f"[DEBUG] search_type = {search_type}, search_term = {search_term}")
+    if search_type == "phone":
+        sources['truecaller'] = _run_source(
+            'truecaller', _truecaller_source(search_term, user_id),
+            config.TRUECALLER_TIMEOUT_SECONDS
+        )
+
+    results = {}
+    if sources:
+        tasks = {name: asyncio.create_task(coro) for name, coro in sources.items()}
+        await asyncio.wait(tasks.values(), timeout=config.SEARCH_TOTAL_DEADLINE_SECONDS)
+        for name, task in tasks.items():
+            if task.done():
+                results[name] = task.result()
+            else:
+                logger.warning(f"[Search] {name} still running at search deadline, reply sent without it")
+                _background_sources.add(task)
+                task.add_done_callback(_log_background_source(name))
+                results[name] = SOURCE_PENDING_RESULTS[name]
+
+    social = results.get('social_tracker') or {}
+    return {
+        'semakmule': results.get('semakmule'),
+        'truecaller': results.get('truecaller'),
+        'social_tracker': social.get('result'),
+        'username_change_warning': social.get('username_change_warning'),
+    }
+
 
 async def search_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     try:
@@ -229,202 +775,65 @@ async def search_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         reply_markup=None,
         parse_mode=ParseMode.MARKDOWN
     )
-    
-    # === Detect & call SemakMule FIRST ===
-    search_type = _detect_search_type(search_term)
-    
-    log_type = search_type if search_type else "mixed"
-    
-    conn = get_db_connection()
-    
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO search_logs (query, search_type, ip_address) VALUES (?, ?, ?)", 
-            (search_term, log_type, f"Telegram:{user_id}")
-        )
-        conn.commit()
-    except Exception as e:
-        logger.error(f"Search logging failed: {e}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
-    
-    semakmule_result = None
 
+    return await _run_search(update, context, [search_term])
 
-    if search_type in ("phone", "bank"):
-        semakmule_result = semakmule_lookup(search_type, search_term)
 
-    context.user_data["semakmule"] = semakmule_result
+# Local DB searches run for every search term
+LOCAL_SEARCHES = (_find_profiles_by_past_username, _find_matching_profiles, _find_matching_reports)
 
-    # === Social Media ID Tracking ===
-    social_parse = _detect_social_media(search_term)
-    social_lookup_result = None
-    username_change_warning = None
 
-    if social_parse and social_parse.get('platform') != 'unknown':
-        tracker = SocialTracker()
+async def _run_search(update: Update, context: ContextTypes.DEFAULT_TYPE, search_terms: List[str],
+                      summary: Optional[str] = None) -> int:
+    """
+    Full search pipeline. External sources run on the first term; every
+    term is searched in the local DB, all concurrently, and results are
+    merged. `summary` (e.g. the decoded QR) is shown above the results.
+    """
+    search_term = search_terms[0]
+    prompt_id = context.user_data.get('prompt_message_id')
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
+
+    # === Detect search type ===
+    search_type = _detect_search_type(search_term)
+
+    for term in search_terms:
+        term_type = _detect_search_type(term)
+        log_type = term_type if term_type else "mixed"
         try:
-            social_lookup_result = await asyncio.to_thread(
-                tracker.lookup, social_parse['username'], social_parse['platform']
+            await async_db.execute(
+                "INSERT INTO search_logs (query, search_type, ip_address) VALUES (?, ?, ?)",
+                (term, log_type, f"Telegram:{user_id}")
             )
         except Exception as e:
-            logger.error(f"SocialTracker lookup failed: {e}")
-            social_lookup_result = {'status': 'error', 'message': str(e)}
-
-        if social_lookup_result and social_lookup_result.get('status') == 'success':
-            pid = social_lookup_result.get('platform_user_id')
-            platform = social_lookup_result.get('platform')
-            if pid:
-                # Check for username change in DB
-                try:
-                    conn_check = get_db_connection()
-                    cursor_check = conn_check.cursor()
-                    cursor_check.execute("""
-                        SELECT extracted_username FROM profile_social_media
-                        WHERE platform_user_id = ? AND LOWER(platform_name) = LOWER(?)
-                    """, (pid, platform))
-                    db_row = cursor_check.fetchone()
-                    if db_row and db_row['extracted_username']:
-                        current_username = social_lookup_result.get('username', '')
-                        if db_row['extracted_username'].lower() != current_username.lower():
-                            username_change_warning = (db_row['extracted_username'], current_username)
-                            # Auto-update username in DB
-                            cursor_check.execute("""
-                                UPDATE profile_social_media
-                                SET extracted_username = ?, last_checked_at = CURRENT_TIMESTAMP
-                                WHERE platform_user_id = ? AND LOWER(platform_name) = LOWER(?)
-                            """, (current_username, pid, platform))
-                            conn_check.commit()
-                    conn_check.close()
-                except Exception:
-                    pass
-
-                # Search by permanent platform_user_id
-                pid_matches = _find_by_platform_user_id(pid, platform)
-                if pid_matches:
-                    # Add these as profile results (avoid duplicates)
-                    existing_pids = {p.get('profile_id') for _, p in [] if True}
-                    for m in pid_matches:
-                        if m.get('profile_id') not in [p.get('profile_id') for _, p in []]:
-                            pass  # Will be found by normal profile search too
-
-                # Auto-add to tracker if not already tracked
-                try:
-                    conn_add = get_db_connection()
-                    cursor_add = conn_add.cursor()
-                    cursor_add.execute(
-                        "SELECT social_id FROM profile_social_media WHERE platform_user_id = ? AND LOWER(platform_name) = LOWER(?)",
-                        (pid, platform)
-                    )
-                    if not cursor_add.fetchone():
-                        url_map = {
-                            'instagram': f'https://www.instagram.com/{social_lookup_result.get("username")}',
-                            'threads': f'https://www.threads.net/@{social_lookup_result.get("username")}',
-                            'tiktok': f'https://www.tiktok.com/@{social_lookup_result.get("username")}',
-                            'telegram': f'https://t.me/{social_lookup_result.get("username")}',
-                            'facebook': f'https://www.facebook.com/{social_lookup_result.get("username")}',
-                            'twitter': f'https://x.com/{social_lookup_result.get("username")}',
-                        }
-                        auto_url = url_map.get(platform, search_term)
-                        cursor_add.execute("""
-                            INSERT INTO profile_social_media
-                                (profile_id, url, platform_name, extracted_username, platform_user_id,
-                                 display_name, profile_pic_url, report_count, lookup_status, last_checked_at)
-                            VALUES ('__manual__', ?, ?, ?, ?, ?, ?, 0, 'success', CURRENT_TIMESTAMP)
-                        """, (auto_url, platform.capitalize(), social_lookup_result.get('username'),
-                              pid, social_lookup_result.get('display_name'),
-                              social_lookup_result.get('profile_pic_url')))
-                        conn_add.commit()
-                        logger.info(f"[SocialTracker] Auto-added @{social_lookup_result.get('username')} ({platform}) to tracker")
-                    conn_add.close()
-                except Exception as e:
-                    logger.warning(f"[SocialTracker] Auto-add failed: {e}")
+            logger.error(f"Search logging failed: {e}")
 
-    context.user_data["social_tracker"] = social_lookup_result
+    # === External sources + local DB search (setiap term), all concurrently ===
+    lookups, *local_results = await asyncio.gather(
+        _lookup_sources(search_term, search_type, user_id),
+        *(async_db.run(search, term) for term in search_terms for search in LOCAL_SEARCHES),
+    )
+    past_handle_profiles, matching_profiles, matching_reports = [], [], []
+    for i in range(0, len(local_results), len(LOCAL_SEARCHES)):
+        past, profiles, reports = local_results[i:i + len(LOCAL_SEARCHES)]
+        past_handle_profiles = _merge_unique(past_handle_profiles, past, "profile_id")
+        matching_profiles = _merge_unique(matching_profiles, profiles, "profile_id")
+        matching_reports = _merge_unique(matching_reports, reports, "report_id")
+    matching_profiles = _merge_unique(past_handle_profiles, matching_profiles, "profile_id")
+
+    username_change_warning = lookups["username_change_warning"]
+    if not username_change_warning:
+        # Cari guna username lama -> tunjuk username semasa
+        for p in past_handle_profiles:
+            if p.get('current_username') and p['matched_username'].lower() != p['current_username'].lower():
+                username_change_warning = (p['matched_username'], p['current_username'])
+                break
+
+    context.user_data["semakmule"] = lookups["semakmule"]
+    context.user_data["social_tracker"] = lookups["social_tracker"]
     context.user_data["username_change_warning"] = username_change_warning
-
-    # === Truecaller Check (for phone numbers only) ===
-    truecaller_result = None
-
-    logger.info(f"[DEBUG] search_type = {search_type}, search_term = {search_term}")
-
-    if search_type == "phone":
-        logger.info(f"[DEBUG] Entering Truecaller check for phone: {search_term}")
-        # Sanitize phone number
-        sanitized_phone = _sanitize_phone_number(search_term)
-        logger.info(f"[DEBUG] Sanitized phone: {sanitized_phone}")
-
-        # Check cache first
-        logger.info(f"[DEBUG] Checking cache for: {sanitized_phone}")
-        cached = get_truecaller_cache(sanitized_phone)
-        logger.info(f"[DEBUG] Cache result: {cached}")
-
-        if cached:
-            logger.info(f"[DEBUG] Using cached result")
-            truecaller_result = cached
-        else:
-            # Check if phone number already exists in local reports DB
-            # If it does, skip live Truecaller lookup to save rate limit
-            phone_in_reports = False
-            try:
-                rconn = get_db_connection()
-                rcursor = rconn.cursor()
-                rcursor.execute(
-                    "SELECT 1 FROM reports WHERE against_phone_number = ? LIMIT 1",
-                    (sanitized_phone,)
-                )
-                phone_in_reports = rcursor.fetchone() is not None
-                rconn.close()
-            except Exception:
-                pass
-
-            if phone_in_reports:
-                logger.info(f"[DEBUG] Phone {sanitized_phone} already in reports DB, skipping live Truecaller lookup")
-                truecaller_result = {
-                    'status': 'skipped',
-                    'message': 'API call not initiated to conserve resources.'
-                }
-            else:
-                # Check rate limit before live lookup
-                allowed, limit_msg = rate_limit_check(user_id)
-                if not allowed:
-                    truecaller_result = {
-                        'status': 'rate_limited',
-                        'message': limit_msg
-                    }
-                else:
-                    # Do fresh lookup — this is a truly unknown number
-                    logger.info(f"[DEBUG] No cache & not in reports, doing fresh Truecaller lookup")
-                    try:
-                        api = TruecallerAPI()
-                        logger.info(f"[DEBUG] TruecallerAPI initialized, calling lookup...")
-                        truecaller_result = await api.lookup(sanitized_phone)
-                        logger.info(f"[DEBUG] Lookup completed, result status: {truecaller_result.get('status')}")
-
-                        # Save to DB if successful + increment rate limit
-                        if truecaller_result.get('status') == 'success' and truecaller_result.get('name'):
-                            save_truecaller_result(sanitized_phone, truecaller_result, user_id)
-                            rate_limit_increment(user_id)
-                        elif truecaller_result.get('status') in ('success', 'no_data'):
-                            # Count successful lookups even without name
-                            rate_limit_increment(user_id)
-
-                    except Exception as e:
-                        # Failed lookups do NOT count towards rate limit
-                        logger.error(f"Truecaller lookup failed: {e}")
-                        logger.error(f"[DEBUG] Exception details:", exc_info=True)
-                        truecaller_result = {
-                            'status': 'error',
-                            'message': f'Truecaller check failed: {str(e)}'
-                        }
-
-    logger.info(f"[DEBUG] Final truecaller_result: {truecaller_result}")
-    context.user_data["truecaller"] = truecaller_result
-    
-    matching_profiles = _find_matching_profiles(search_term)
-    matching_reports = _find_matching_reports(search_term)
+    context.user_data["truecaller"] = lookups["truecaller"]
     
     all_results = []
     for profile in matching_profiles:
@@ -439,8 +848,9 @@ async def search_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         sem = context.user_data.get("semakmule")
         tc = context.user_data.get("truecaller")
 
-        text = (
-            f"No result found for: `{search_term}`.\n\n"
+        text = f"{summary}\n———\n\n" if summary else ""
+        text += (
+            f"No result found for: `{'`, `'.join(search_terms)}`.\n\n"
             "Please try using a different keyword or identifier."
         )
 
@@ -452,6 +862,13 @@ async def search_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                     f"Search Count     : {sem.get('search_count', 0)}\n"
                     f"Police Reports   : {sem.get('police_reports', 0)}"
                 )
+                if sem.get("from_cache"):
+                    text += f"\n_Data from {_format_age(sem.get('age_seconds', 0))}_"
+            elif sem.get("status") == "pending":
+                text += (
+                    "**SemakMule Check Result**\n"
+                    "Check still in progress. Please search again shortly."
+                )
             else:
                 text += (
                     "**SemakMule Check Result**\n"
@@ -491,6 +908,11 @@ async def search_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                     text += f"Telco: {tc.get('carrier')}"
                 else:
                     text += "Telco: -"
+            elif tc.get('status') == 'no_data':
+                text += (
+                    "**Truecaller**\n"
+                    f"{tc.get('message', 'No record found on Truecaller.')}"
+                )
             elif tc.get('status') == 'rate_limited':
                 text += (
                     "**Truecaller**\n"
@@ -506,6 +928,11 @@ async def search_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                     "**Truecaller**\n"
                     f"{tc.get('message', 'Check failed')}"
                 )
+            elif tc.get('status') in ('pending', 'timeout'):
+                text += (
+                    "**Truecaller**\n"
+                    f"{tc.get('message', 'Not available yet')}"
+                )
 
         # Social Media ID Tracker
         st = context.user_data.get("social_tracker")
@@ -522,7 +949,7 @@ async def search_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 text += "Account not found on this platform.\n"
             elif st.get('status') == 'no_session':
                 text += f"{st.get('message', 'No session configured for this platform')}\n"
-            elif st.get('status') == 'error':
+            elif st.get('status') in ('error', 'pending', 'timeout'):
                 text += f"{st.get('message', 'Lookup failed')}\n"
 
         ucw = context.user_data.get("username_change_warning")
@@ -546,6 +973,8 @@ async def search_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     context.user_data['search_results'] = all_results
     context.user_data['search_page'] = 0
     context.user_data['search_term'] = search_term
+    context.user_data['search_type'] = search_type
+    context.user_data['search_summary'] = summary
 
     
     await _safe_delete_message(context, chat_id, prompt_id)
@@ -553,66 +982,119 @@ async def search_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     return await _send_search_result_page(update, context, new_message=True)
 
 
-async def _send_search_result_page(update: Update, context: ContextTypes.DEFAULT_TYPE, new_message: bool = False) -> int:
-    results = context.user_data.get('search_results', [])
-    page = context.user_data.get('search_page', 0)
-    search_term = context.user_data.get('search_term', '')
-    
-    total_results = len(results)
-    if not results or page >= total_results:
-        return ConversationHandler.END
+def _load_card_data(result_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Data rendered into a result card (primary identifiers + additional identifiers)."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
 
-    result_type, data = results[page]
-    
-    template_file = config.VERIFIED_CARD_TEMPLATE if result_type == "profile" else config.UNVERIFIED_CARD_TEMPLATE
-    
     if result_type == "profile":
         profile_id = data["profile_id"]
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
         cursor.execute("""
             SELECT
               MAX(against_phone_number) AS against_phone_number,
               MAX(against_bank_number)  AS against_bank_number,
-              MAX(against_social_url)   AS against_social_url,
-              MAX(NULLIF(additional_info, '[]'))    AS additional_info
+              MAX(against_social_url)   AS against_social_url
             FROM reports
             WHERE linked_profile_id = ?
         """, (profile_id,))
         row  = cursor.fetchone()
-        conn.close()
-
         primary = {key: row[key] for key in row.keys()} if row else {}
 
+        cursor.execute("""
+            SELECT ri.kind, MAX(ri.raw_value) AS raw_value, ri.canonical_value
+            FROM reports r
+            JOIN report_identifiers ri ON ri.report_id = r.report_id
+            WHERE r.linked_profile_id = ? AND ri.is_primary = 0
+            GROUP BY ri.kind, ri.canonical_value
+            ORDER BY MIN(ri.identifier_id)
+        """, (profile_id,))
+        identifier_rows = cursor.fetchall()
+
         data = {
             **data,  # profile fields
             # fields for HTML
             "against_phone_number": primary.get("against_phone_number"),
             "against_bank_number": primary.get("against_bank_number"),
             "against_social_url": primary.get("against_social_url"),
-            "additional_info": primary.get("additional_info"),
         }
+    else:
+        cursor.execute("""
+            SELECT kind, raw_value, canonical_value
+            FROM report_identifiers
+            WHERE report_id = ? AND is_primary = 0
+            ORDER BY identifier_id
+        """, (data["report_id"],))
+        identifier_rows = cursor.fetchall()
+
+    conn.close()
+
+    data = {
+        **data,
+        "additional_identifiers": card_identifiers(
+            identifier_rows, exclude_kind=REPORT_TYPE_KINDS.get(data.get("report_against_type"))
+        ),
+    }
+
+    return data
+
+
+# BadRequest texts meaning the cached file_id itself is unusable
+FILE_ID_REJECTED_HINTS = ("file identifier", "file reference", "file_id", "media_empty", "wrong type of the web page")
 
+
+def _file_id_rejected(error: Exception) -> bool:
+    """True for a BadRequest rejecting the media (not e.g. 'message is not modified')."""
+    message = str(error).lower()
+    return isinstance(error, BadRequest) and any(hint in message for hint in FILE_ID_REJECTED_HINTS)
+
+
+async def _send_search_result_page(update: Update, context: ContextTypes.DEFAULT_TYPE, new_message: bool = False) -> int:
+    results = context.user_data.get('search_results', [])
+    page = context.user_data.get('search_page', 0)
+    search_term = context.user_data.get('search_term', '')
     
-    image_bytes = await generate_profile_image(template_file, data) # Guna dari image_generator
+    total_results = len(results)
+    if not results or page >= total_results:
+        return ConversationHandler.END
+
+    result_type, data = results[page]
     
-    if not image_bytes:
-        await context.bot.send_message(
-            chat_id=update.effective_chat.id,
-            text="Error: Unable to generate image. Please try again.",
-            reply_markup=InlineKeyboardMarkup(
-                [[InlineKeyboardButton("⬅️ Back to Main Menu", callback_data="main_menu")]]
+    template_file = config.VERIFIED_CARD_TEMPLATE if result_type == "profile" else config.UNVERIFIED_CARD_TEMPLATE
+    
+    data = await async_db.run(_load_card_data, result_type, data)
+
+    # === Card cache: skip render (and upload) if this exact card was sent before ===
+    cache_key = card_cache_key(template_file, data)
+    cached_card = await async_db.run(get_cached_card, cache_key)
+
+    if cached_card and cached_card.get('file_id'):
+        photo = cached_card['file_id']
+    elif cached_card and cached_card.get('png'):
+        photo = cached_card['png']
+    else:
+        image_bytes = await generate_profile_image(template_file, data) # Guna dari image_generator
+
+        if not image_bytes:
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text="Error: Unable to generate image. Please try again.",
+                reply_markup=InlineKeyboardMarkup(
+                    [[InlineKeyboardButton("⬅️ Back to Main Menu", callback_data="main_menu")]]
+                )
             )
-        )
-        return ConversationHandler.END
+            return ConversationHandler.END
+
+        await async_db.run(save_card_png, cache_key, template_file, card_entity_key(result_type, data), image_bytes)
+        photo = image_bytes
 
     page_num = page + 1
 
     sem = context.user_data.get("semakmule")
     tc = context.user_data.get("truecaller")
-    caption = f"Search result for `{search_term}`\n"
+    summary = context.user_data.get("search_summary")
+    caption = f"{summary}\n" if summary else ""
+    caption += f"Search result for `{search_term}`\n"
 
     if sem:
         caption += "\n**SemakMule Check Result**\n"
@@ -621,6 +1103,10 @@ async def _send_search_result_page(update: Update, context: ContextTypes.DEFAULT
                 f"• Search Count     : {sem.get('search_count', 0)}\n"
                 f"• Police Reports   : {sem.get('police_reports', 0)}\n"
             )
+            if sem.get("from_cache"):
+                caption += f"• Data from {_format_age(sem.get('age_seconds', 0))}\n"
+        elif sem.get("status") == "pending":
+            caption += "• Check still in progress. Please search again shortly.\n"
         else:
             caption += (
                 "• Unable to retrieve data from SemakMule at the moment.\n"
@@ -653,11 +1139,13 @@ async def _send_search_result_page(update: Update, context: ContextTypes.DEFAULT
                 caption += f"• Telco: {tc.get('carrier')}\n"
             else:
                 caption += "• Telco: -\n"
+        elif tc.get('status') == 'no_data':
+            caption += f"• {tc.get('message', 'No record found on Truecaller.')}\n"
         elif tc.get('status') == 'rate_limited':
             caption += f"• {tc.get('message', 'Rate limit reached')}\n"
         elif tc.get('status') == 'skipped':
             caption += f"• {tc.get('message', 'Lookup skipped')}\n"
-        elif tc.get('status') == 'error':
+        elif tc.get('status') in ('error', 'pending', 'timeout'):
             caption += f"• {tc.get('message', 'Check failed')}\n"
 
     # Social Media ID Tracker
@@ -674,7 +1162,7 @@ async def _send_search_result_page(update: Update, context: ContextTypes.DEFAULT
             caption += "• Account not found on this platform.\n"
         elif st.get('status') == 'no_session':
             caption += f"• {st.get('message', 'No session configured')}\n"
-        elif st.get('status') == 'error':
+        elif st.get('status') in ('error', 'pending', 'timeout'):
             caption += f"• {st.get('message', 'Lookup failed')}\n"
 
     ucw = context.user_data.get("username_change_warning")
@@ -720,41 +1208,84 @@ async def _send_search_result_page(update: Update, context: ContextTypes.DEFAULT
              InlineKeyboardButton("View Report", callback_data=f"search_read_report_{report_id}")
         ])
 
+    if context.user_data.get("semakmule") is not None and update.effective_user.id in config.ADMIN_USER_IDS:
+        keyboard.append([
+            InlineKeyboardButton("🔄 Refresh SemakMule", callback_data="search_refresh_semakmule")
+        ])
+
     keyboard.append([InlineKeyboardButton("⬅️ Back to Main Menu", callback_data="main_menu_from_search")])
     reply_markup = InlineKeyboardMarkup(keyboard)
 
     chat_id = update.effective_chat.id
     
     if new_message:
-        msg = await context.bot.send_photo(
-            chat_id=chat_id,
-            photo=image_bytes,
-            caption=caption,
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=reply_markup
-        )
+        try:
+            msg = await context.bot.send_photo(
+                chat_id=chat_id,
+                photo=photo,
+                caption=caption,
+                parse_mode=ParseMode.MARKDOWN,
+                reply_markup=reply_markup
+            )
+        except BadRequest as e:
+            # Caption / parse-mode errors bukan salah file_id: jangan buang cache
+            if not isinstance(photo, str) or not _file_id_rejected(e):
+                raise
+            # file_id cache ditolak Telegram — upload semula PNG
+            logger.warning(f"Carian: file_id kad ditolak ({e}). Upload semula.")
+            await async_db.run(forget_card_file_id, cache_key)
+            return await _send_search_result_page(update, context, new_message=True)
+
         context.user_data['search_message_id'] = msg.message_id
+        if msg.photo:
+            await async_db.run(save_card_file_id, cache_key, msg.photo[-1].file_id)
     else:
         query = update.callback_query
         await query.answer()
         
-        media = InputMediaPhoto(media=image_bytes, caption=caption, parse_mode=ParseMode.MARKDOWN)
+        media = InputMediaPhoto(media=photo, caption=caption, parse_mode=ParseMode.MARKDOWN)
         msg_id = context.user_data.get('search_message_id')
         
         try:
-            await context.bot.edit_message_media(
+            msg = await context.bot.edit_message_media(
                 chat_id=chat_id,
                 message_id=msg_id,
                 media=media,
                 reply_markup=reply_markup
             )
+            if isinstance(msg, Message) and msg.photo:
+                await async_db.run(save_card_file_id, cache_key, msg.photo[-1].file_id)
         except Exception as e:
             logger.warning(f"Carian: 'Next/Prev' gagal: {e}. Hantar baru.")
+            # Hanya buang file_id bila Telegram tolak fail itu sendiri (bukan network / mesej dipadam)
+            if isinstance(photo, str) and _file_id_rejected(e):
+                await async_db.run(forget_card_file_id, cache_key)
             await _safe_delete_message(context, chat_id, msg_id)
             return await _send_search_result_page(update, context, new_message=True)
 
     return config.SEARCH_RESULTS
 
+async def search_refresh_semakmule(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Admin only: bypass the SemakMule cache for the current search and re-render the page."""
+    query = update.callback_query
+    if query.from_user.id not in config.ADMIN_USER_IDS:
+        await query.answer("Admin only.", show_alert=True)
+        return config.SEARCH_RESULTS
+
+    search_type = context.user_data.get('search_type')
+    search_term = context.user_data.get('search_term')
+    if search_type not in ("phone", "bank") or not search_term:
+        await query.answer("Nothing to refresh.")
+        return config.SEARCH_RESULTS
+
+    logger.info(f"Admin {query.from_user.id} force-refresh SemakMule for {search_term}")
+    context.user_data["semakmule"] = await _run_source(
+        'semakmule', _semakmule_source(search_type, search_term, force=True),
+        config.SEMAKMULE_TIMEOUT_SECONDS
+    )
+    return await _send_search_result_page(update, context)
+
+
 async def search_change_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     
@@ -779,22 +1310,19 @@ async def search_read_details(update: Update, context: ContextTypes.DEFAULT_TYPE
     action_type = data_parts[2]
     data_id = data_parts[3]
     
-    conn = get_db_connection()
     text = ""
     
     try:
-        cursor = conn.cursor()
         if action_type == "report":
-            cursor.execute("SELECT * FROM reports WHERE report_id = ?", (data_id,))
-            report = cursor.fetchone()
+            report = await async_db.fetch_one("SELECT * FROM reports WHERE report_id = ?", (data_id,))
             
             if not report:
                 text = "Error: Report not found."
                 await query.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
                 return None
 
-            cursor.execute("SELECT file_path FROM screenshots WHERE report_id = ?", (data_id,))
-            screenshots = [row['file_path'] for row in cursor.fetchall()]
+            screenshot_rows = await async_db.fetch_all("SELECT file_path FROM screenshots WHERE report_id = ?", (data_id,))
+            screenshots = [row['file_path'] for row in screenshot_rows]
 
             report_dict = {key: report[key] for key in report.keys()}
             report_dict['screenshots'] = screenshots
@@ -819,16 +1347,14 @@ async def search_read_details(update: Update, context: ContextTypes.DEFAULT_TYPE
             if search_msg_id:
                 await _safe_delete_message(context, query.message.chat_id, search_msg_id)
             
-            cursor.execute("SELECT main_identifier FROM profiles WHERE profile_id = ?", (data_id,))
-            profile_row = cursor.fetchone()
+            profile_row = await async_db.fetch_one("SELECT main_identifier FROM profiles WHERE profile_id = ?", (data_id,))
             profile_name = profile_row['main_identifier'] if profile_row else data_id
             context.user_data['current_profile_name_for_list'] = profile_name
 
-            cursor.execute(
+            reports = await async_db.fetch_all(
                 "SELECT report_id, title, submitted_at FROM reports WHERE linked_profile_id = ? ORDER BY submitted_at DESC", 
                 (data_id,)
             )
-            reports = cursor.fetchall()
             
             if not reports:
                 await context.bot.send_message(
@@ -848,8 +1374,6 @@ async def search_read_details(update: Update, context: ContextTypes.DEFAULT_TYPE
         text = "Error semasa mengambil data dari database."
         await query.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
         return None
-    finally:
-        conn.close()
 
 async def _send_paginated_profile_reports_message(update: Update, context: ContextTypes.DEFAULT_TYPE, is_edit: bool = False) -> int:
     reports_list = context.user_data.get('profile_reports_list', [])
@@ -972,129 +1496,69 @@ async def search_cancel_and_menu(update: Update, context: ContextTypes.DEFAULT_T
     await start(update, context) # Guna dari handlers_general
     return ConversationHandler.END
 
-def parse_additional_info(additional_info: str) -> List[str]:
-    """
-    Safely parse additional_info JSON string into list.
-    """
-    if not additional_info or additional_info == '[]':
-        return []
-
-    try:
-        data = json.loads(additional_info)
-        if isinstance(data, list):
-            return [str(x).strip() for x in data]
-    except Exception:
-        pass
-
-    return []
-
-def extract_banks_from_additional_info(additional_info: str) -> List[Dict[str, str]]:
-    results = []
-
-    for item in parse_additional_info(additional_info):
-        if not item.startswith("Bank:"):
-            continue
-
-        payload = item.replace("Bank:", "", 1).strip()
-        parts = [p.strip() for p in payload.split(",")]
-
-        if len(parts) < 2:
-            continue  # invalid / corrupted entry
-
-        results.append({
-            "account_number": parts[0],
-            "bank_name": parts[1] if len(parts) > 1 else None,
-            "holder_name": parts[2] if len(parts) > 2 else None,
-        })
-
-    return results
-
-def extract_phones_from_additional_info(additional_info: str) -> List[str]:
-    phones = []
-
-    for item in parse_additional_info(additional_info):
-        if not item.startswith("Telefon:"):
-            continue
-
-        phone = item.replace("Telefon:", "", 1).strip()
-        phones.append(phone)
-
-    return phones
-
-
 async def list_banks_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
     await query.answer()
 
     profile_id = query.data.split('_')[-1]
 
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-
-        # === NORMALIZED ===
-        cursor.execute("""
-            SELECT account_number, bank_name, holder_name, report_count
-            FROM profile_bank_accounts
-            WHERE profile_id = ?
-            ORDER BY report_count DESC
-        """, (profile_id,))
-        normalized = cursor.fetchall()
-
-        normalized_map = {
-            row["account_number"]: row for row in normalized
-        }
-
-        # === FROM additional_info ===
-        cursor.execute("""
-            SELECT additional_info
-            FROM reports
-            WHERE linked_profile_id = ?
-              AND additional_info IS NOT NULL
-              AND additional_info != '[]'
-        """, (profile_id,))
-
-        extracted = []
-
-        for row in cursor.fetchall():
-            extracted.extend(
-                extract_banks_from_additional_info(row["additional_info"])
-            )
-
+    # === NORMALIZED ===
+    normalized = await async_db.fetch_all("""
+        SELECT account_number, bank_name, holder_name, report_count
+        FROM profile_bank_accounts
+        WHERE profile_id = ?
+        ORDER BY report_count DESC
+    """, (profile_id,))
+
+    normalized_map = {
+        row["account_number"]: row for row in normalized
+    }
+
+    # === FROM additional_info (report_identifiers) ===
+    extracted_rows = await async_db.fetch_all("""
+        SELECT DISTINCT ri.canonical_value, ri.raw_value
+        FROM reports r
+        JOIN report_identifiers ri ON ri.report_id = r.report_id
+        WHERE r.linked_profile_id = ?
+          AND ri.kind = 'bank'
+          AND ri.is_primary = 0
+    """, (profile_id,))
+
+    normalized_accounts = {canonical_bank(acc) for acc in normalized_map}
+    extracted = []
+    seen = set()
+    for row in extracted_rows:
         # deduplicate
-        extracted = [
-            b for b in extracted
-            if b["account_number"] not in normalized_map
-        ]
-
-        if not normalized and not extracted:
-            await query.message.reply_text("No bank account record found for this profile.")
-            return
+        if row["canonical_value"] in normalized_accounts or row["canonical_value"] in seen:
+            continue
+        seen.add(row["canonical_value"])
+        extracted.append(bank_details(row["raw_value"]))
 
-        text = "**Related bank account(s)**\n"
+    if not normalized and not extracted:
+        await query.message.reply_text("No bank account record found for this profile.")
+        return
 
-        idx = 1
-        for row in normalized:
-            text += (
-                f"**{idx}. `{row['account_number']}`**\n"
-                f"   - Holder Name: `{row['holder_name']}`\n"
-                f"   - Bank Name: `{row['bank_name']}`\n"
-                f"   - Total Reports: {row['report_count']}\n\n"
-            )
-            idx += 1
+    text = "**Related bank account(s)**\n"
 
-        for b in extracted:
-            text += (
-                f"**{idx}. `{b['account_number']}`**\n"
-                f"   - Holder Name: `{b.get('holder_name', '-')}`\n"
-                f"   - Bank Name: `{b.get('bank_name', '-')}`\n\n"
-            )
-            idx += 1
+    idx = 1
+    for row in normalized:
+        text += (
+            f"**{idx}. `{row['account_number']}`**\n"
+            f"   - Holder Name: `{row['holder_name']}`\n"
+            f"   - Bank Name: `{row['bank_name']}`\n"
+            f"   - Total Reports: {row['report_count']}\n\n"
+        )
+        idx += 1
 
-        await query.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+    for b in extracted:
+        text += (
+            f"**{idx}. `{b['account_number']}`**\n"
+            f"   - Holder Name: `{b.get('holder_name', '-')}`\n"
+            f"   - Bank Name: `{b.get('bank_name', '-')}`\n\n"
+        )
+        idx += 1
 
-    finally:
-        conn.close()
+    await query.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
 
 
 async def list_phones_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -1103,60 +1567,104 @@ async def list_phones_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 
     profile_id = query.data.split('_')[-1]
 
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
+    normalized = await async_db.fetch_all("""
+        SELECT phone_number, report_count
+        FROM profile_phone_numbers
+        WHERE profile_id = ?
+        ORDER BY report_count DESC
+    """, (profile_id,))
+
+    normalized_set = {row["phone_number"] for row in normalized}
+
+    extracted_rows = await async_db.fetch_all("""
+        SELECT DISTINCT ri.canonical_value
+        FROM reports r
+        JOIN report_identifiers ri ON ri.report_id = r.report_id
+        WHERE r.linked_profile_id = ?
+          AND ri.kind = 'phone'
+          AND ri.is_primary = 0
+    """, (profile_id,))
+
+    normalized_phones = {canonical_phone(p) for p in normalized_set}
+    extracted = [
+        row["canonical_value"] for row in extracted_rows
+        if row["canonical_value"] not in normalized_phones
+    ]
 
-        cursor.execute("""
-            SELECT phone_number, report_count
-            FROM profile_phone_numbers
-            WHERE profile_id = ?
-            ORDER BY report_count DESC
-        """, (profile_id,))
-        normalized = cursor.fetchall()
+    if not normalized and not extracted:
+        await query.message.reply_text("No phone number record found for this profile.")
+        return
 
-        normalized_set = {row["phone_number"] for row in normalized}
+    text = "**Related phone number(s)**\n"
 
-        cursor.execute("""
-            SELECT additional_info
-            FROM reports
-            WHERE linked_profile_id = ?
-              AND additional_info IS NOT NULL
-              AND additional_info != '[]'
-        """, (profile_id,))
+    idx = 1
+    for row in normalized:
+        text += (
+            f"**{idx}. `{row['phone_number']}`**\n"
+            f"   - Total Reports: {row['report_count']}\n\n"
+        )
+        idx += 1
 
-        extracted = []
-        for row in cursor.fetchall():
-            extracted.extend(
-                extract_phones_from_additional_info(row["additional_info"])
-            )
+    for phone in extracted:
+        text += (
+            f"**{idx}. `{phone}`**\n\n"
+        )
+        idx += 1
 
-        extracted = [p for p in extracted if p not in normalized_set]
+    await query.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
 
-        if not normalized and not extracted:
-            await query.message.reply_text("No phone number record found for this profile.")
-            return
 
-        text = "**Related phone number(s)**\n"
+# QR auto-search: max terms searched, QR codes listed in the summary
+QR_MAX_SEARCH_TERMS = 3
+QR_MAX_SUMMARY_CODES = 2
 
-        idx = 1
-        for row in normalized:
-            text += (
-                f"**{idx}. `{row['phone_number']}`**\n"
-                f"   - Total Reports: {row['report_count']}\n\n"
-            )
-            idx += 1
-
-        for phone in extracted:
-            text += (
-                f"**{idx}. `{phone}`**\n\n"
-            )
-            idx += 1
 
-        await query.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
+def _qr_search_terms(qr_results: List[Dict]) -> List[str]:
+    """
+    Identifiers first (the first one also goes to SemakMule / Truecaller), then
+    holder names. Codes whose CRC matches come before ones that fail it.
+    """
+    ordered = sorted(qr_results, key=lambda r: r['parsed'].get("crc_valid") is False)
+    terms = []
+    for key in ("identifier", "merchant_name"):
+        for qr_result in ordered:
+            value = (qr_result['parsed'].get(key) or "").strip()
+            if len(value) >= 4 and value.lower() not in (t.lower() for t in terms):
+                terms.append(value)
+    return terms[:QR_MAX_SEARCH_TERMS]
+
+
+def _qr_summary(qr_results: List[Dict]) -> str:
+    """Short QR summary shown above the search results (kept small for the photo caption)."""
+    text = "**QR**\n"
+    for qr_result in qr_results[:QR_MAX_SUMMARY_CODES]:
+        parsed = qr_result['parsed']
+        details = [f"`{v}`" for v in (parsed.get("merchant_name"), parsed.get("identifier")) if v]
+        if parsed.get("bank_name"):
+            details.append(parsed["bank_name"])
+        if parsed.get("amount"):
+            details.append(f"RM {parsed['amount']}")
+        text += f"• {' · '.join(details) or 'No details found'}\n"
+        if parsed.get("crc_valid") is False:
+            text += "• ⚠️ _QR checksum does not match, the code may have been altered._\n"
+    hidden = qr_results[QR_MAX_SUMMARY_CODES:]
+    if hidden:
+        text += f"• +{len(hidden)} more QR code(s)\n"
+        if any(r['parsed'].get("crc_valid") is False for r in hidden):
+            text += "• ⚠️ _Some of them fail the QR checksum._\n"
+    return text
+
+
+async def _decode_qr_photo(photo) -> List[Dict]:
+    """Download + decode (process pool) + parse a QR photo, and cache it by file_unique_id."""
+    file = await photo.get_file()
+    image_bytes = await file.download_as_bytearray()
 
-    finally:
-        conn.close()
+    # Decode dalam process pool (gambar penuh tak block event loop)
+    qr_payloads = await decode_qr_codes_async(image_bytes)
+    qr_results = [{'payload': payload, 'parsed': parse_duitnow_qr(payload)} for payload in qr_payloads]
+    await async_db.run(save_qr_result, photo.file_unique_id, qr_results)
+    return qr_results
 
 
 async def search_qr_image(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -1174,16 +1682,16 @@ async def search_qr_image(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     chat_id = update.effective_chat.id
     prompt_id = context.user_data.get('prompt_message_id')
 
-    # Ambil gambar
     photo = update.message.photo[-1]
-    file = await photo.get_file()
-    image_bytes = await file.download_as_bytearray()
 
-    from qr_utils import decode_qr_image
-    from duitnow_parser import parse_duitnow_qr
+    # Gambar sama (forward / upload semula) -> guna hasil decode lama, tak perlu download
+    qr_results = await async_db.run(get_qr_cache, photo.file_unique_id)
+    if qr_results is None:
+        qr_results, _shared = await upstream_flights.do(
+            ('qr_decode', photo.file_unique_id), lambda: _decode_qr_photo(photo)
+        )
 
-    qr_payload = decode_qr_image(image_bytes)
-    if not qr_payload:
+    if not qr_results:
         await _safe_edit_message(
             context,
             chat_id,
@@ -1195,20 +1703,42 @@ async def search_qr_image(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return config.SEARCH_TERM
 
-    parsed = parse_duitnow_qr(qr_payload)
-
-    merchant = parsed.get("merchant_name")
-    identifier = parsed.get("identifier")
-    bank_name = parsed.get("bank_name")
-
-
+    if config.QR_AUTO_SEARCH:
+        search_terms = _qr_search_terms(qr_results)
+        if search_terms:
+            # Terus cari identifier + nama pemegang, satu jawapan sahaja
+            crc_warning = ""
+            if any(r['parsed'].get("crc_valid") is False for r in qr_results):
+                crc_warning = "\n⚠️ _QR checksum does not match, the code may have been altered._"
+            await _safe_edit_message(
+                context, chat_id, prompt_id,
+                text=f"⏳ QR read. Searching for `{'`, `'.join(search_terms)}`...{crc_warning}",
+                reply_markup=None,
+                parse_mode=ParseMode.MARKDOWN
+            )
+            return await _run_search(update, context, search_terms, summary=_qr_summary(qr_results))
 
     text = "**Extracted information from QR**\n\n"
-
-    text += f"Holder Name: `{merchant}`\n" if merchant else "Holder Name: Not found\n"
-    text += f"Bank Name: `{bank_name}`\n" if bank_name else "Bank Name: Not Found\n"
-    text += f"Identifier: `{identifier}`\n" if identifier else "Identifier: Not Found\n"
-    text += "\n\n_An identifier can be a bank account number, security ID, or phone number. Just copy one of the details above and send it to start searching._"
+    for index, qr_result in enumerate(qr_results, start=1):
+        parsed = qr_result['parsed']
+
+        merchant = parsed.get("merchant_name")
+        identifier = parsed.get("identifier")
+        bank_name = parsed.get("bank_name")
+
+        if len(qr_results) > 1:
+            text += f"*QR {index}*\n"
+        text += f"Holder Name: `{merchant}`\n" if merchant else "Holder Name: Not found\n"
+        text += f"Bank Name: `{bank_name}`\n" if bank_name else "Bank Name: Not Found\n"
+        text += f"Identifier: `{identifier}`\n" if identifier else "Identifier: Not Found\n"
+        if parsed.get("amount"):
+            text += f"Amount: RM {parsed['amount']}\n"
+        if parsed.get("reference"):
+            text += f"Reference: `{parsed['reference']}`\n"
+        if parsed.get("crc_valid") is False:
+            text += "⚠️ _QR checksum does not match, the code may have been altered._\n"
+        text += "\n"
+    text += "\n_An identifier can be a bank account number, security ID, or phone number. Just copy one of the details above and send it to start searching._"
 
 
 
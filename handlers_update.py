@@ -10,7 +10,8 @@ from telegram.ext import ContextTypes, ConversationHandler
 from telegram.constants import ParseMode
 
 import config
-from database import get_db_connection
+import async_db
+from identifiers import sync_report_identifiers
 from bot_utils import _safe_edit_message, _safe_delete_message
 
 logger = logging.getLogger(__name__)
@@ -22,14 +23,11 @@ async def start_report_update(update: Update, context: ContextTypes.DEFAULT_TYPE
     chat_id = update.effective_chat.id
 
     # Validate: report exists, belongs to this user, is in NEEDS_INFO or auto_rejected
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute(
+        report = await async_db.fetch_one(
             "SELECT * FROM reports WHERE report_id = ? AND submitter_user_id = ?",
             (report_id, user_id)
         )
-        report = cursor.fetchone()
 
         if not report:
             await context.bot.send_message(
@@ -57,8 +55,6 @@ async def start_report_update(update: Update, context: ContextTypes.DEFAULT_TYPE
         logger.error(f"Error fetching report for update: {e}")
         await context.bot.send_message(chat_id=chat_id, text="An error occurred. Please try again.")
         return ConversationHandler.END
-    finally:
-        conn.close()
 
     # Store report data in context
     context.user_data.clear()
@@ -193,6 +189,38 @@ async def update_skip_screenshots(update: Update, context: ContextTypes.DEFAULT_
     return config.UPDATE_REPORT_CONFIRM
 
 
+def _apply_report_update(conn, report_id: int, new_desc: str, new_screenshots: list):
+    """Append the reporter's update and revert the report to UNVERIFIED (caller commits)."""
+    cursor = conn.cursor()
+
+    # Append new description to existing (preserve history)
+    cursor.execute("SELECT description FROM reports WHERE report_id = ?", (report_id,))
+    row = cursor.fetchone()
+    old_desc = row['description'] if row else ''
+
+    updated_desc = f"{old_desc}\n\n--- UPDATE ---\n{new_desc}"
+
+    cursor.execute("""
+        UPDATE reports
+        SET description = ?,
+            report_status = 'UNVERIFIED',
+            restored_at = CURRENT_TIMESTAMP,
+            needs_info_since = NULL,
+            admin_note = NULL,
+            auto_rejected = 0,
+            rejection_reason = NULL
+        WHERE report_id = ?
+    """, (updated_desc, report_id))
+
+    # Save new screenshots
+    if new_screenshots:
+        screenshot_sql = "INSERT INTO screenshots (report_id, file_path) VALUES (?, ?)"
+        screenshot_values = [(report_id, file_id) for file_id in new_screenshots]
+        cursor.executemany(screenshot_sql, screenshot_values)
+
+    sync_report_identifiers(cursor, report_id)
+
+
 async def update_confirm_submit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Reporter confirms the update — save to DB, revert status to UNVERIFIED."""
     query = update.callback_query
@@ -202,36 +230,10 @@ async def update_confirm_submit(update: Update, context: ContextTypes.DEFAULT_TY
     new_desc = context.user_data.get('update_new_description', '')
     new_screenshots = context.user_data.get('update_screenshots', [])
 
-    conn = get_db_connection()
     try:
-        cursor = conn.cursor()
-
-        # Append new description to existing (preserve history)
-        cursor.execute("SELECT description FROM reports WHERE report_id = ?", (report_id,))
-        row = cursor.fetchone()
-        old_desc = row['description'] if row else ''
-
-        updated_desc = f"{old_desc}\n\n--- UPDATE ---\n{new_desc}"
-
-        cursor.execute("""
-            UPDATE reports
-            SET description = ?,
-                report_status = 'UNVERIFIED',
-                restored_at = CURRENT_TIMESTAMP,
-                needs_info_since = NULL,
-                admin_note = NULL,
-                auto_rejected = 0,
-                rejection_reason = NULL
-            WHERE report_id = ?
-        """, (updated_desc, report_id))
-
-        # Save new screenshots
-        if new_screenshots:
-            screenshot_sql = "INSERT INTO screenshots (report_id, file_path) VALUES (?, ?)"
-            screenshot_values = [(report_id, file_id) for file_id in new_screenshots]
-            cursor.executemany(screenshot_sql, screenshot_values)
-
-        conn.commit()
+        await async_db.transaction(
+            lambda conn: _apply_report_update(conn, report_id, new_desc, new_screenshots)
+        )
         logger.info(f"Report {report_id} updated by reporter, status reverted to UNVERIFIED")
 
         # Notify admin(s) that the report has been updated
@@ -267,8 +269,6 @@ async def update_confirm_submit(update: Update, context: ContextTypes.DEFAULT_TY
             text="An error occurred while updating the report. Please try again.",
             reply_markup=None
         )
-    finally:
-        conn.close()
 
     context.user_data.clear()
     return ConversationHandler.END
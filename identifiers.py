@@ -0,0 +1,225 @@
+# identifiers.py
+"""
+Normalised report identifiers (phone / bank / social).
+Every identifier of a report — the primary against_* value and each extra
+"Telefon: ...", "Bank: ...", "Sosial: ..." entry in additional_info — is kept
+as one row of report_identifiers with a canonical value, so readers use
+indexed lookups instead of re-parsing the additional_info JSON string.
+"""
+
+import json
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from social_tracker import parse_social_url
+
+logger = logging.getLogger(__name__)
+
+KIND_PHONE = "phone"
+KIND_BANK = "bank"
+KIND_SOCIAL = "social"
+
+# additional_info prefix -> kind
+EVIDENCE_PREFIXES = {
+    "Telefon:": KIND_PHONE,
+    "Bank:": KIND_BANK,
+    "Sosial:": KIND_SOCIAL,
+}
+
+# report_against_type -> kind
+REPORT_TYPE_KINDS = {
+    "PHONE": KIND_PHONE,
+    "BANK": KIND_BANK,
+    "SOCIAL": KIND_SOCIAL,
+}
+
+# Order extra identifiers are shown on the cards
+CARD_PRIORITY = ("instagram", "threads", "tiktok", KIND_PHONE, KIND_BANK)
+
+
+def canonical_phone(value: str) -> str:
+    """'+60 12-345 6789, Ali' -> '0123456789'"""
+    phone = value.split(",")[0].strip().replace(" ", "").replace("-", "").replace("+", "")
+    if phone.startswith("60"):
+        phone = "0" + phone[2:]
+    return phone
+
+
+def canonical_bank(value: str) -> str:
+    """'1234-5678 90, Maybank, Ali' -> '1234567890'"""
+    return value.split(",")[0].strip().replace(" ", "").replace("-", "")
+
+
+def canonical_social(value: str) -> str:
+    """'https://www.Instagram.com/ali/' -> 'instagram.com/ali'"""
+    url = value.strip().lower()
+    url = re.sub(r"^https?://", "", url)
+    if url.startswith("www."):
+        url = url[4:]
+    return url.rstrip("/")
+
+
+CANONICALIZERS = {
+    KIND_PHONE: canonical_phone,
+    KIND_BANK: canonical_bank,
+    KIND_SOCIAL: canonical_social,
+}
+
+
+def canonicalize(kind: str, value: Optional[str]) -> Optional[str]:
+    if not value or kind not in CANONICALIZERS:
+        return None
+    return CANONICALIZERS[kind](value) or None
+
+
+def parse_additional_info(additional_info: Optional[str]) -> List[str]:
+    """
+    Safely parse additional_info JSON string into list.
+    """
+    if not additional_info or additional_info == '[]':
+        return []
+
+    try:
+        data = json.loads(additional_info)
+        if isinstance(data, list):
+            return [str(x).strip() for x in data]
+    except Exception:
+        pass
+
+    return []
+
+
+def parse_evidence_item(item: str) -> Optional[Dict]:
+    """'Bank: 123, Maybank, Ali' -> {'kind': 'bank', 'canonical_value': '123', 'raw_value': '123, Maybank, Ali'}"""
+    item = (item or "").strip()
+    for prefix, kind in EVIDENCE_PREFIXES.items():
+        if item.startswith(prefix):
+            raw = item[len(prefix):].strip()
+            canonical = canonicalize(kind, raw)
+            if not canonical:
+                return None
+            return {"kind": kind, "canonical_value": canonical, "raw_value": raw, "is_primary": 0}
+    return None
+
+
+def identifiers_for_report(report: Dict, additional: Optional[List[Dict]] = None) -> List[Dict]:
+    """
+    All identifiers of a report dict (DB row or report_data).
+    `additional` (already parsed entries) is used instead of re-parsing
+    report['additional_info'] when given.
+    """
+    identifiers = []
+
+    primary = (
+        (KIND_PHONE, report.get("against_phone_number")),
+        (KIND_BANK, report.get("against_bank_number")),
+        (KIND_SOCIAL, report.get("against_social_url")),
+    )
+    for kind, raw in primary:
+        canonical = canonicalize(kind, raw)
+        if canonical:
+            identifiers.append({
+                "kind": kind, "canonical_value": canonical,
+                "raw_value": raw.strip(), "is_primary": 1
+            })
+
+    if additional is None:
+        additional = [
+            parsed for parsed in map(parse_evidence_item, parse_additional_info(report.get("additional_info")))
+            if parsed
+        ]
+    identifiers.extend(additional)
+
+    seen = set()
+    unique = []
+    for ident in identifiers:
+        key = (ident["kind"], ident["canonical_value"], ident["is_primary"])
+        if key not in seen:
+            seen.add(key)
+            unique.append(ident)
+    return unique
+
+
+def save_report_identifiers(cursor, report_id: int, identifiers: List[Dict]):
+    """Replace the identifier rows of one report (caller commits)."""
+    cursor.execute("DELETE FROM report_identifiers WHERE report_id = ?", (report_id,))
+    cursor.executemany(
+        """
+        INSERT INTO report_identifiers (report_id, kind, canonical_value, raw_value, is_primary)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        [
+            (report_id, i["kind"], i["canonical_value"], i["raw_value"], i["is_primary"])
+            for i in identifiers
+        ]
+    )
+
+
+def sync_report_identifiers(cursor, report_id: int):
+    """Re-derive identifier rows of a report from its current columns (caller commits)."""
+    cursor.execute("""
+        SELECT against_phone_number, against_bank_number, against_social_url, additional_info
+        FROM reports WHERE report_id = ?
+    """, (report_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return
+    report = dict(zip(
+        ("against_phone_number", "against_bank_number", "against_social_url", "additional_info"),
+        tuple(row)
+    ))
+    save_report_identifiers(cursor, report_id, identifiers_for_report(report))
+
+
+def identifier_candidates(term: str) -> List[Tuple[str, str]]:
+    """(kind, canonical_value) pairs a search term could be an exact match for."""
+    term = term.strip()
+    compact = term.replace(" ", "").replace("-", "").replace("+", "")
+    candidates = []
+
+    if re.fullmatch(r"(?:60|0)1\d{8,9}", compact):
+        candidates.append((KIND_PHONE, canonical_phone(term)))
+    if compact.isdigit() and 8 <= len(compact) <= 20:
+        candidates.append((KIND_BANK, canonical_bank(term)))
+    if "." in term and "/" in term:
+        candidates.append((KIND_SOCIAL, canonical_social(term)))
+
+    return candidates
+
+
+def bank_details(raw_value: str) -> Dict[str, Optional[str]]:
+    """Split a 'number, bank, holder' entry."""
+    parts = [p.strip() for p in (raw_value or "").split(",")]
+    return {
+        "account_number": parts[0] if parts else None,
+        "bank_name": parts[1] if len(parts) > 1 else None,
+        "holder_name": parts[2] if len(parts) > 2 else None,
+    }
+
+
+def card_identifiers(rows, exclude_kind: Optional[str] = None, limit: int = 3) -> List[Dict]:
+    """
+    Extra identifiers for the 'Additional Info' box of a card:
+    [{'kind', 'platform', 'display'}], social handles first.
+    Identifiers of the report's own type are skipped unless nothing else is left.
+    """
+    items = []
+    for row in rows:
+        kind, raw = row["kind"], row["raw_value"] or row["canonical_value"]
+        platform, display = None, raw
+        if kind == KIND_SOCIAL:
+            parsed = parse_social_url(raw)
+            platform = parsed.get("platform")
+            display = parsed.get("username") or raw
+        elif kind == KIND_PHONE:
+            display = raw.split(",")[0].strip()
+        items.append({"kind": kind, "platform": platform, "display": display})
+
+    preferred = [i for i in items if i["kind"] != exclude_kind] or items
+
+    def priority(item):
+        key = item["platform"] if item["platform"] in CARD_PRIORITY else item["kind"]
+        return CARD_PRIORITY.index(key) if key in CARD_PRIORITY else len(CARD_PRIORITY)
+
+    return sorted(preferred, key=priority)[:limit]
@@ -1,10 +1,9 @@
 # image_generator.py
 import logging
-import os
 import jinja2
-from playwright.async_api import async_playwright
 from typing import Union
 from config import TEMPLATE_DIR # Import dari config
+from browser_pool import browser_pool
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +28,7 @@ def render_html_template(template_file: str, data: dict) -> str:
 
 async def generate_profile_image(template_file: str, data: dict) -> Union[bytes, None]:
     """
-    Render HTML dan guna Playwright untuk 'screenshot' sebagai PNG.
+    Render HTML dan guna Playwright (page dari browser_pool) untuk 'screenshot' sebagai PNG.
     """
     if not jinja_env:
         logger.error("Ralat: Jinja2 tidak dimuatkan, gagal generate gambar.")
@@ -37,43 +36,11 @@ async def generate_profile_image(template_file: str, data: dict) -> Union[bytes,
 
     try:
         html_content = render_html_template(template_file, data)
-        
-        async with async_playwright() as p:
-            browser = None
-            try:
-                browser = await p.chromium.launch()
-            except Exception:
-                logger.warning("Gagal lancar Chromium Playwright. Cuba guna Chrome sedia ada.")
-                try:
-                    chrome_path = "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
-                    if not os.path.exists(chrome_path):
-                            chrome_path = "C:\\Program Files (x86)\\Google\\Chrome\\Application\\chrome.exe"
 
-                    if os.path.exists(chrome_path):
-                        browser = await p.chromium.launch(
-                            channel="chrome",
-                            executable_path=chrome_path
-                        )
-                        logger.info(f"Berjaya lancar Chrome dari: {chrome_path}")
-                    else:
-                        raise Exception("Path Chrome sedia ada tidak dijumpai.")
-                        
-                except Exception as e_fallback:
-                    logger.error(f"GAGAL LANCAR SEMUA BROWSER. Ralat: {e_fallback}")
-                    logger.error("PENTING: Sila jalankan 'playwright install' di terminal anda.")
-                    return None
-            
-            if not browser:
-                logger.error("Tidak dapat 'launch' browser. Sila jalankan 'playwright install'.")
-                return None
-
-            page = await browser.new_page()
+        async with browser_pool.page() as page:
             await page.set_content(html_content)
             card_locator = page.locator("#profile-card")
-            screenshot_bytes = await card_locator.screenshot(type="png")
-            await browser.close()
-            
-            return screenshot_bytes
+            return await card_locator.screenshot(type="png")
 
     except jinja2.TemplateNotFound:
         logger.error(f"Ralat: Templat tidak dijumpai: {template_file}")
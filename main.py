@@ -9,9 +9,23 @@ from telegram.ext import (
 
 # --- Import dari fail-fail kita ---
 import config
-from database import setup_database, migrate_social_media_columns, migrate_reports_columns
+from database import (
+    setup_database, migrate_social_media_columns, migrate_reports_columns, migrate_report_identifiers,
+    migrate_username_history, migrate_profile_search_indexes,
+    close_db_connections
+)
+from search_index import setup_search_index
+from stats_counters import setup_stats_counters
+import async_db
+from qr_utils import shutdown_qr_pool
 from image_generator import jinja_env
-from handlers_general import start, cancel, show_statistics, auto_archive_needs_info
+from browser_pool import browser_pool
+from truecaller_api import close_truecaller_client
+from semakmule_apiv2 import close_semakmule_client
+from handlers_general import (
+    start, cancel, show_statistics, auto_archive_needs_info, reconcile_statistics,
+    prerender_statistics_image
+)
 
 # Import semua fungsi handler dari fail masing-masing
 from handlers_report import (
@@ -29,7 +43,8 @@ from handlers_search import (
     search_start, search_profile, search_qr_image,  # ← TAMBAH SINI
     search_change_page, search_read_details,
     search_change_profile_reports_page, search_back_to_search_results,
-    search_cancel_and_menu, list_banks_handler, list_phones_handler
+    search_cancel_and_menu, list_banks_handler, list_phones_handler,
+    purge_lookup_caches_job, search_refresh_semakmule
 )
 
 from handlers_admin import (
@@ -46,6 +61,7 @@ from handlers_update import (
 )
 
 from handlers_general import recheck_join
+from social_recheck import recheck_social_profiles
 
 # === Setup Logging ===
 logging.basicConfig(
@@ -58,6 +74,25 @@ logging.getLogger("telegram.ext").setLevel(logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+async def _post_init(application: Application) -> None:
+    """Warm up long-lived resources once the event loop is running."""
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        # Bot masih boleh jalan; pool akan cuba 'start' semula pada render pertama
+        logger.error(f"Gagal mulakan browser pool: {e}")
+
+
+async def _post_shutdown(application: Application) -> None:
+    """Release long-lived resources on shutdown."""
+    await browser_pool.stop()
+    await close_truecaller_client()
+    await close_semakmule_client()
+    shutdown_qr_pool()
+    async_db.shutdown()
+    close_db_connections()
+
+
 def main() -> None:
     """Setup dan jalankan bot."""
     
@@ -65,6 +100,11 @@ def main() -> None:
     setup_database()
     migrate_social_media_columns()
     migrate_reports_columns()
+    migrate_report_identifiers()
+    migrate_username_history()
+    migrate_profile_search_indexes()
+    setup_search_index()
+    setup_stats_counters()
 
     # 2. Pastikan templat HTML wujud
     if not jinja_env:
@@ -72,7 +112,13 @@ def main() -> None:
         return
         
     # 3. Bina 'Application'
-    application = Application.builder().token(config.BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(config.BOT_TOKEN)
+        .post_init(_post_init)
+        .post_shutdown(_post_shutdown)
+        .build()
+    )
 
     # 4. Bina 'ConversationHandler' untuk Laporan
     report_conv_handler = ConversationHandler(
@@ -164,7 +210,8 @@ def main() -> None:
                 CallbackQueryHandler(search_cancel_and_menu, pattern='^main_menu_from_search$'),
                 CallbackQueryHandler(lambda u, c: u.callback_query.answer("Tiada tindakan"), pattern='^search_nop$'),
                 CallbackQueryHandler(list_banks_handler, pattern='^list_banks_'),
-                CallbackQueryHandler(list_phones_handler, pattern='^list_phones_')
+                CallbackQueryHandler(list_phones_handler, pattern='^list_phones_'),
+                CallbackQueryHandler(search_refresh_semakmule, pattern='^search_refresh_semakmule$')
             ],
             config.VIEW_PROFILE_REPORTS: [
                 CallbackQueryHandler(search_change_profile_reports_page, pattern='^prof_report_prev$'),
@@ -297,6 +344,20 @@ def main() -> None:
     # 8. Setup JobQueue — auto-archive stale NEEDS_INFO reports every hour
     job_queue = application.job_queue
     job_queue.run_repeating(auto_archive_needs_info, interval=3600, first=60)
+    # Statistik: betulkan drift stats_counters + refresh active users
+    job_queue.run_repeating(
+        reconcile_statistics, interval=config.STATS_RECONCILE_INTERVAL_SECONDS, first=120
+    )
+    # Imej statistik: render (dan pre-upload) sebelum tamat TTL
+    job_queue.run_repeating(
+        prerender_statistics_image, interval=config.STATS_IMAGE_REFRESH_SECONDS, first=10
+    )
+    # Truecaller / SemakMule cache: buang rekod tamat tempoh
+    job_queue.run_repeating(purge_lookup_caches_job, interval=6 * 3600, first=300)
+    # Semak semula akaun sosial (username change) — sebahagian kecil setiap run
+    job_queue.run_repeating(
+        recheck_social_profiles, interval=config.SOCIAL_RECHECK_INTERVAL_SECONDS, first=180
+    )
 
     # 9. Jalankan bot
     logger.info("Bot is running...")
@@ -0,0 +1,111 @@
+# qr_cache.py
+"""
+Cache for decoded QR search images, keyed by Telegram file_unique_id
+(the same for every copy of a forwarded/re-uploaded photo). Stores the
+QR payloads and their parse_duitnow_qr() results, so a repeat upload
+skips both the download and the decode. An in-process LRU sits in front
+of the qr_decode_cache table (write-through on save).
+"""
+
+import json
+import logging
+from typing import List, Optional
+
+import config
+from database import get_db_connection
+from memory_cache import TTLLRUCache
+
+logger = logging.getLogger(__name__)
+
+_memory_cache = TTLLRUCache(config.QR_CACHE_MEMORY_SIZE, config.QR_CACHE_MEMORY_TTL_SECONDS)
+
+
+def init_qr_cache_table():
+    """Create qr_decode_cache table if not exists"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS qr_decode_cache (
+            file_unique_id TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            decoded_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_qr_decode_cache_decoded_at ON qr_decode_cache(decoded_at)")
+
+    conn.commit()
+    conn.close()
+
+
+def get_qr_cache(file_unique_id: str) -> Optional[List[dict]]:
+    """Cached [{'payload', 'parsed'}, ...] for this photo, or None."""
+    cached = _memory_cache.get(file_unique_id)
+    if cached is not None:
+        return cached
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT result FROM qr_decode_cache
+        WHERE file_unique_id = ? AND decoded_at >= datetime('now', ?)
+    """, (file_unique_id, f"-{int(config.QR_CACHE_TTL_SECONDS)} seconds"))
+    row = cursor.fetchone()
+    conn.close()
+
+    if not row:
+        return None
+    try:
+        result = json.loads(row['result'])
+    except ValueError:
+        return None
+    _memory_cache.set(file_unique_id, result)
+    return result
+
+
+def save_qr_result(file_unique_id: str, result: List[dict]):
+    """Save decoded QR codes. Failed decodes are not cached (may be a timeout)."""
+    if not result:
+        return
+
+    conn = get_db_connection()
+    try:
+        conn.execute("""
+            INSERT OR REPLACE INTO qr_decode_cache (file_unique_id, result, decoded_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        """, (file_unique_id, json.dumps(result)))
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Failed to save QR decode result: {e}")
+        conn.rollback()
+        return
+    finally:
+        conn.close()
+
+    _memory_cache.set(file_unique_id, result)
+
+
+def purge_qr_cache() -> int:
+    """Delete rows past the TTL. Returns rows deleted."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "DELETE FROM qr_decode_cache WHERE decoded_at < datetime('now', ?)",
+            (f"-{int(config.QR_CACHE_TTL_SECONDS)} seconds",)
+        )
+        deleted = cursor.rowcount
+        conn.commit()
+    finally:
+        conn.close()
+
+    if deleted:
+        logger.info(f"qr_decode_cache: {deleted} rekod tamat tempoh dibuang.")
+    return deleted
+
+
+def qr_memory_cache_stats() -> dict:
+    return _memory_cache.stats()
+
+
+# Initialize table on import
+init_qr_cache_table()
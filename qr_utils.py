@@ -1,21 +1,177 @@
-from PIL import Image
-from pyzbar.pyzbar import decode
+# qr_utils.py
+"""
+QR decoding for QR search (Pillow + pyzbar).
+
+Decoding runs in a small process pool (QR_DECODE_WORKERS) so full-size
+photos never block the event loop. Each image goes through the
+pre-processing pipeline in qr_worker.py: downscale to QR_DECODE_MAX_DIMENSION, grayscale,
+then plain -> binarized (Otsu) -> other scales -> rotated attempts until
+something decodes. Every QR code in the first successful attempt is
+returned.
+
+Benchmark decode throughput:
+    python qr_utils.py --bench [image_dir] [--rounds N]
+Without image_dir a synthetic corpus of DuitNow-style QR photos is used.
+"""
+
+import asyncio
 import io
 import logging
-from typing import Optional
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+from PIL import Image
+
+import config
+from qr_worker import decode_qr_codes
 
 logger = logging.getLogger(__name__)
 
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+
 def decode_qr_image(image_bytes: bytes) -> Optional[str]:
-    try:
-        image = Image.open(io.BytesIO(image_bytes))
-        decoded = decode(image)
+    """First QR payload in the image, or None. Blocking."""
+    payloads = decode_qr_codes(image_bytes, config.QR_DECODE_MAX_DIMENSION)
+    return payloads[0] if payloads else None
+
+
+# ============================================================
+#  PROCESS POOL (event loop side)
+# ============================================================
 
-        if not decoded:
-            return None
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: a fork of the bot process would inherit its threads / locks.
+        # Workers unpickle qr_worker.decode_qr_codes, so they import only qr_worker.
+        _executor = ProcessPoolExecutor(
+            max_workers=config.QR_DECODE_WORKERS,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    return _executor
 
-        return decoded[0].data.decode("utf-8")
 
+async def decode_qr_codes_async(image_bytes: bytes) -> List[str]:
+    """decode_qr_codes() in the process pool, under QR_DECODE_TIMEOUT_SECONDS."""
+    global _executor, _slots
+    if _slots is None:
+        # Bound queued images too (each holds a full photo in memory)
+        _slots = asyncio.Semaphore(config.QR_DECODE_WORKERS * 2)
+
+    loop = asyncio.get_running_loop()
+    try:
+        async with _slots:
+            executor = _get_executor()
+            future = loop.run_in_executor(
+                executor, decode_qr_codes, bytes(image_bytes), config.QR_DECODE_MAX_DIMENSION
+            )
+            return await asyncio.wait_for(future, timeout=config.QR_DECODE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning("QR decode timed out.")
+        return []
+    except BrokenProcessPool:
+        logger.error("QR decode pool rosak, dicipta semula.")
+        # Another call may already have replaced it
+        if _executor is executor:
+            _executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        return []
     except Exception as e:
         logger.error(f"QR decode failed: {e}")
-        return None
+        return []
+
+
+def shutdown_qr_pool():
+    """Stop worker processes (on shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# ============================================================
+#  BENCHMARK
+# ============================================================
+
+def _sample_corpus(count: int = 12) -> List[bytes]:
+    """Synthetic DuitNow-style QR photos: big JPEG canvas, small tilted code."""
+    import random
+    import qrcode
+    from emv_tlv import with_crc
+
+    rng = random.Random(42)
+    corpus = []
+    for i in range(count):
+        account = "".join(rng.choice("0123456789") for _ in range(12))
+        merchant = f"DEMO MERCHANT {i:02d}"
+        account_info = f"0012MY.COM.PAYNET0106{rng.choice(['501854', '564160', '564162'])}02{len(account):02d}{account}"
+        payload = with_crc(
+            f"000201010211"
+            f"26{len(account_info):02d}{account_info}"
+            f"52045999530345858025MY59{len(merchant):02d}{merchant}6012KUALA LUMPUR"
+        )
+        code = qrcode.make(payload).convert('L')
+        code = code.resize((code.width * 2, code.height * 2), Image.NEAREST)
+        code = code.rotate(rng.uniform(-12, 12), expand=True, fillcolor=255)
+
+        canvas = Image.new('L', (3000, 4000), color=rng.randint(150, 220))
+        canvas.paste(code, (rng.randint(0, 3000 - code.width), rng.randint(0, 4000 - code.height)))
+        buffer = io.BytesIO()
+        canvas.convert('RGB').save(buffer, format='JPEG', quality=85)
+        corpus.append(buffer.getvalue())
+    return corpus
+
+
+def _load_corpus(path: str) -> List[bytes]:
+    corpus = []
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
+            with open(os.path.join(path, name), 'rb') as f:
+                corpus.append(f.read())
+    return corpus
+
+
+async def _bench_pool(corpus: List[bytes], rounds: int) -> List[List[str]]:
+    # Start every worker outside the timing
+    await asyncio.gather(*(decode_qr_codes_async(corpus[0]) for _ in range(config.QR_DECODE_WORKERS)))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(decode_qr_codes_async(img) for _ in range(rounds) for img in corpus))
+    elapsed = time.perf_counter() - started
+    print(f"pool ({config.QR_DECODE_WORKERS} workers): {len(results) / elapsed:.1f} images/s")
+    shutdown_qr_pool()
+    return results
+
+
+def _bench(argv: List[str]):
+    rounds = 3
+    if '--rounds' in argv:
+        rounds = int(argv[argv.index('--rounds') + 1])
+        del argv[argv.index('--rounds'):argv.index('--rounds') + 2]
+    corpus = _load_corpus(argv[0]) if argv else _sample_corpus()
+    if not corpus:
+        print("No images found.")
+        return
+    print(f"{len(corpus)} images x {rounds} rounds")
+
+    started = time.perf_counter()
+    decoded = sum(bool(decode_qr_codes(img, config.QR_DECODE_MAX_DIMENSION)) for _ in range(rounds) for img in corpus)
+    elapsed = time.perf_counter() - started
+    print(f"in-process: {len(corpus) * rounds / elapsed:.1f} images/s, decoded {decoded}/{len(corpus) * rounds}")
+
+    results = asyncio.run(_bench_pool(corpus, rounds))
+    print(f"pool decoded {sum(bool(r) for r in results)}/{len(results)}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        _bench(sys.argv[2:])
+    else:
+        print("Usage: python qr_utils.py --bench [image_dir] [--rounds N]")
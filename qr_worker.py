@@ -0,0 +1,100 @@
+# qr_worker.py
+"""
+QR decode pipeline that runs inside the qr_utils process pool.
+
+The pool submits decode_qr_codes from this module, so a spawned worker
+only has to import this file (Pillow, plus pyzbar on first use) — no
+config, database or handler modules. multiprocessing still runs the
+parent's main script as __mp_main__ once per worker; main.py keeps the
+bot startup under `if __name__ == "__main__"`, so a worker never starts
+a bot.
+"""
+
+import io
+import logging
+from typing import Iterator, List
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Extra scales tried on the binarized image (relative to the downscaled one)
+RETRY_SCALES = (0.5, 0.75, 1.5)
+# Skewed photos: pyzbar copes with 90° turns itself, not with these
+RETRY_ANGLES = (45, 20, -20)
+# Don't try scales that leave the image smaller than this (px, short side)
+MIN_DIMENSION = 200
+
+
+def _otsu_threshold(image: Image.Image) -> int:
+    """Global threshold that best separates dark/light pixels."""
+    hist = image.histogram()
+    total = sum(hist)
+    sum_all = sum(i * h for i, h in enumerate(hist))
+    sum_bg = weight_bg = 0
+    best, threshold = -1.0, 127
+    for i, h in enumerate(hist):
+        weight_bg += h
+        if not weight_bg:
+            continue
+        weight_fg = total - weight_bg
+        if not weight_fg:
+            break
+        sum_bg += i * h
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between > best:
+            best, threshold = between, i
+    return threshold
+
+
+def _load_grayscale(image_bytes: bytes, max_dimension: int) -> Image.Image:
+    image = Image.open(io.BytesIO(image_bytes))
+    # JPEG: let the decoder downscale (much cheaper than a full decode + resize)
+    image.draft('L', (max_dimension, max_dimension))
+    image = ImageOps.exif_transpose(image).convert('L')
+    if max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    return image
+
+
+def _attempts(gray: Image.Image) -> Iterator[Image.Image]:
+    """Image variants to try, cheapest / most likely first."""
+    yield gray
+
+    contrasted = ImageOps.autocontrast(gray)
+    threshold = _otsu_threshold(contrasted)
+    binary = contrasted.point(lambda p: 255 if p > threshold else 0)
+    yield binary
+
+    width, height = binary.size
+    for scale in RETRY_SCALES:
+        size = (int(width * scale), int(height * scale))
+        if min(size) < MIN_DIMENSION:
+            continue
+        yield binary.resize(size, Image.NEAREST)
+
+    for angle in RETRY_ANGLES:
+        yield binary.rotate(angle, resample=Image.NEAREST, expand=True, fillcolor=255)
+
+
+def decode_qr_codes(image_bytes: bytes, max_dimension: int = 1600) -> List[str]:
+    """All QR payloads found in the image (empty list if none). Blocking."""
+    try:
+        # Imported here: only worker processes need the zbar shared library
+        from pyzbar.pyzbar import decode, ZBarSymbol
+
+        gray = _load_grayscale(image_bytes, max_dimension)
+        for variant in _attempts(gray):
+            found = decode(variant, symbols=[ZBarSymbol.QRCODE])
+            if found:
+                payloads = []
+                for symbol in found:
+                    payload = symbol.data.decode("utf-8", errors="replace")
+                    if payload not in payloads:
+                        payloads.append(payload)
+                return payloads
+    except Exception as e:
+        logger.error(f"QR decode failed: {e}")
+    return []
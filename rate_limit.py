@@ -1,32 +1,161 @@
 # rate_limit.py
 """
-In-memory per-user rate limiting for Truecaller lookups.
+Per-user sliding-window rate limiting for Truecaller lookups.
 Configurable via config.py:
   RATE_LIMIT_ENABLED  — toggle on/off (default: true)
   RATE_LIMIT_MAX      — max lookups per window (default: 2)
   RATE_LIMIT_WINDOW_HOURS — window duration in hours (default: 5)
-Resets on bot restart (acceptable for bot context).
+  RATE_LIMIT_BACKEND  — 'sqlite' (default) or 'memory'
+
+The sqlite backend keeps hits in the rate_limit_hits table, so limits
+survive restarts and are shared by every process using the same DB.
+The memory backend is per-process and resets on restart.
+
+rate_limit_check() / rate_limit_increment() are blocking with the sqlite
+backend; call them through async_db from handlers.
 """
 
 import time
 import logging
-from typing import Dict, Tuple, Optional
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Deque, List, Tuple, Optional
 
 import config
+from database import get_db_connection
 
 logger = logging.getLogger(__name__)
 
-_rate_limit_store: Dict[int, list] = {}
+# sqlite backend: drop expired rows at most this often
+PURGE_INTERVAL_SECONDS = 600
 
 
-def _cleanup_expired(user_id: int) -> list:
-    """Remove expired timestamps for a user."""
-    window_seconds = config.RATE_LIMIT_WINDOW_HOURS * 3600
-    now = time.time()
-    timestamps = _rate_limit_store.get(user_id, [])
-    valid = [ts for ts in timestamps if (now - ts) < window_seconds]
-    _rate_limit_store[user_id] = valid
-    return valid
+class RateLimiterBackend(ABC):
+    """Stores hit timestamps per user."""
+
+    @abstractmethod
+    def recent(self, user_id: int, since: float) -> List[float]:
+        """Hit timestamps newer than `since`, oldest first."""
+
+    @abstractmethod
+    def add(self, user_id: int, ts: float):
+        """Record one hit."""
+
+    @abstractmethod
+    def purge(self, before: float) -> int:
+        """Forget hits at or before `before`. Returns hits removed."""
+
+
+class MemoryRateLimiter(RateLimiterBackend):
+    """
+    Per-process backend. One deque per user (expired hits popped from the
+    left); users are kept in last-hit order so idle users, whose hits have
+    all expired, are evicted from the front.
+    """
+
+    def __init__(self):
+        self._hits: "OrderedDict[int, Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def recent(self, user_id: int, since: float) -> List[float]:
+        with self._lock:
+            hits = self._hits.get(user_id)
+            if not hits:
+                return []
+            while hits and hits[0] <= since:
+                hits.popleft()
+            if not hits:
+                del self._hits[user_id]
+                return []
+            return list(hits)
+
+    def add(self, user_id: int, ts: float):
+        with self._lock:
+            hits = self._hits.setdefault(user_id, deque())
+            hits.append(ts)
+            self._hits.move_to_end(user_id)
+        self.purge(ts - _window_seconds())
+
+    def purge(self, before: float) -> int:
+        removed = 0
+        with self._lock:
+            while self._hits:
+                _user_id, hits = next(iter(self._hits.items()))
+                if hits and hits[-1] > before:
+                    break
+                removed += len(hits)
+                self._hits.popitem(last=False)
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+
+class SQLiteRateLimiter(RateLimiterBackend):
+    """Shared, persistent backend on the rate_limit_hits table."""
+
+    def __init__(self):
+        self._last_purge = 0.0
+        conn = get_db_connection()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limit_hits (
+                    user_id INTEGER NOT NULL,
+                    ts REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limit_hits_user ON rate_limit_hits(user_id, ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limit_hits_ts ON rate_limit_hits(ts)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def recent(self, user_id: int, since: float) -> List[float]:
+        conn = get_db_connection()
+        try:
+            rows = conn.execute(
+                "SELECT ts FROM rate_limit_hits WHERE user_id = ? AND ts > ? ORDER BY ts",
+                (user_id, since)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def add(self, user_id: int, ts: float):
+        conn = get_db_connection()
+        try:
+            conn.execute("INSERT INTO rate_limit_hits (user_id, ts) VALUES (?, ?)", (user_id, ts))
+            conn.commit()
+        finally:
+            conn.close()
+        if ts - self._last_purge >= PURGE_INTERVAL_SECONDS:
+            self._last_purge = ts
+            self.purge(ts - _window_seconds())
+
+    def purge(self, before: float) -> int:
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute("DELETE FROM rate_limit_hits WHERE ts <= ?", (before,))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+
+def _window_seconds() -> float:
+    return config.RATE_LIMIT_WINDOW_HOURS * 3600
+
+
+def _create_backend() -> RateLimiterBackend:
+    if config.RATE_LIMIT_BACKEND == 'memory':
+        return MemoryRateLimiter()
+    if config.RATE_LIMIT_BACKEND != 'sqlite':
+        logger.warning(f"[RateLimit] Backend '{config.RATE_LIMIT_BACKEND}' tidak dikenali, guna sqlite.")
+    return SQLiteRateLimiter()
+
+
+_backend = _create_backend()
 
 
 def rate_limit_check(user_id: int) -> Tuple[bool, Optional[str]]:
@@ -38,12 +167,13 @@ def rate_limit_check(user_id: int) -> Tuple[bool, Optional[str]]:
     if not config.RATE_LIMIT_ENABLED:
         return True, None
 
-    valid = _cleanup_expired(user_id)
+    now = time.time()
+    valid = _backend.recent(user_id, now - _window_seconds())
 
     if len(valid) >= config.RATE_LIMIT_MAX:
-        window_seconds = config.RATE_LIMIT_WINDOW_HOURS * 3600
-        oldest = min(valid)
-        remaining_seconds = window_seconds - (time.time() - oldest)
+        # A slot frees up when the hit RATE_LIMIT_MAX-th from the end expires
+        freeing = valid[len(valid) - config.RATE_LIMIT_MAX]
+        remaining_seconds = _window_seconds() - (now - freeing)
         hours = int(remaining_seconds // 3600)
         minutes = int((remaining_seconds % 3600) // 60) + 1
         time_str = ""
@@ -63,7 +193,7 @@ def rate_limit_increment(user_id: int):
     if not config.RATE_LIMIT_ENABLED:
         return
 
-    if user_id not in _rate_limit_store:
-        _rate_limit_store[user_id] = []
-    _rate_limit_store[user_id].append(time.time())
-    logger.info(f"[RateLimit] User {user_id} Truecaller count: {len(_rate_limit_store[user_id])}")
+    now = time.time()
+    _backend.add(user_id, now)
+    count = len(_backend.recent(user_id, now - _window_seconds()))
+    logger.info(f"[RateLimit] User {user_id} Truecaller count: {count}")
@@ -0,0 +1,172 @@
+# search_index.py
+"""
+SQLite FTS5 search index (trigram tokenizer) for reports and profiles.
+Each searchable table gets an external-content FTS5 table kept in sync by
+AFTER INSERT/UPDATE/DELETE triggers, so search runs as an index MATCH
+instead of LIKE '%term%' full table scans. Trigram keeps substring search
+working (terms of 3+ characters).
+
+One-shot rebuild for existing databases (also needed after VACUUM, which may
+renumber the implicit rowid of 'profiles'):
+  python search_index.py --rebuild
+"""
+
+import logging
+import sqlite3
+from typing import Optional
+
+from database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# fts_table: (content_table, rowid_column, indexed_columns)
+FTS_TABLES = {
+    "reports_fts": (
+        "reports", "report_id",
+        ["title", "against_phone_number", "against_phone_name", "against_bank_number",
+         "against_bank_holder_name", "against_social_url", "additional_info"]
+    ),
+    "profiles_fts": ("profiles", "rowid", ["main_identifier", "unconfirmed_names"]),
+    "bank_accounts_fts": ("profile_bank_accounts", "account_id", ["account_number", "holder_name"]),
+    "phone_numbers_fts": ("profile_phone_numbers", "phone_id", ["phone_number"]),
+    "social_media_fts": ("profile_social_media", "social_id", ["url"]),
+}
+
+# Trigram tokenizer cannot match anything shorter than this
+MIN_TERM_LENGTH = 3
+
+_index_ready = False
+
+
+def _schema_for(fts_table: str) -> str:
+    content_table, rowid_col, columns = FTS_TABLES[fts_table]
+    cols = ", ".join(columns)
+    new_vals = ", ".join(f"new.{c}" for c in columns)
+    old_vals = ", ".join(f"old.{c}" for c in columns)
+    return f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            {cols},
+            content='{content_table}', content_rowid='{rowid_col}',
+            tokenize='trigram'
+        );
+
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {content_table} BEGIN
+            INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.{rowid_col}, {new_vals});
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {content_table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.{rowid_col}, {old_vals});
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {cols} ON {content_table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, {cols}) VALUES ('delete', old.{rowid_col}, {old_vals});
+            INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.{rowid_col}, {new_vals});
+        END;
+    """
+
+
+def _trigram_supported(cursor) -> bool:
+    """Probe FTS5 + trigram on a throwaway temp table before touching the schema."""
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(a, tokenize='trigram')")
+        cursor.execute("DROP TABLE temp.fts_probe")
+        return True
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 trigram tidak disokong ({e}). Carian guna LIKE.")
+        return False
+
+
+def _install(cursor, rebuild: set):
+    """
+    Create every FTS table + trigger in one transaction and fill the tables
+    in `rebuild`. executescript() commits any open transaction first, so the
+    whole schema goes in a single script that opens its own BEGIN; the
+    caller commits, or rolls back a half install.
+    """
+    cursor.executescript("BEGIN;" + "".join(_schema_for(fts_table) for fts_table in FTS_TABLES))
+    for fts_table in FTS_TABLES:
+        if fts_table in rebuild:
+            cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
+
+def setup_search_index():
+    """
+    Create FTS5 tables + sync triggers. Newly created indexes are populated
+    from existing rows. If this SQLite build has no FTS5/trigram support,
+    search falls back to LIKE queries.
+    """
+    global _index_ready
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        if not _trigram_supported(cursor):
+            _index_ready = False
+            return
+
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ({})".format(
+                ",".join("?" * len(FTS_TABLES))
+            ),
+            list(FTS_TABLES)
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        created = set(FTS_TABLES) - existing
+
+        _install(cursor, created)
+        conn.commit()
+        for fts_table in sorted(created):
+            logger.info(f"Search index {fts_table} dicipta dan diisi.")
+        _index_ready = True
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        _index_ready = False
+        logger.warning(f"Search index gagal dipasang ({e}). Carian guna LIKE.")
+    finally:
+        conn.close()
+
+
+def rebuild_search_index():
+    """Rebuild every FTS index from its content table."""
+    conn = get_db_connection()
+    try:
+        _install(conn.cursor(), set(FTS_TABLES))
+        conn.commit()
+        logger.info(f"Search index dibina semula: {', '.join(FTS_TABLES)}.")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def is_search_index_ready() -> bool:
+    return _index_ready
+
+
+def match_expression(term: str, column: Optional[str] = None) -> Optional[str]:
+    """
+    Build an FTS5 MATCH expression for a substring search of `term`
+    (optionally restricted to one column). Returns None if the term is too
+    short for the trigram tokenizer.
+    """
+    term = term.strip()
+    if len(term) < MIN_TERM_LENGTH:
+        return None
+    phrase = '"' + term.replace('"', '""') + '"'
+    if column:
+        return f"{column} : {phrase}"
+    return phrase
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="PenipuMY search index maintenance")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild all FTS5 indexes from scratch")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        rebuild_search_index()
+    else:
+        parser.print_help()
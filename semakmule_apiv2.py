@@ -1,15 +1,105 @@
 # semakmule_apiv2.py
 """
-Dummy SemakMule PDRM API for opensource bot.
-Returns demo data based on config.DEMO_SEMAKMULE_POLICE_REPORTS flag.
+SemakMule PDRM API for opensource bot.
+With SEMAKMULE_API_URL unset it returns demo data based on the
+config.DEMO_SEMAKMULE_POLICE_REPORTS flag.
 Set DEMO_SEMAKMULE_POLICE_REPORTS=0 for clean results, or >0 to simulate police reports found.
+
+With SEMAKMULE_API_URL set, semakmule_lookup_async() talks to it over a
+shared pooled httpx client: bounded concurrency, jittered retries and a
+per-call deadline. Point the URL at a local stub server for testing.
 """
 
+import asyncio
 import logging
+import random
+import threading
+import time
+from typing import Optional
+
+import httpx
+
 import config
 
 logger = logging.getLogger(__name__)
 
+# search_type -> SemakMule category
+SEMAKMULE_CATEGORIES = {
+    'phone': 'telefon',
+    'bank': 'bank',
+}
+
+# Retry on network errors and these statuses only
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+class _LatencyMetrics:
+    """Call counters + latency (EWMA / max) for semakmule_metrics()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.ewma_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency: float, ok: bool, retries: int):
+        with self._lock:
+            self.calls += 1
+            self.errors += 0 if ok else 1
+            self.retries += retries
+            self.ewma_latency = latency if self.calls == 1 else 0.8 * self.ewma_latency + 0.2 * latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'retries': self.retries,
+                'ewma_latency': round(self.ewma_latency, 3),
+                'max_latency': round(self.max_latency, 3),
+            }
+
+
+_metrics = _LatencyMetrics()
+
+
+def semakmule_metrics() -> dict:
+    return _metrics.snapshot()
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=config.SEMAKMULE_REQUEST_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=config.SEMAKMULE_MAX_CONCURRENCY,
+                max_keepalive_connections=config.SEMAKMULE_MAX_CONCURRENCY
+            )
+        )
+    return _client
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(config.SEMAKMULE_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def close_semakmule_client():
+    """Close the shared HTTP client (on shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
 
 def semakmule_lookup(search_type: str, value: str) -> dict:
     """Return a demo SemakMule lookup result."""
@@ -24,3 +114,83 @@ def semakmule_lookup(search_type: str, value: str) -> dict:
         'police_reports': police_reports,
         'raw': {}
     }
+
+
+def _parse(search_type: str, value: str, data: dict) -> dict:
+    """Lookup result from the response JSON. ValueError if it has the wrong shape."""
+    if not isinstance(data, dict):
+        raise ValueError("response is not an object")
+    table = data.get('table_data') or []
+    if not isinstance(table, list):
+        raise ValueError("'table_data' is not a list")
+    police_reports = data.get('police_reports', data.get('count', len(table)))
+    if not isinstance(police_reports, int) or isinstance(police_reports, bool):
+        raise ValueError("'police_reports' is not a number")
+    return {
+        'ok': True,
+        'category': search_type,
+        'keyword': value,
+        'search_count': data.get('search_count', police_reports),
+        'police_reports': police_reports,
+        'raw': data
+    }
+
+
+def _error(search_type: str, value: str, message: str) -> dict:
+    return {'ok': False, 'status': 'error', 'category': search_type, 'keyword': value, 'message': message}
+
+
+async def _request(search_type: str, value: str) -> tuple:
+    """POST with jittered exponential backoff. Returns (result, retries)."""
+    attempts = config.SEMAKMULE_MAX_RETRIES + 1
+    last_error = None
+    for attempt in range(attempts):
+        if attempt:
+            delay = config.SEMAKMULE_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+            await asyncio.sleep(random.uniform(0, delay))   # full jitter
+        try:
+            async with _get_semaphore():
+                response = await _get_client().post(
+                    config.SEMAKMULE_API_URL,
+                    data={'category': SEMAKMULE_CATEGORIES.get(search_type, search_type), 'keyword': value}
+                )
+        except httpx.TransportError as e:
+            last_error = type(e).__name__
+            logger.warning(f"[SemakMule] Attempt {attempt + 1}/{attempts} gagal: {last_error}")
+            continue
+
+        if response.status_code in RETRY_STATUSES:
+            last_error = f"HTTP {response.status_code}"
+            logger.warning(f"[SemakMule] Attempt {attempt + 1}/{attempts} gagal: {last_error}")
+            continue
+        if response.status_code != 200:
+            return _error(search_type, value, f"HTTP {response.status_code}"), attempt
+
+        try:
+            return _parse(search_type, value, response.json()), attempt
+        except ValueError:
+            return _error(search_type, value, "Invalid SemakMule response"), attempt
+
+    return _error(search_type, value, f"SemakMule check failed: {last_error}"), attempts - 1
+
+
+async def semakmule_lookup_async(search_type: str, value: str) -> dict:
+    """
+    SemakMule lookup that never blocks the event loop. Same dict shape as
+    semakmule_lookup(); on failure {'ok': False, 'status': 'error', ...}.
+    """
+    if not config.SEMAKMULE_API_URL:
+        return semakmule_lookup(search_type, value)
+
+    started = time.monotonic()
+    retries = 0
+    try:
+        result, retries = await asyncio.wait_for(
+            _request(search_type, value), timeout=config.SEMAKMULE_DEADLINE_SECONDS
+        )
+    except asyncio.TimeoutError:
+        result = _error(search_type, value, "SemakMule deadline exceeded")
+        result['status'] = 'timeout'
+
+    _metrics.record(time.monotonic() - started, result.get('ok', False), retries)
+    return result
@@ -0,0 +1,133 @@
+# semakmule_cache.py
+"""
+Cache for SemakMule results, keyed by (category, keyword).
+Police report counts change slowly, so a result is reused for
+SEMAKMULE_CACHE_TTL_SECONDS. An in-process LRU sits in front of the
+semakmule_cache table (write-through on save). Admins can force a refresh
+from the search result.
+"""
+
+import json
+import logging
+import time
+from typing import Optional
+
+import config
+from database import get_db_connection
+from memory_cache import TTLLRUCache
+
+logger = logging.getLogger(__name__)
+
+_memory_cache = TTLLRUCache(config.SEMAKMULE_MEMORY_CACHE_SIZE, config.SEMAKMULE_MEMORY_CACHE_TTL_SECONDS)
+
+
+def init_semakmule_cache_table():
+    """Create semakmule_cache table if not exists"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS semakmule_cache (
+            category TEXT NOT NULL,
+            keyword TEXT NOT NULL,
+            result TEXT NOT NULL,
+            fetched_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (category, keyword)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_semakmule_fetched_at ON semakmule_cache(fetched_at)")
+
+    conn.commit()
+    conn.close()
+
+
+def _with_age(record: dict) -> Optional[dict]:
+    age = time.time() - record['fetched_ts']
+    if age >= config.SEMAKMULE_CACHE_TTL_SECONDS:
+        return None
+    result = dict(record['result'])
+    result['from_cache'] = True
+    result['fetched_at'] = record['fetched_at']
+    result['age_seconds'] = int(age)
+    return result
+
+
+def get_semakmule_cache(category: str, keyword: str) -> Optional[dict]:
+    """Cached result with 'age_seconds' / 'fetched_at', or None if missing or expired."""
+    key = (category, keyword)
+    record = _memory_cache.get(key)
+
+    if record is None:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT result, fetched_at,
+                   (julianday(fetched_at) - 2440587.5) * 86400.0 AS fetched_ts
+            FROM semakmule_cache
+            WHERE category = ? AND keyword = ?
+        """, key)
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row:
+            return None
+        try:
+            record = {'result': json.loads(row['result']), 'fetched_at': row['fetched_at'], 'fetched_ts': row['fetched_ts']}
+        except ValueError:
+            return None
+        _memory_cache.set(key, record)
+
+    return _with_age(record)
+
+
+def save_semakmule_result(category: str, keyword: str, result: dict):
+    """Save a successful SemakMule result (errors are not cached)."""
+    if not result.get('ok'):
+        return
+
+    conn = get_db_connection()
+    try:
+        conn.execute("""
+            INSERT OR REPLACE INTO semakmule_cache (category, keyword, result, fetched_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        """, (category, keyword, json.dumps(result)))
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Failed to save SemakMule result: {e}")
+        conn.rollback()
+        return
+    finally:
+        conn.close()
+
+    now = time.time()
+    _memory_cache.set((category, keyword), {
+        'result': result,
+        'fetched_at': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now)),
+        'fetched_ts': now,
+    })
+
+
+def purge_semakmule_cache() -> int:
+    """Delete rows past the TTL. Returns rows deleted."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "DELETE FROM semakmule_cache WHERE fetched_at < datetime('now', ?)",
+            (f"-{int(config.SEMAKMULE_CACHE_TTL_SECONDS)} seconds",)
+        )
+        deleted = cursor.rowcount
+        conn.commit()
+    finally:
+        conn.close()
+
+    if deleted:
+        logger.info(f"semakmule_cache: {deleted} rekod tamat tempoh dibuang.")
+    return deleted
+
+
+def semakmule_memory_cache_stats() -> dict:
+    return _memory_cache.stats()
+
+
+# Initialize table on import
+init_semakmule_cache_table()
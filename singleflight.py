@@ -0,0 +1,47 @@
+# singleflight.py
+"""
+Request coalescing for upstream lookups.
+Concurrent callers asking for the same key share one in-flight task instead
+of each hitting the upstream API. The shared task is shielded, so a caller
+that gives up (search deadline, per-source timeout) does not cancel it for
+the others.
+
+    result, shared = await upstream_flights.do(("truecaller", phone), lambda: api.lookup(phone))
+    # shared=False -> this caller made the request (charge rate limit here)
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    def start(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[asyncio.Task, bool]:
+        """Start fn() for key unless already running. Returns (task, shared)."""
+        task = self._flights.get(key)
+        if task is not None:
+            return task, True
+
+        task = asyncio.get_running_loop().create_task(fn())
+        self._flights[key] = task
+        task.add_done_callback(lambda _t: self._flights.pop(key, None))
+        return task, False
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Await the shared result for key. Returns (result, shared)."""
+        task, shared = self.start(key, fn)
+        if shared:
+            logger.info(f"[SingleFlight] Join in-flight lookup {key}")
+        return await asyncio.shield(task), shared
+
+
+# Shared by all upstream sources (Truecaller, SemakMule, SocialTracker)
+upstream_flights = SingleFlight()
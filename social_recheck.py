@@ -0,0 +1,159 @@
+# social_recheck.py
+"""
+Background re-verification of tracked social media profiles.
+A JobQueue task walks profile_social_media oldest last_checked_at first and
+re-resolves each account with SocialTracker (by permanent platform_user_id
+when known, else by username). Username changes are written to
+extracted_username; the old handle stays searchable through
+social_username_history.
+
+Each run only takes the share of rows needed to cover every account once
+per SOCIAL_RECHECK_PERIOD_HOURS, so checks are spread over the day, and
+lookups on the same platform are spaced SOCIAL_RECHECK_DELAY_SECONDS apart.
+"""
+
+import asyncio
+import logging
+import math
+from typing import Dict, List, Optional
+
+from telegram.ext import ContextTypes
+
+import async_db
+import config
+from database import db_session
+from social_tracker import SocialTracker, parse_social_url, platform_key
+
+logger = logging.getLogger(__name__)
+
+# Platforms SocialTracker can resolve, by platform_key (threads rows are
+# checked in the instagram pass, with their own platform name)
+RECHECK_PLATFORMS = tuple(dict.fromkeys(
+    platform_key(p) for p in ("instagram", "threads", "tiktok", "telegram", "facebook", "twitter")
+))
+
+_running = False
+
+
+def record_username_change(cursor, social_id: int, new_username: str):
+    """Set extracted_username (caller commits). The old handle is closed off in
+    social_username_history by trigger (see database.migrate_username_history)."""
+    cursor.execute("""
+        UPDATE profile_social_media
+        SET extracted_username = ?, last_checked_at = CURRENT_TIMESTAMP
+        WHERE social_id = ?
+    """, (new_username, social_id))
+
+
+def _due_rows(key: str) -> List[Dict]:
+    """This run's share of rows for one platform_key, never-checked / oldest first."""
+    period = max(1, config.SOCIAL_RECHECK_PERIOD_HOURS) * 3600
+    with db_session() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) FROM profile_social_media
+            WHERE platform_key = ? AND COALESCE(hidden, 0) = 0
+        """, (key,))
+        total = cursor.fetchone()[0]
+        if not total:
+            return []
+
+        batch = min(
+            config.SOCIAL_RECHECK_MAX_BATCH,
+            math.ceil(total * config.SOCIAL_RECHECK_INTERVAL_SECONDS / period)
+        )
+        cursor.execute("""
+            SELECT social_id, url, platform_name, extracted_username, platform_user_id
+            FROM profile_social_media
+            WHERE platform_key = ? AND COALESCE(hidden, 0) = 0
+              AND (last_checked_at IS NULL OR last_checked_at < datetime('now', ?))
+            ORDER BY last_checked_at ASC   -- NULL (never checked) sorts first
+            LIMIT ?
+        """, (key, f"-{int(period)} seconds", max(1, batch)))
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def _apply_result(row: Dict, result: Dict) -> Optional[tuple]:
+    """Write one lookup result. Returns (old, new) username on change."""
+    status = result.get('status')
+    change = None
+    with db_session() as conn:
+        cursor = conn.cursor()
+        if status == 'success':
+            new_username = result.get('username') or row['extracted_username']
+            old_username = row['extracted_username']
+            if old_username and new_username and old_username.lower() != new_username.lower():
+                # History is written by trg_username_history_update on the UPDATE below
+                change = (old_username, new_username)
+            cursor.execute("""
+                UPDATE profile_social_media
+                SET extracted_username = ?, platform_user_id = COALESCE(?, platform_user_id),
+                    display_name = COALESCE(?, display_name), profile_pic_url = COALESCE(?, profile_pic_url),
+                    lookup_status = 'success', last_checked_at = CURRENT_TIMESTAMP
+                WHERE social_id = ?
+            """, (new_username, result.get('platform_user_id'), result.get('display_name'),
+                  result.get('profile_pic_url'), row['social_id']))
+        else:
+            # not_found / error / no_session — ke belakang barisan
+            cursor.execute("""
+                UPDATE profile_social_media
+                SET lookup_status = ?, last_checked_at = CURRENT_TIMESTAMP
+                WHERE social_id = ?
+            """, (status or 'error', row['social_id']))
+    return change
+
+
+async def _recheck_platform(key: str) -> Dict[str, int]:
+    tracker = SocialTracker()
+    counts = {'checked': 0, 'changed': 0, 'failed': 0}
+    rows = await async_db.run(_due_rows, key)
+
+    for i, row in enumerate(rows):
+        if i:
+            await asyncio.sleep(config.SOCIAL_RECHECK_DELAY_SECONDS)
+        platform = (row['platform_name'] or key).lower()
+        try:
+            if row['platform_user_id']:
+                result = await asyncio.to_thread(tracker.lookup_by_id, row['platform_user_id'], platform)
+            else:
+                username = row['extracted_username'] or parse_social_url(row['url']).get('username')
+                if not username:
+                    result = {'status': 'error', 'message': 'No username'}
+                else:
+                    result = await asyncio.to_thread(tracker.lookup, username, platform)
+        except Exception as e:
+            logger.warning(f"[SocialRecheck] Lookup gagal untuk social_id={row['social_id']}: {e}")
+            result = {'status': 'error', 'message': str(e)}
+
+        change = await async_db.run(_apply_result, row, result)
+        counts['checked'] += 1
+        if result.get('status') != 'success':
+            counts['failed'] += 1
+        if change:
+            counts['changed'] += 1
+            logger.info(f"[SocialRecheck] {platform} @{change[0]} -> @{change[1]} (social_id={row['social_id']})")
+
+    return counts
+
+
+async def recheck_social_profiles(context: ContextTypes.DEFAULT_TYPE):
+    """JobQueue callback: re-verify this run's share of tracked social profiles, platforms in parallel."""
+    global _running
+    if _running:
+        logger.info("[SocialRecheck] Run sebelumnya belum selesai, langkau.")
+        return
+    _running = True
+    try:
+        results = await asyncio.gather(
+            *(_recheck_platform(p) for p in RECHECK_PLATFORMS), return_exceptions=True
+        )
+        summary = {}
+        for platform, res in zip(RECHECK_PLATFORMS, results):
+            if isinstance(res, Exception):
+                logger.error(f"[SocialRecheck] {platform} gagal: {res}")
+            elif res['checked']:
+                summary[platform] = res
+        if summary:
+            logger.info(f"[SocialRecheck] {summary}")
+    finally:
+        _running = False
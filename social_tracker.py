@@ -89,6 +89,16 @@ def parse_social_url(url: str) -> Dict:
     return {'platform': 'unknown', 'username': None, 'original_url': url_clean}
 
 
+# Platforms sharing one account ID space (Threads uses the Instagram account)
+PLATFORM_KEY_ALIASES = {'threads': 'instagram'}
+
+
+def platform_key(platform: str) -> str:
+    """Canonical platform key as stored in profile_social_media.platform_key."""
+    key = (platform or '').strip().lower()
+    return PLATFORM_KEY_ALIASES.get(key, key)
+
+
 # ============================================================
 #  SOCIAL TRACKER (dummy — returns demo data based on config)
 # ============================================================
@@ -119,3 +129,32 @@ class SocialTracker:
                 'profile_pic_url': None,
                 'message': 'Account not found.'
             }
+
+    def lookup_by_id(self, platform_user_id: str, platform: str) -> Dict:
+        """
+        Resolve a permanent platform user ID to its current profile
+        (used by the background re-verification). Demo: IDs look like
+        'demo_<platform>_<username>'.
+        """
+        logger.info(f"[SocialTracker] Demo ID lookup: {platform_user_id} on {platform}")
+
+        prefix = f'demo_{platform}_'
+        if config.DEMO_SOCIAL_TRACKER_FOUND and platform_user_id and platform_user_id.startswith(prefix):
+            username = platform_user_id[len(prefix):]
+            return {
+                'status': 'success',
+                'platform': platform,
+                'username': username,
+                'platform_user_id': platform_user_id,
+                'display_name': f'Demo ({username})',
+                'profile_pic_url': None
+            }
+        return {
+            'status': 'not_found',
+            'platform': platform,
+            'username': None,
+            'platform_user_id': platform_user_id,
+            'display_name': None,
+            'profile_pic_url': None,
+            'message': 'Account not found.'
+        }
@@ -0,0 +1,290 @@
+# stats_counters.py
+"""
+Materialised statistics for the Statistics screen.
+stats_counters holds one row per global counter and stats_daily one row per
+(day, counter). Both are kept up to date by triggers on users, reports,
+report_identifiers and truecaller_cache, so every write path (register_user,
+submit_report, admin verify/status changes, cache saves) is covered without
+touching the handlers. Reading the statistics is a couple of primary-key
+lookups instead of a dozen aggregate queries.
+
+reconcile_stats_counters() recomputes everything from the source tables; it
+runs on startup when the tables are new and periodically from the JobQueue
+to catch drift (and to refresh active_users_30d, which is a rolling window
+and cannot be maintained by triggers).
+
+Manual reconcile:
+  python stats_counters.py --reconcile
+"""
+
+import logging
+from typing import Dict
+
+from database import db_session
+
+logger = logging.getLogger(__name__)
+
+# Counters that are maintained by triggers and therefore checked for drift
+TRIGGER_COUNTERS = (
+    "total_users",
+    "total_reports",
+    "distinct_bank",
+    "distinct_phone",
+    "distinct_social",
+    "total_verified_loss",
+    "highest_single_loss",
+    "tc_cache_count",
+)
+
+# Rolling-window counters, refreshed by reconcile only
+WINDOW_COUNTERS = ("active_users_30d",)
+
+STATS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value REAL NOT NULL DEFAULT 0,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        day TEXT NOT NULL,
+        name TEXT NOT NULL,
+        value REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, name)
+    );
+
+    -- users
+    CREATE TRIGGER IF NOT EXISTS stats_users_ai AFTER INSERT ON users BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'total_users';
+        INSERT INTO stats_daily (day, name, value)
+        VALUES (COALESCE(date(new.created_date), date('now')), 'new_users', 1)
+        ON CONFLICT(day, name) DO UPDATE SET value = value + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_users_ad AFTER DELETE ON users BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'total_users';
+        UPDATE stats_daily SET value = value - 1
+        WHERE day = date(old.created_date) AND name = 'new_users';
+    END;
+
+    -- reports
+    CREATE TRIGGER IF NOT EXISTS stats_reports_ai AFTER INSERT ON reports BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'total_reports';
+        INSERT INTO stats_daily (day, name, value)
+        VALUES (COALESCE(date(new.submitted_at), date('now')), 'new_reports', 1)
+        ON CONFLICT(day, name) DO UPDATE SET value = value + 1;
+        UPDATE stats_counters SET value = value + COALESCE(new.amount_scammed, 0)
+        WHERE name = 'total_verified_loss' AND new.report_status = 'VERIFIED';
+        UPDATE stats_counters SET value = MAX(value, COALESCE(new.amount_scammed, 0))
+        WHERE name = 'highest_single_loss' AND new.report_status = 'VERIFIED';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_reports_ad AFTER DELETE ON reports BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'total_reports';
+        UPDATE stats_daily SET value = value - 1
+        WHERE day = date(old.submitted_at) AND name = 'new_reports';
+        UPDATE stats_counters SET value = value - COALESCE(old.amount_scammed, 0)
+        WHERE name = 'total_verified_loss' AND old.report_status = 'VERIFIED';
+        UPDATE stats_counters SET value = (
+            SELECT COALESCE(MAX(amount_scammed), 0) FROM reports WHERE report_status = 'VERIFIED'
+        )
+        WHERE name = 'highest_single_loss' AND old.report_status = 'VERIFIED'
+          AND COALESCE(old.amount_scammed, 0) >= value;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_reports_au
+    AFTER UPDATE OF report_status, amount_scammed ON reports BEGIN
+        UPDATE stats_counters SET value = value
+            + (CASE WHEN new.report_status = 'VERIFIED' THEN COALESCE(new.amount_scammed, 0) ELSE 0 END)
+            - (CASE WHEN old.report_status = 'VERIFIED' THEN COALESCE(old.amount_scammed, 0) ELSE 0 END)
+        WHERE name = 'total_verified_loss';
+        -- Max hilang (unverify / amount turun): kira semula, jarang berlaku
+        UPDATE stats_counters SET value = (
+            SELECT COALESCE(MAX(amount_scammed), 0) FROM reports WHERE report_status = 'VERIFIED'
+        )
+        WHERE name = 'highest_single_loss' AND old.report_status = 'VERIFIED'
+          AND COALESCE(old.amount_scammed, 0) >= value;
+        UPDATE stats_counters SET value = MAX(value, COALESCE(new.amount_scammed, 0))
+        WHERE name = 'highest_single_loss' AND new.report_status = 'VERIFIED';
+    END;
+
+    -- report_identifiers: distinct canonical values per kind (uses idx_report_identifiers_value)
+    CREATE TRIGGER IF NOT EXISTS stats_identifiers_ai AFTER INSERT ON report_identifiers BEGIN
+        UPDATE stats_counters SET value = value + 1
+        WHERE name = 'distinct_' || new.kind
+          AND NOT EXISTS (
+              SELECT 1 FROM report_identifiers
+              WHERE kind = new.kind AND canonical_value = new.canonical_value
+                AND identifier_id <> new.identifier_id
+          );
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_identifiers_ad AFTER DELETE ON report_identifiers BEGIN
+        UPDATE stats_counters SET value = value - 1
+        WHERE name = 'distinct_' || old.kind
+          AND NOT EXISTS (
+              SELECT 1 FROM report_identifiers
+              WHERE kind = old.kind AND canonical_value = old.canonical_value
+          );
+    END;
+"""
+
+# truecaller_cache is created by truecaller_db; saves use INSERT OR REPLACE,
+# which does not fire DELETE triggers, so count new phone numbers BEFORE insert.
+TRUECALLER_SCHEMA = """
+    CREATE TRIGGER IF NOT EXISTS stats_truecaller_bi BEFORE INSERT ON truecaller_cache BEGIN
+        UPDATE stats_counters SET value = value + 1
+        WHERE name = 'tc_cache_count'
+          AND NOT EXISTS (SELECT 1 FROM truecaller_cache WHERE phone_number = new.phone_number);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS stats_truecaller_ad AFTER DELETE ON truecaller_cache BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'tc_cache_count';
+    END;
+"""
+
+
+def _table_exists(cursor, name: str) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def setup_stats_counters():
+    """
+    Create stats tables + triggers. Must run after the tables it watches
+    exist (setup_database, migrate_report_identifiers). Fills the counters
+    on first run.
+    """
+    with db_session() as conn:
+        cursor = conn.cursor()
+        cursor.executescript(STATS_SCHEMA)
+        if _table_exists(cursor, "truecaller_cache"):
+            cursor.executescript(TRUECALLER_SCHEMA)
+        cursor.execute("SELECT COUNT(*) FROM stats_counters")
+        is_empty = cursor.fetchone()[0] == 0
+
+    if is_empty:
+        reconcile_stats_counters()
+        logger.info("stats_counters dicipta dan diisi.")
+
+
+def _compute_counters(cursor) -> Dict[str, float]:
+    """The full (slow) aggregate queries, used only by reconcile."""
+    counters = {}
+
+    cursor.execute("SELECT COUNT(*) FROM users")
+    counters["total_users"] = cursor.fetchone()[0]
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM users
+        WHERE last_active_datetime >= datetime('now','-30 day')
+    """)
+    counters["active_users_30d"] = cursor.fetchone()[0]
+
+    cursor.execute("SELECT COUNT(*) FROM reports")
+    counters["total_reports"] = cursor.fetchone()[0]
+
+    for kind in ("bank", "phone", "social"):
+        cursor.execute(
+            "SELECT COUNT(DISTINCT canonical_value) FROM report_identifiers WHERE kind = ?",
+            (kind,)
+        )
+        counters[f"distinct_{kind}"] = cursor.fetchone()[0]
+
+    cursor.execute("""
+        SELECT COALESCE(SUM(amount_scammed),0), COALESCE(MAX(amount_scammed),0)
+        FROM reports
+        WHERE report_status = 'VERIFIED'
+    """)
+    counters["total_verified_loss"], counters["highest_single_loss"] = cursor.fetchone()
+
+    if _table_exists(cursor, "truecaller_cache"):
+        cursor.execute("SELECT COUNT(*) FROM truecaller_cache")
+        counters["tc_cache_count"] = cursor.fetchone()[0]
+    else:
+        counters["tc_cache_count"] = 0
+
+    return counters
+
+
+def reconcile_stats_counters() -> Dict[str, float]:
+    """
+    Recompute every counter and daily rollup from the source tables.
+    Returns {counter: drift} for trigger-maintained counters that were off.
+    """
+    with db_session() as conn:
+        cursor = conn.cursor()
+        # Kunci tulis dulu supaya tiada insert lain di antara kiraan dan simpan
+        cursor.execute("BEGIN IMMEDIATE")
+
+        cursor.execute("SELECT name, value FROM stats_counters")
+        current = {row["name"]: row["value"] for row in cursor.fetchall()}
+        actual = _compute_counters(cursor)
+
+        cursor.executemany(
+            """
+            INSERT INTO stats_counters (name, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            """,
+            list(actual.items())
+        )
+
+        cursor.execute("DELETE FROM stats_daily")
+        cursor.execute("""
+            INSERT INTO stats_daily (day, name, value)
+            SELECT date(created_date), 'new_users', COUNT(*)
+            FROM users WHERE created_date IS NOT NULL
+            GROUP BY date(created_date)
+        """)
+        cursor.execute("""
+            INSERT INTO stats_daily (day, name, value)
+            SELECT date(submitted_at), 'new_reports', COUNT(*)
+            FROM reports WHERE submitted_at IS NOT NULL
+            GROUP BY date(submitted_at)
+        """)
+
+    drift = {}
+    if current:
+        for name in TRIGGER_COUNTERS:
+            delta = actual[name] - current.get(name, 0)
+            if abs(delta) > 1e-6:
+                drift[name] = delta
+    if drift:
+        logger.warning(f"stats_counters drift dibetulkan: {drift}")
+    return drift
+
+
+def read_stats_counters() -> Dict[str, float]:
+    """Counters + today's/yesterday's new users, as one small read."""
+    with db_session() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name, value FROM stats_counters")
+        counters = {row["name"]: row["value"] for row in cursor.fetchall()}
+
+        cursor.execute("""
+            SELECT
+                COALESCE(SUM(CASE WHEN day = date('now') THEN value END), 0),
+                COALESCE(SUM(CASE WHEN day = date('now','-1 day') THEN value END), 0)
+            FROM stats_daily
+            WHERE name = 'new_users' AND day IN (date('now'), date('now','-1 day'))
+        """)
+        counters["new_users_today"], counters["new_users_yesterday"] = cursor.fetchone()
+
+    for name in TRIGGER_COUNTERS + WINDOW_COUNTERS:
+        counters.setdefault(name, 0)
+    return counters
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="PenipuMY statistics counters maintenance")
+    parser.add_argument("--reconcile", action="store_true", help="recompute all counters from the source tables")
+    args = parser.parse_args()
+
+    if args.reconcile:
+        setup_stats_counters()
+        print(reconcile_stats_counters() or "no drift")
+    else:
+        parser.print_help()
@@ -0,0 +1,73 @@
+# stats_image_cache.py
+"""
+In-memory cache for the rendered Statistics image.
+Holds the last PNG, the Telegram file_id it was uploaded as, and the stats
+version (hash of the numbers shown) it was rendered from. The image is
+stale once the version changes or it is older than STATS_IMAGE_TTL_SECONDS;
+a JobQueue task re-renders it ahead of that, so a click normally just
+re-sends the file_id.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Optional, Union
+
+import config
+
+
+def stats_version(stats: dict) -> str:
+    """Stable hash of the statistics shown on the image."""
+    payload = json.dumps(stats, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StatsImageCache:
+    def __init__(self, ttl_seconds: float):
+        self._ttl = ttl_seconds
+        self._version: Optional[str] = None
+        self._png: Optional[bytes] = None
+        self._file_id: Optional[str] = None
+        self._rendered_at = 0.0
+        # Satu render pada satu masa (job + klik serentak)
+        self.lock = asyncio.Lock()
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._version
+
+    def age(self) -> float:
+        return time.monotonic() - self._rendered_at
+
+    def is_fresh(self, version: str) -> bool:
+        return self._png is not None and version == self._version and self.age() < self._ttl
+
+    def needs_refresh(self, version: str, lead_seconds: float = 0) -> bool:
+        """True if stale now, or will expire within lead_seconds."""
+        return (
+            self._png is None
+            or version != self._version
+            or self.age() >= self._ttl - lead_seconds
+        )
+
+    def photo(self) -> Optional[Union[str, bytes]]:
+        """file_id if uploaded, else PNG bytes, else None."""
+        return self._file_id or self._png
+
+    def store(self, version: str, png: bytes):
+        self._version = version
+        self._png = png
+        self._file_id = None
+        self._rendered_at = time.monotonic()
+
+    def set_file_id(self, version: Optional[str], file_id: str):
+        # Abaikan jika imej sudah diganti semasa upload
+        if version == self._version:
+            self._file_id = file_id
+
+    def forget_file_id(self):
+        self._file_id = None
+
+
+stats_image_cache = StatsImageCache(config.STATS_IMAGE_TTL_SECONDS)
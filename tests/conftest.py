@@ -0,0 +1,143 @@
+# tests/conftest.py
+"""
+Shared test setup.
+
+The bot modules read config at import time and create their SQLite tables
+in the working directory (DB_NAME is relative), so tests import them only
+inside tests / fixtures, after `bot_db` has moved into a temp directory.
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+os.environ.setdefault("BOT_TOKEN", "test-token")
+
+
+@pytest.fixture(scope="session")
+def bot_db(tmp_path_factory):
+    """Fresh scam_reports.db with every migration main.py runs."""
+    old_cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("bot"))
+
+    import config
+    import database
+    from search_index import setup_search_index
+    from stats_counters import setup_stats_counters
+
+    database.setup_database()
+    database.migrate_social_media_columns()
+    database.migrate_reports_columns()
+    database.migrate_report_identifiers()
+    database.migrate_username_history()
+    database.migrate_profile_search_indexes()
+    setup_search_index()
+    setup_stats_counters()
+
+    yield os.path.abspath(config.DB_NAME)
+
+    database.close_db_connections()
+    os.chdir(old_cwd)
+
+
+class FakeUpstream:
+    """
+    Local HTTP server for the upstream API clients. Each request gets the
+    next queued (status, body, delay) reply (the last one repeats).
+    """
+
+    def __init__(self):
+        import json
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.replies = [(200, {}, 0.0)]
+        self.requests = []
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                upstream.requests.append((self.command, self.path, dict(self.headers), self.rfile.read(length)))
+                index = min(len(upstream.requests), len(upstream.replies)) - 1
+                status, body, delay = upstream.replies[index]
+                if delay:
+                    time.sleep(delay)
+                data = body if isinstance(body, bytes) else json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except OSError:
+                    pass   # client gave up (timeout tests)
+
+            do_GET = do_POST = _reply
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/lookup"
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+
+    def reply(self, *replies):
+        """Queue replies: each is status, (status, body) or (status, body, delay)."""
+        self.replies = [r if isinstance(r, tuple) else (r, {}) for r in replies]
+        self.replies = [r + (0.0,) * (3 - len(r)) for r in self.replies]
+        self.requests = []
+
+    @property
+    def hits(self) -> int:
+        return len(self.requests)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def fake_upstream():
+    server = FakeUpstream()
+    yield server
+    server.close()
+
+
+class FakeTruecaller:
+    """Stands in for TruecallerAPI in handler tests; counts upstream calls."""
+
+    calls = 0
+    delay = 0.2
+    name = 'Fresh Name'
+
+    async def lookup(self, phone_number: str, country_code: str = "my") -> dict:
+        import asyncio
+        type(self).calls += 1
+        await asyncio.sleep(self.delay)
+        return {'status': 'success', 'name': self.name, 'carrier': 'Maxis', 'is_spam': False, 'spam_type': None}
+
+
+@pytest.fixture
+def truecaller_search(bot_db, monkeypatch):
+    """handlers_search with a fake Truecaller, in-memory rate limiter and a fresh quota bucket."""
+    import handlers_search
+    import rate_limit
+    import config
+    from upstream_quota import TokenBucket
+
+    monkeypatch.setattr(FakeTruecaller, 'calls', 0)
+    monkeypatch.setattr(handlers_search, 'TruecallerAPI', FakeTruecaller)
+    monkeypatch.setattr(rate_limit, '_backend', rate_limit.MemoryRateLimiter())
+    monkeypatch.setattr(config, 'RATE_LIMIT_ENABLED', True)
+    monkeypatch.setattr(config, 'RATE_LIMIT_MAX', 2)
+    monkeypatch.setattr(config, 'ADMIN_USER_IDS', [])
+    monkeypatch.setattr(handlers_search, 'truecaller_quota', TokenBucket('truecaller', 3600, 10, 0))
+    return handlers_search
@@ -0,0 +1,19 @@
+# tests/test_async_db.py
+import asyncio
+
+
+def test_execute_returns_rowcount_on_reused_connection(bot_db):
+    import async_db
+
+    async def scenario():
+        new_id = await async_db.insert(
+            "INSERT INTO search_logs (query, search_type, ip_address) VALUES (?, ?, ?)", ("x", "test", "t")
+        )
+        assert new_id
+        # Same pooled connection still remembers the INSERT's lastrowid
+        changed = await async_db.execute("UPDATE search_logs SET query = 'y' WHERE log_id = ?", (-1,))
+        assert changed == 0
+        changed = await async_db.execute("UPDATE search_logs SET query = 'y' WHERE log_id = ?", (new_id,))
+        assert changed == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,89 @@
+# tests/test_browser_pool.py
+"""BrowserPool lifecycle against fake Playwright objects (no Chromium needed)."""
+
+import asyncio
+
+import pytest
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def set_viewport_size(self, viewport):
+        pass
+
+
+class FakeContext:
+    def __init__(self):
+        self.page = FakePage()
+        self.closed = False
+
+    async def new_page(self):
+        return self.page
+
+    async def close(self):
+        self.closed = self.page.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    async def new_context(self):
+        self.contexts.append(FakeContext())
+        return self.contexts[-1]
+
+    def is_connected(self):
+        return True
+
+    async def close(self):
+        pass
+
+
+class FakePlaywright:
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    import browser_pool
+
+    browser = FakeBrowser()
+
+    async def launch(playwright):
+        return browser
+
+    monkeypatch.setattr(browser_pool, 'async_playwright', FakePlaywright)
+    monkeypatch.setattr(browser_pool, '_launch_browser', launch)
+    return browser_pool.BrowserPool(2, 100), browser
+
+
+def test_stop_closes_leased_pages(pool):
+    bp, browser = pool
+
+    async def scenario():
+        await bp.start()
+        async with bp.page():
+            await bp.stop()
+        assert all(context.closed for context in browser.contexts)
+
+        # A restarted pool is back to its full size, without the stale page
+        await bp.start()
+        leased = [bp.page() for _ in range(2)]
+        pages = [await lease.__aenter__() for lease in leased]
+        assert len(set(map(id, pages))) == 2 and not any(page.closed for page in pages)
+        for lease in leased:
+            await lease.__aexit__(None, None, None)
+        assert bp._idle.qsize() == 2
+        await bp.stop()
+
+    asyncio.run(scenario())
+    assert all(context.closed for context in browser.contexts)
@@ -0,0 +1,117 @@
+# tests/test_duitnow_parser.py
+"""DuitNow QR / EMVCo TLV parsing: valid payloads, malformed lengths, CRC, nested templates."""
+
+import pytest
+
+from duitnow_parser import _tlv, parse_duitnow, parse_duitnow_qr
+from emv_tlv import TLVError, check_crc, crc16_ccitt, iter_tlv, with_crc
+
+ACCOUNT_INFO = _tlv("00", "MY.COM.PAYNET") + _tlv("01", "501854") + _tlv("02", "8000123456")
+ADDITIONAL = _tlv("01", "INV42") + _tlv("05", "REF0001") + _tlv("07", "T9") + _tlv("08", "Rent")
+
+
+def _payload(account_info=ACCOUNT_INFO, additional=ADDITIONAL, account_tag="26"):
+    return with_crc(
+        _tlv("00", "01") + _tlv("01", "12")
+        + _tlv(account_tag, account_info)
+        + _tlv("52", "5999") + _tlv("53", "458") + _tlv("54", "12.50")
+        + _tlv("58", "MY") + _tlv("59", "ALI BIN ABU") + _tlv("60", "KUALA LUMPUR")
+        + _tlv("62", additional)
+    )
+
+
+def test_crc16_check_value():
+    # CRC-16/CCITT-FALSE check value
+    assert crc16_ccitt(b"123456789") == 0x29B1
+
+
+def test_valid_payload():
+    result = parse_duitnow(_payload())
+    assert result.error is None
+    assert result.crc_valid is True
+    assert (result.merchant_name, result.identifier) == ("ALI BIN ABU", "8000123456")
+    assert (result.bank_code, result.bank_name, result.guid) == ("501854", "CIMB Bank Berhad", "MY.COM.PAYNET")
+    assert (result.initiation, result.mcc, result.currency, result.amount) == ("dynamic", "5999", "458", "12.50")
+    assert (result.country, result.merchant_city) == ("MY", "KUALA LUMPUR")
+    assert (result.bill_number, result.reference, result.terminal_id, result.purpose) == ("INV42", "REF0001", "T9", "Rent")
+    assert parse_duitnow_qr(_payload())["identifier"] == "8000123456"
+
+
+@pytest.mark.parametrize("tag", ["26", "39", "51"])
+def test_any_account_info_template(tag):
+    result = parse_duitnow(_payload(account_tag=tag))
+    assert result.identifier == "8000123456" and result.error is None
+
+
+def test_crc_mismatch():
+    payload = _payload()
+    tampered = payload.replace("8000123456", "8000999999")
+    assert check_crc(tampered) is False
+    result = parse_duitnow(tampered)
+    assert result.crc_valid is False
+    # Still parsed, so the handler can warn about it
+    assert result.identifier == "8000999999"
+
+
+@pytest.mark.parametrize("crc", ["ZZZZ", "１２３４", "1_2F"])
+def test_non_hex_crc_is_invalid(crc):
+    assert check_crc(_payload()[:-4] + crc) is False
+
+
+def test_missing_crc():
+    assert parse_duitnow(_tlv("00", "01") + _tlv("59", "ALI")).crc_valid is None
+
+
+@pytest.mark.parametrize("payload", [
+    "000201" + "59²3abc",      # unicode digit in the length
+    "000201" + "59٣3abc",      # Arabic-Indic digit
+    "000201" + "59ab",         # non-digit length
+    "000201" + "591",          # truncated header
+    "000201" + "5920ALI",      # value overruns the payload
+])
+def test_malformed_lengths_never_raise(payload):
+    result = parse_duitnow(payload)
+    assert result.error is not None
+
+
+def test_iter_tlv_raises_tlverror_only():
+    with pytest.raises(TLVError) as err:
+        list(iter_tlv("000201" + "59²3abc"))
+    assert err.value.offset == 6
+
+
+def test_truncated_keeps_earlier_fields():
+    payload = _payload()
+    result = parse_duitnow(payload[:payload.index("5802")])
+    assert result.identifier == "8000123456"
+    assert result.amount == "12.50"
+    assert result.merchant_name is None
+
+
+def test_bad_account_template_keeps_top_level_fields():
+    result = parse_duitnow(_payload(account_info="0099XXXXXX"))
+    assert result.crc_valid is True
+    assert result.error.startswith("Tag 26:")
+    assert result.merchant_name == "ALI BIN ABU"
+    assert result.reference == "REF0001"
+
+
+def test_bad_additional_data_template_keeps_top_level_fields():
+    result = parse_duitnow(_payload(additional="05ZZ"))
+    assert result.error.startswith("Tag 62:")
+    assert (result.identifier, result.merchant_name) == ("8000123456", "ALI BIN ABU")
+
+
+def test_first_identifier_wins_across_templates():
+    payload = with_crc(
+        _tlv("26", _tlv("01", "501854") + _tlv("02", "111111"))
+        + _tlv("27", _tlv("01", "564160") + _tlv("02", "222222"))
+    )
+    result = parse_duitnow(payload)
+    assert (result.identifier, result.bank_name) == ("111111", "CIMB Bank Berhad")
+
+
+@pytest.mark.parametrize("payload", ["", None, "   ", "garbage!!"])
+def test_junk_input(payload):
+    result = parse_duitnow(payload)
+    assert result.merchant_name is None and result.identifier is None
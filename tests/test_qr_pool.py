@@ -0,0 +1,48 @@
+# tests/test_qr_pool.py
+"""QR decode process pool: error containment and broken-pool recovery."""
+
+import asyncio
+import os
+import signal
+import time
+
+
+def test_undecodable_image_returns_empty(bot_db):
+    import qr_utils
+
+    async def scenario():
+        return await qr_utils.decode_qr_codes_async(b'not an image')
+
+    try:
+        assert asyncio.run(scenario()) == []
+    finally:
+        qr_utils.shutdown_qr_pool()
+
+
+def test_broken_pool_is_shut_down_and_replaced(bot_db):
+    import qr_utils
+
+    async def scenario():
+        await qr_utils.decode_qr_codes_async(b'not an image')
+        broken = qr_utils._executor
+        shutdowns = []
+        shutdown = broken.shutdown
+        broken.shutdown = lambda **kwargs: (shutdowns.append(kwargs), shutdown(**kwargs))
+        for process in list(broken._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+        deadline = time.monotonic() + 10
+        while not broken._broken and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        assert await qr_utils.decode_qr_codes_async(b'not an image') == []
+        assert qr_utils._executor is None
+        assert shutdowns == [{'wait': False, 'cancel_futures': True}]
+
+        # Next call gets a fresh pool
+        assert await qr_utils.decode_qr_codes_async(b'not an image') == []
+        assert qr_utils._executor is not None and qr_utils._executor is not broken
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        qr_utils.shutdown_qr_pool()
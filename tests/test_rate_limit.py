@@ -0,0 +1,89 @@
+# tests/test_rate_limit.py
+import time
+
+import pytest
+
+
+@pytest.fixture
+def window(monkeypatch):
+    import config
+    monkeypatch.setattr(config, 'RATE_LIMIT_ENABLED', True)
+    monkeypatch.setattr(config, 'RATE_LIMIT_MAX', 2)
+    monkeypatch.setattr(config, 'RATE_LIMIT_WINDOW_HOURS', 1)
+    return 3600
+
+
+def test_incomplete_backend_fails_when_built(bot_db):
+    from rate_limit import RateLimiterBackend
+
+    class NoPurge(RateLimiterBackend):
+        def recent(self, user_id, since):
+            return []
+
+        def add(self, user_id, ts):
+            pass
+
+    with pytest.raises(TypeError):
+        NoPurge()
+
+
+def test_memory_window_expiry(bot_db, window):
+    from rate_limit import MemoryRateLimiter
+
+    limiter = MemoryRateLimiter()
+    now = time.time()
+    limiter.add(1, now - window - 10)     # already outside the window
+    limiter.add(1, now - 60)
+    limiter.add(1, now)
+    assert limiter.recent(1, now - window) == [now - 60, now]
+    # Expired hits are dropped, and a user with none left is forgotten
+    assert limiter.recent(1, now + 1) == []
+    assert len(limiter) == 0
+
+
+def test_memory_evicts_idle_users_first(bot_db, window):
+    from rate_limit import MemoryRateLimiter
+
+    limiter = MemoryRateLimiter()
+    now = time.time()
+    limiter.add(1, now - window - 100)    # idle
+    limiter.add(2, now - window - 50)     # idle
+    limiter.add(3, now - 10)
+    # add() purged users whose last hit is outside the window
+    assert len(limiter) == 1
+    limiter.add(1, now)
+    assert limiter.recent(3, now - window) == [now - 10]
+    # Least recently hit first: user 3 goes before user 1
+    assert limiter.purge(now - 5) == 1
+    assert len(limiter) == 1 and limiter.recent(1, now - window) == [now]
+
+
+def test_sqlite_counts_hits_per_user(bot_db, window):
+    from rate_limit import SQLiteRateLimiter
+
+    limiter = SQLiteRateLimiter()
+    limiter.purge(time.time() + 1)
+    now = time.time()
+    limiter.add(10, now - window - 1)
+    limiter.add(10, now - 30)
+    limiter.add(10, now)
+    limiter.add(11, now)
+    assert limiter.recent(10, now - window) == [now - 30, now]
+    assert len(limiter.recent(11, now - window)) == 1
+
+    assert limiter.purge(now - window) == 1
+    assert limiter.recent(10, 0) == [now - 30, now]
+    # State lives in the DB: a new instance sees the same hits
+    assert SQLiteRateLimiter().recent(10, now - window) == [now - 30, now]
+
+
+def test_check_and_increment(bot_db, window, monkeypatch):
+    import rate_limit
+
+    monkeypatch.setattr(rate_limit, '_backend', rate_limit.MemoryRateLimiter())
+    assert rate_limit.rate_limit_check(5) == (True, None)
+    rate_limit.rate_limit_increment(5)
+    rate_limit.rate_limit_increment(5)
+    allowed, message = rate_limit.rate_limit_check(5)
+    assert not allowed and "try again in" in message
+    assert rate_limit.rate_limit_check(6) == (True, None)
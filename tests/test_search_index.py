@@ -0,0 +1,47 @@
+# tests/test_search_index.py
+import sqlite3
+
+CONTENT_SCHEMA = """
+    CREATE TABLE reports (report_id INTEGER PRIMARY KEY, title, against_phone_number, against_phone_name,
+                          against_bank_number, against_bank_holder_name, against_social_url, additional_info);
+    CREATE TABLE profiles (main_identifier, unconfirmed_names);
+    CREATE TABLE profile_bank_accounts (account_id INTEGER PRIMARY KEY, account_number, holder_name);
+    CREATE TABLE profile_phone_numbers (phone_id INTEGER PRIMARY KEY, phone_number);
+    CREATE TABLE profile_social_media (social_id INTEGER PRIMARY KEY, url);
+    INSERT INTO reports (title) VALUES ('penipu jual telefon');
+"""
+
+
+def _fts_objects(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT name FROM sqlite_master WHERE name LIKE '%fts%'").fetchall()
+    finally:
+        conn.close()
+
+
+def test_failed_install_leaves_no_partial_index(bot_db, tmp_path, monkeypatch):
+    import search_index
+
+    path = str(tmp_path / 'fresh.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(CONTENT_SCHEMA)
+    conn.close()
+    monkeypatch.setattr(search_index, 'get_db_connection', lambda: sqlite3.connect(path))
+
+    # Last table's triggers point at a missing content table, so the install fails part way
+    monkeypatch.setattr(search_index, 'FTS_TABLES', dict(search_index.FTS_TABLES, zz_fts=('missing', 'id', ['x'])))
+    search_index.setup_search_index()
+    assert not search_index.is_search_index_ready()
+    assert _fts_objects(path) == []
+
+    monkeypatch.setattr(search_index, 'FTS_TABLES', {
+        k: v for k, v in search_index.FTS_TABLES.items() if k != 'zz_fts'
+    })
+    search_index.setup_search_index()
+    assert search_index.is_search_index_ready()
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT rowid FROM reports_fts WHERE reports_fts MATCH 'nipu'").fetchall() == [(1,)]
+    finally:
+        conn.close()
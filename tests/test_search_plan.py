@@ -0,0 +1,62 @@
+# tests/test_search_plan.py
+"""
+EXPLAIN QUERY PLAN regression test for the LIKE profile search: every UNION
+branch must read through an index, and no linked table may be joined to
+another (the old LEFT JOIN + GROUP BY multiplied banks x phones x reports).
+"""
+
+import sqlite3
+
+import pytest
+
+LINKED_TABLES = ("profile_bank_accounts", "profile_phone_numbers", "profile_social_media", "reports")
+
+
+@pytest.fixture
+def plan(bot_db):
+    from handlers_search import PROFILES_LIKE_QUERY
+
+    conn = sqlite3.connect(bot_db)
+    try:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + PROFILES_LIKE_QUERY, ["%abc%"] * 7).fetchall()
+    finally:
+        conn.close()
+    # {node id: (parent id, detail)}
+    return {row[0]: (row[1], row[3]) for row in rows}
+
+
+def _table_steps(plan, table):
+    return [(node, parent, detail) for node, (parent, detail) in plan.items()
+            if detail.split()[:2] in (["SCAN", table], ["SEARCH", table])]
+
+
+def test_each_branch_reads_one_table_through_an_index(plan):
+    for table in ("profiles",) + LINKED_TABLES:
+        steps = [detail for _node, _parent, detail in _table_steps(plan, table)]
+        assert steps, f"{table} missing from plan: {plan}"
+        for detail in steps:
+            assert " USING " in detail, f"full table scan: {detail}"
+            assert "AUTOMATIC" not in detail, f"planner built a temp index: {detail}"
+
+
+def test_branches_are_a_union_not_a_join(plan):
+    compounds = [node for node, (_parent, detail) in plan.items() if detail == "COMPOUND QUERY"]
+    assert len(compounds) == 1
+
+    def ancestors(node):
+        while node in plan:
+            node = plan[node][0]
+            yield node
+
+    for table in LINKED_TABLES:
+        (node, _parent, _detail), = _table_steps(plan, table)
+        chain = list(ancestors(node))
+        assert compounds[0] in chain, f"{table} is not a UNION branch: {plan}"
+        # Nested under another table's step = nested loop join
+        others = {n for t in LINKED_TABLES if t != table for n, _, _ in _table_steps(plan, t)}
+        assert not others.intersection(chain), f"{table} joined to another table: {plan}"
+
+
+def test_outer_profiles_lookup_is_by_key(plan):
+    outer = [detail for _node, _parent, detail in _table_steps(plan, "p")]
+    assert outer and all(detail.startswith("SEARCH p USING") and "profile_id=?" in detail for detail in outer)
@@ -0,0 +1,86 @@
+# tests/test_semakmule_api.py
+"""Live SemakMule client against a local fake server: retries, deadline, bad responses."""
+
+import asyncio
+import time
+
+import pytest
+
+CLEAN = {'police_reports': 0, 'search_count': 3, 'table_data': []}
+
+
+@pytest.fixture
+def semakmule(monkeypatch, fake_upstream):
+    import config
+    import semakmule_apiv2
+
+    monkeypatch.setattr(config, 'SEMAKMULE_API_URL', fake_upstream.url)
+    monkeypatch.setattr(config, 'SEMAKMULE_REQUEST_TIMEOUT_SECONDS', 0.3)
+    monkeypatch.setattr(config, 'SEMAKMULE_DEADLINE_SECONDS', 2.0)
+    monkeypatch.setattr(config, 'SEMAKMULE_MAX_RETRIES', 2)
+    monkeypatch.setattr(config, 'SEMAKMULE_RETRY_BACKOFF_SECONDS', 0.01)
+    monkeypatch.setattr(semakmule_apiv2, '_client', None)
+    monkeypatch.setattr(semakmule_apiv2, '_semaphore', None)
+    monkeypatch.setattr(semakmule_apiv2, '_metrics', semakmule_apiv2._LatencyMetrics())
+    return semakmule_apiv2
+
+
+def _lookup(semakmule_apiv2, search_type='phone', value='0123456789'):
+    async def scenario():
+        try:
+            return await semakmule_apiv2.semakmule_lookup_async(search_type, value)
+        finally:
+            await semakmule_apiv2.close_semakmule_client()
+    return asyncio.run(scenario())
+
+
+def test_success_is_parsed(semakmule, fake_upstream):
+    fake_upstream.reply((200, CLEAN))
+    result = _lookup(semakmule)
+    assert result['ok'] and (result['police_reports'], result['search_count']) == (0, 3)
+    assert fake_upstream.requests[0][3] == b'category=telefon&keyword=0123456789'
+
+
+@pytest.mark.parametrize('status', [429, 500, 502, 503, 504])
+def test_retries_transient_statuses(semakmule, fake_upstream, status):
+    fake_upstream.reply(status, (200, CLEAN))
+    assert _lookup(semakmule)['ok']
+    assert fake_upstream.hits == 2
+    assert semakmule.semakmule_metrics()['retries'] == 1
+
+
+def test_gives_up_after_max_retries(semakmule, fake_upstream):
+    fake_upstream.reply(503)
+    result = _lookup(semakmule)
+    assert (result['ok'], result['status']) == (False, 'error')
+    assert fake_upstream.hits == 3
+    assert semakmule.semakmule_metrics()['errors'] == 1
+
+
+def test_client_errors_are_not_retried(semakmule, fake_upstream):
+    fake_upstream.reply(400)
+    assert _lookup(semakmule)['status'] == 'error'
+    assert fake_upstream.hits == 1
+
+
+def test_request_timeout_is_retried(semakmule, fake_upstream):
+    fake_upstream.reply((200, CLEAN, 1.0), (200, CLEAN))
+    assert _lookup(semakmule)['ok']
+    assert fake_upstream.hits == 2
+
+
+def test_deadline_caps_the_whole_call(semakmule, fake_upstream, monkeypatch):
+    import config
+    monkeypatch.setattr(config, 'SEMAKMULE_DEADLINE_SECONDS', 0.5)
+    fake_upstream.reply((200, CLEAN, 1.0))
+    started = time.monotonic()
+    result = _lookup(semakmule)
+    assert result['status'] == 'timeout'
+    assert time.monotonic() - started < 0.9
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'text', b'not json', {'table_data': 'x'}, {'police_reports': 'many'}])
+def test_malformed_200_is_an_error(semakmule, fake_upstream, body):
+    fake_upstream.reply((200, body))
+    result = _lookup(semakmule)
+    assert (result['ok'], result['status']) == (False, 'error')
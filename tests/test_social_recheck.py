@@ -0,0 +1,67 @@
+# tests/test_social_recheck.py
+import sqlite3
+
+
+def test_due_rows_use_platform_key_index(bot_db, monkeypatch):
+    import config
+    import social_recheck
+
+    conn = sqlite3.connect(bot_db)
+    try:
+        conn.executemany(
+            "INSERT INTO profile_social_media (profile_id, url, platform_name, extracted_username) VALUES (?, ?, ?, ?)",
+            [('p1', 'https://www.instagram.com/ali', 'Instagram', 'ali'),
+             ('p1', 'https://www.threads.net/@abu', 'Threads', 'abu'),
+             ('p1', 'https://www.tiktok.com/@siti', 'TikTok', 'siti')]
+        )
+        conn.commit()
+        plan = [row[3] for row in conn.execute("""
+            EXPLAIN QUERY PLAN
+            SELECT social_id FROM profile_social_media
+            WHERE platform_key = ? AND COALESCE(hidden, 0) = 0
+              AND (last_checked_at IS NULL OR last_checked_at < datetime('now', ?))
+            ORDER BY last_checked_at ASC
+            LIMIT ?
+        """, ('instagram', '-86400 seconds', 10))]
+    finally:
+        conn.close()
+
+    assert plan == ['SEARCH profile_social_media USING INDEX idx_social_recheck (platform_key=?)']
+    assert 'threads' not in social_recheck.RECHECK_PLATFORMS
+    # Threads rows are picked up in the instagram pass, keeping their own platform name
+    monkeypatch.setattr(config, 'SOCIAL_RECHECK_INTERVAL_SECONDS', config.SOCIAL_RECHECK_PERIOD_HOURS * 3600)
+    rows = social_recheck._due_rows('instagram')
+    assert sorted(row['platform_name'] for row in rows) == ['Instagram', 'Threads']
+
+
+def test_apply_result_records_username_change_once(bot_db):
+    import social_recheck
+
+    conn = sqlite3.connect(bot_db)
+    try:
+        social_id = conn.execute(
+            "INSERT INTO profile_social_media (profile_id, url, platform_name, extracted_username) VALUES (?, ?, ?, ?)",
+            ('p2', 'https://www.instagram.com/lama', 'Instagram', 'lama')
+        ).lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+
+    row = {'social_id': social_id, 'extracted_username': 'lama'}
+    change = social_recheck._apply_result(row, {'status': 'success', 'username': 'baru', 'platform_user_id': '42'})
+    assert change == ('lama', 'baru')
+
+    conn = sqlite3.connect(bot_db)
+    try:
+        history = conn.execute(
+            "SELECT username, seen_to IS NOT NULL FROM social_username_history WHERE social_id = ? ORDER BY history_id",
+            (social_id,)
+        ).fetchall()
+        current = conn.execute(
+            "SELECT extracted_username, platform_user_id, lookup_status FROM profile_social_media WHERE social_id = ?",
+            (social_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    assert history == [('lama', 1), ('baru', 0)]
+    assert current == ('baru', '42', 'success')
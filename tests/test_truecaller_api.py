@@ -0,0 +1,153 @@
+# tests/test_truecaller_api.py
+"""Live Truecaller client against a local fake server: sessions, breaker, retries, timeouts."""
+
+import asyncio
+import time
+
+import pytest
+
+FOUND = {'data': [{'name': 'Ali', 'phones': [{'carrier': 'Maxis'}], 'spamInfo': {}}]}
+
+
+@pytest.fixture
+def make_client(monkeypatch, fake_upstream):
+    """make_client(sessions, max_fails, breaker_threshold) -> (truecaller_api, pool, breaker)"""
+    import config
+    import truecaller_api
+    from truecaller_sessions import CircuitBreaker, SessionPool, TruecallerSession
+
+    def make(sessions=2, max_fails=2, breaker_threshold=5):
+        monkeypatch.setattr(config, 'TRUECALLER_API_URL', fake_upstream.url)
+        monkeypatch.setattr(config, 'TRUECALLER_REQUEST_TIMEOUT_SECONDS', 0.3)
+        monkeypatch.setattr(config, 'TRUECALLER_MAX_ATTEMPTS', 2)
+        monkeypatch.setattr(config, 'TRUECALLER_SESSION_MAX_FAILS', max_fails)
+        monkeypatch.setattr(config, 'TRUECALLER_SESSION_BACKOFF_SECONDS', 60)
+        pool = SessionPool([TruecallerSession(f's{i}', f'token{i}') for i in range(1, sessions + 1)])
+        breaker = CircuitBreaker(failure_threshold=breaker_threshold, cooldown_seconds=0.3)
+        monkeypatch.setattr(truecaller_api, 'truecaller_pool', pool)
+        monkeypatch.setattr(truecaller_api, 'truecaller_breaker', breaker)
+        monkeypatch.setattr(truecaller_api, '_client', None)
+        return truecaller_api, pool, breaker
+    return make
+
+
+@pytest.fixture
+def tc(make_client):
+    return make_client()
+
+
+def _lookups(truecaller_api, count=1, pause=0.0):
+    async def scenario():
+        results = []
+        for _ in range(count):
+            results.append(await truecaller_api.TruecallerAPI().lookup('0123456789'))
+            await asyncio.sleep(pause)
+        await truecaller_api.close_truecaller_client()
+        return results
+    return asyncio.run(scenario())
+
+
+def test_success_is_parsed(tc, fake_upstream):
+    truecaller_api, pool, _breaker = tc
+    fake_upstream.reply((200, FOUND))
+    result, = _lookups(truecaller_api)
+    assert result['status'] == 'success'
+    assert (result['name'], result['carrier']) == ('Ali', 'Maxis')
+    assert fake_upstream.requests[0][2]['Authorization'].startswith('Bearer token')
+
+
+def test_404_is_no_data(tc, fake_upstream):
+    truecaller_api, _pool, _breaker = tc
+    fake_upstream.reply(404)
+    assert _lookups(truecaller_api)[0]['status'] == 'no_data'
+
+
+@pytest.mark.parametrize('status', [429, 500, 503])
+def test_retries_on_next_session(tc, fake_upstream, status):
+    truecaller_api, pool, _breaker = tc
+    fake_upstream.reply(status, (200, FOUND))
+    result, = _lookups(truecaller_api)
+    assert result['status'] == 'success'
+    assert fake_upstream.hits == 2
+    tokens = [r[2]['Authorization'] for r in fake_upstream.requests]
+    assert tokens[0] != tokens[1]
+    assert sorted(s['consecutive_failures'] for s in pool.snapshot()) == [0, 1]
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'text', {'data': {'x': 1}}, {'data': ['x']},
+                                  {'data': [{'phones': 'x'}]}, {'data': [{'spamInfo': 'x'}]}, b'not json'])
+def test_malformed_200_is_an_error(tc, fake_upstream, body):
+    truecaller_api, pool, breaker = tc
+    fake_upstream.reply((200, body))
+    result, = _lookups(truecaller_api)
+    assert result['status'] == 'error'
+    # Not counted as a healthy response
+    assert all(s['consecutive_failures'] == 1 for s in pool.snapshot())
+
+
+def test_failing_session_is_ejected(make_client, fake_upstream):
+    truecaller_api, pool, _breaker = make_client(sessions=1, max_fails=2)
+    fake_upstream.reply(500)
+    results = _lookups(truecaller_api, count=3)
+    # Ejected after TRUECALLER_SESSION_MAX_FAILS; no session left -> cooldown, no request
+    assert [r['status'] for r in results] == ['error', 'error', 'cooldown']
+    assert fake_upstream.hits == 2
+    session, = pool.snapshot()
+    assert session['ejected_for'] > 0
+
+
+def test_ejected_session_is_skipped(make_client, fake_upstream):
+    truecaller_api, pool, _breaker = make_client(sessions=2, max_fails=1)
+    fake_upstream.reply(500, (200, FOUND))
+    _lookups(truecaller_api)
+    ejected = [s['name'] for s in pool.snapshot() if s['ejected_for'] > 0]
+    assert len(ejected) == 1
+
+    fake_upstream.reply((200, FOUND))
+    assert _lookups(truecaller_api, count=2)[-1]['status'] == 'success'
+    assert {r[2]['Authorization'] for r in fake_upstream.requests} == {f"Bearer token{2 if ejected == ['s1'] else 1}"}
+
+
+def test_breaker_opens_then_half_opens(make_client, fake_upstream):
+    truecaller_api, _pool, breaker = make_client(sessions=1, max_fails=10, breaker_threshold=2)
+    fake_upstream.reply(500)
+    results = _lookups(truecaller_api, count=3)
+    # Two failed lookups open the breaker; the third is refused without a request
+    assert [r['status'] for r in results] == ['error', 'error', 'cooldown']
+    assert fake_upstream.hits == 2
+
+    time.sleep(0.35)
+    fake_upstream.reply((200, FOUND))
+    # Half-open: one trial goes through and closes the breaker
+    assert _lookups(truecaller_api)[0]['status'] == 'success'
+    assert breaker.allow() and breaker.remaining() == 0
+
+
+def test_failed_half_open_trial_reopens(make_client, fake_upstream):
+    truecaller_api, _pool, breaker = make_client(sessions=1, max_fails=10, breaker_threshold=2)
+    fake_upstream.reply(500)
+    _lookups(truecaller_api, count=2)
+    time.sleep(0.35)
+    fake_upstream.reply(500)
+    results = _lookups(truecaller_api, count=2)
+    assert [r['status'] for r in results] == ['error', 'cooldown']
+    assert fake_upstream.hits == 1
+
+
+def test_every_session_ejected_is_cooldown(tc, fake_upstream):
+    truecaller_api, pool, _breaker = tc
+    fake_upstream.reply(401)
+    results = _lookups(truecaller_api, count=3)
+    assert results[-1]['status'] == 'cooldown'
+    assert all(s['ejected_for'] > 0 for s in pool.snapshot())
+
+
+def test_slow_upstream_times_out_per_request(tc, fake_upstream):
+    truecaller_api, pool, _breaker = tc
+    fake_upstream.reply((200, FOUND, 1.0))
+    started = time.monotonic()
+    result, = _lookups(truecaller_api)
+    assert result['status'] == 'error'
+    assert 'Timeout' in result['message']
+    # Two attempts x 0.3s request timeout, not the server's 1s each
+    assert time.monotonic() - started < 1.5
@@ -0,0 +1,69 @@
+# tests/test_truecaller_coalescing.py
+"""Stale-while-revalidate and request coalescing for Truecaller lookups."""
+
+import asyncio
+import time
+
+from conftest import FakeTruecaller
+
+
+def _rate_count(user_id):
+    import rate_limit
+    return len(rate_limit._backend.recent(user_id, time.time() - 3600))
+
+
+async def _drain(handlers_search, phone):
+    while handlers_search.upstream_flights.in_flight(('truecaller', phone)):
+        await asyncio.sleep(0.01)
+
+
+def test_stale_cache_answers_now_and_refreshes_once(truecaller_search, monkeypatch):
+    import config
+    from truecaller_db import get_truecaller_cache, save_truecaller_result
+
+    phone = '0111000001'
+    save_truecaller_result(phone, {'status': 'success', 'name': 'Old Name'}, 1)
+    monkeypatch.setattr(config, 'TRUECALLER_CACHE_TTL_SECONDS', 0)
+
+    async def scenario():
+        results = await asyncio.gather(*(truecaller_search._truecaller_source(phone, uid) for uid in (1, 2, 3)))
+        # Answered from the stale row without waiting for the refresh
+        assert all(r['status'] == 'cached' and r['name'] == 'Old Name' and r['stale'] for r in results)
+        assert truecaller_search.upstream_flights.in_flight(('truecaller', phone))
+        await _drain(truecaller_search, phone)
+
+    asyncio.run(scenario())
+    assert FakeTruecaller.calls == 1
+    assert get_truecaller_cache(phone)['name'] == 'Fresh Name'
+    # Background refreshes are not charged to anyone
+    assert [_rate_count(uid) for uid in (1, 2, 3)] == [0, 0, 0]
+
+
+def test_search_joining_a_refresh_gets_its_result(truecaller_search):
+    phone = '0111000002'
+
+    async def scenario():
+        truecaller_search._schedule_truecaller_refresh(phone, 1)
+        return await truecaller_search._truecaller_source(phone, 2)
+
+    result = asyncio.run(scenario())
+    assert result['status'] == 'success' and result['name'] == 'Fresh Name'
+    assert FakeTruecaller.calls == 1
+    assert _rate_count(2) == 0
+
+
+def test_refresh_without_quota_still_returns_a_result(truecaller_search, monkeypatch):
+    from upstream_quota import TokenBucket
+
+    empty = TokenBucket('truecaller', 1, 1, 0)
+    empty._tokens = 0
+    monkeypatch.setattr(truecaller_search, 'truecaller_quota', empty)
+
+    async def scenario():
+        task, _shared = truecaller_search.upstream_flights.start(
+            ('truecaller', '0111000003'), lambda: truecaller_search._refresh_truecaller_cache('0111000003', 1)
+        )
+        return await task
+
+    assert asyncio.run(scenario())['status'] == 'rate_limited'
+    assert FakeTruecaller.calls == 0
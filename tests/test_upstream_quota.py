@@ -0,0 +1,62 @@
+# tests/test_upstream_quota.py
+"""Quota and per-user rate-limit accounting when identical searches coalesce."""
+
+import asyncio
+import time
+
+from conftest import FakeTruecaller
+
+
+def _rate_count(user_id):
+    import rate_limit
+    return len(rate_limit._backend.recent(user_id, time.time() - 3600))
+
+
+def test_concurrent_identical_searches_cost_one_lookup(truecaller_search):
+    users = list(range(101, 106))
+    quota = truecaller_search.truecaller_quota
+
+    async def scenario():
+        return await asyncio.gather(*(truecaller_search._truecaller_source('0112000001', uid) for uid in users))
+
+    results = asyncio.run(scenario())
+    assert all(r['status'] == 'success' and r['name'] == 'Fresh Name' for r in results)
+    assert FakeTruecaller.calls == 1
+    assert quota.granted == 1 and quota.throttled == 0
+    # Only the caller that started the flight is charged
+    assert sorted(_rate_count(uid) for uid in users) == [0, 0, 0, 0, 1]
+
+
+def test_joiners_are_not_starved_by_an_empty_bucket(truecaller_search, monkeypatch):
+    from upstream_quota import TokenBucket
+
+    # One token: the starter takes it, the joiners need none
+    quota = TokenBucket('truecaller', 1, 1, 0)
+    monkeypatch.setattr(truecaller_search, 'truecaller_quota', quota)
+
+    async def scenario():
+        return await asyncio.gather(*(truecaller_search._truecaller_source('0112000002', uid) for uid in (201, 202, 203)))
+
+    results = asyncio.run(scenario())
+    assert [r['status'] for r in results] == ['success'] * 3
+    assert quota.granted == 1 and quota.throttled == 0
+    assert FakeTruecaller.calls == 1
+
+
+def test_rate_limited_user_can_still_join_a_flight(truecaller_search):
+    import rate_limit
+
+    phone = '0112000003'
+    for _ in range(2):
+        rate_limit.rate_limit_increment(302)
+    assert rate_limit.rate_limit_check(302)[0] is False
+
+    async def scenario():
+        starter = asyncio.create_task(truecaller_search._truecaller_source(phone, 301))
+        while not truecaller_search.upstream_flights.in_flight(('truecaller', phone)):
+            await asyncio.sleep(0.01)
+        return await asyncio.gather(starter, truecaller_search._truecaller_source(phone, 302))
+
+    results = asyncio.run(scenario())
+    assert [r['status'] for r in results] == ['success', 'success']
+    assert _rate_count(301) == 1 and _rate_count(302) == 2
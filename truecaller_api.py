@@ -1,22 +1,56 @@
 # truecaller_api.py
 """
-Dummy Truecaller API for opensource bot.
-Returns demo data based on config.DEMO_TRUECALLER_FOUND flag.
-Set DEMO_TRUECALLER_FOUND=true to simulate a name found, or false for no record.
+Truecaller API for opensource bot.
+With no sessions configured (TRUECALLER_SESSIONS_FILE) it returns demo data
+based on config.DEMO_TRUECALLER_FOUND: set DEMO_TRUECALLER_FOUND=true to
+simulate a name found, or false for no record.
+With sessions, lookups go to TRUECALLER_API_URL through the session pool and
+circuit breaker in truecaller_sessions.py (point the URL at a local fake
+server for testing).
 """
 
 import logging
+import math
+import time
+from typing import Optional
+
+import httpx
+
 import config
+from truecaller_sessions import truecaller_pool, truecaller_breaker
 
 logger = logging.getLogger(__name__)
 
-MAX_FAIL_COUNT = 3
+MAX_FAIL_COUNT = config.TRUECALLER_SESSION_MAX_FAILS
+
+# Shared HTTP client (connection reuse across lookups)
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(timeout=config.TRUECALLER_REQUEST_TIMEOUT_SECONDS)
+    return _client
+
+
+async def close_truecaller_client():
+    """Close the shared HTTP client (on shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
 
 class TruecallerAPI:
-    """Dummy Truecaller API that returns demo results."""
+    """Truecaller lookups: live via the session pool, demo results otherwise."""
 
     async def lookup(self, phone_number: str, country_code: str = "my") -> dict:
+        if not len(truecaller_pool):
+            return self._demo_lookup(phone_number)
+        return await self._live_lookup(phone_number, country_code)
+
+    def _demo_lookup(self, phone_number: str) -> dict:
         """Return a demo lookup result based on config flag."""
         logger.info(f"[TruecallerAPI] Demo lookup for {phone_number}")
 
@@ -38,6 +72,112 @@ class TruecallerAPI:
                 'message': 'No record found on Truecaller.'
             }
 
+    def _cooldown(self, remaining: float) -> dict:
+        return {
+            'status': 'cooldown',
+            'cooldown_remaining': math.ceil(remaining) or 1,
+            'message': 'Truecaller API cooling down.'
+        }
+
+    async def _live_lookup(self, phone_number: str, country_code: str) -> dict:
+        if not truecaller_breaker.allow():
+            return self._cooldown(truecaller_breaker.remaining())
+
+        tried = set()
+        last_error = None
+        for _attempt in range(min(config.TRUECALLER_MAX_ATTEMPTS, len(truecaller_pool))):
+            session = truecaller_pool.acquire(exclude=tried)
+            if session is None:
+                break
+            tried.add(session)
+
+            started = time.monotonic()
+            try:
+                response = await _get_client().get(
+                    config.TRUECALLER_API_URL,
+                    params={
+                        'q': phone_number, 'countryCode': country_code,
+                        'type': 4, 'locAddr': '', 'encoding': 'json'
+                    },
+                    headers={'Authorization': f'Bearer {session.token}'}
+                )
+            except httpx.HTTPError as e:
+                truecaller_pool.report_failure(session, time.monotonic() - started)
+                last_error = f"{type(e).__name__}"
+                logger.warning(f"[TruecallerAPI] Session {session.name} gagal: {last_error}")
+                continue
+
+            latency = time.monotonic() - started
+            if response.status_code == 404:
+                truecaller_pool.report_success(session, latency)
+                truecaller_breaker.record_success()
+                return self._no_data()
+            if response.status_code != 200:
+                # 401/403 (session mati), 429 (throttle), 5xx
+                truecaller_pool.report_failure(session, latency)
+                last_error = f"HTTP {response.status_code}"
+                logger.warning(f"[TruecallerAPI] Session {session.name} gagal: {last_error}")
+                continue
+
+            try:
+                result = self._parse(response.json())
+            except ValueError:
+                # 200 tapi bukan JSON / bentuk salah: kira sebagai gagal
+                truecaller_pool.report_failure(session, latency)
+                last_error = "Invalid response"
+                logger.warning(f"[TruecallerAPI] Session {session.name} gagal: {last_error}")
+                continue
+            truecaller_pool.report_success(session, latency)
+            truecaller_breaker.record_success()
+            return result
+
+        if not tried:
+            # Semua session sedang dikeluarkan (backoff)
+            wait = truecaller_pool.next_available_in()
+            truecaller_breaker.trip(wait)
+            return self._cooldown(wait)
+
+        truecaller_breaker.record_failure()
+        return {'status': 'error', 'message': f'Truecaller check failed: {last_error}'}
+
+    def _no_data(self) -> dict:
+        return {
+            'status': 'no_data',
+            'name': None,
+            'carrier': None,
+            'is_spam': False,
+            'spam_type': None,
+            'message': 'No record found on Truecaller.'
+        }
+
+    def _parse(self, payload: dict) -> dict:
+        """Lookup result from the response JSON. ValueError if it has the wrong shape."""
+        if not isinstance(payload, dict):
+            raise ValueError("response is not an object")
+        entries = payload.get('data') or []
+        if not isinstance(entries, list):
+            raise ValueError("'data' is not a list")
+        if not entries:
+            return self._no_data()
+
+        entry = entries[0]
+        if not isinstance(entry, dict):
+            raise ValueError("'data[0]' is not an object")
+        phones = entry.get('phones') or [{}]
+        spam_info = entry.get('spamInfo') or {}
+        if not isinstance(phones, list) or not isinstance(phones[0], dict) or not isinstance(spam_info, dict):
+            raise ValueError("unexpected 'phones' / 'spamInfo' shape")
+        spam_score = spam_info.get('spamScore') or 0
+        name = entry.get('name')
+        return {
+            'status': 'success',
+            'name': name,
+            'name_not_available': not name,
+            'carrier': phones[0].get('carrier'),
+            'is_spam': bool(spam_score) or spam_info.get('spamType') is not None,
+            'spam_type': spam_info.get('spamType')
+        }
+
     def _load_sessions(self) -> dict:
-        """Return empty sessions (no real sessions in demo mode)."""
-        return {'sessions': []}
+        """Configured sessions and their health (no tokens)."""
+        return {'sessions': truecaller_pool.snapshot()}
@@ -1,7 +1,21 @@
 import sqlite3
 import json
+import logging
+import time
 from datetime import datetime
 from database import get_db_connection
+from memory_cache import TTLLRUCache
+import config
+
+logger = logging.getLogger(__name__)
+
+# result_status values stored in truecaller_cache
+POSITIVE = 'success'   # number known to Truecaller
+NEGATIVE = 'no_data'   # no record — cached too so it is not looked up on every search
+
+# In-process tier in front of truecaller_cache (write-through from save_truecaller_result)
+_memory_cache = TTLLRUCache(config.TRUECALLER_MEMORY_CACHE_SIZE, config.TRUECALLER_MEMORY_CACHE_TTL_SECONDS)
+
 
 def init_truecaller_table():
     """Create truecaller_cache table if not exists"""
@@ -22,18 +36,35 @@ def init_truecaller_table():
         )
     """)
 
+    try:
+        cursor.execute(f"ALTER TABLE truecaller_cache ADD COLUMN result_status TEXT DEFAULT '{POSITIVE}'")
+    except sqlite3.OperationalError:
+        pass
+
     cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_truecaller_phone
         ON truecaller_cache(phone_number)
     """)
+    # Expiry sweeps (purge_truecaller_cache)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_truecaller_looked_up_at
+        ON truecaller_cache(looked_up_at)
+    """)
 
     conn.commit()
     conn.close()
 
 
+def _ttl_for(result_status: str) -> int:
+    if result_status == NEGATIVE:
+        return config.TRUECALLER_NEGATIVE_TTL_SECONDS
+    return config.TRUECALLER_CACHE_TTL_SECONDS
+
+
 def save_truecaller_result(phone_number: str, result: dict, user_id: int = None):
-    """Save Truecaller lookup result to database"""
-    if result.get('status') != 'success':
+    """Save Truecaller lookup result (found or no_data) to database"""
+    status = result.get('status')
+    if status not in (POSITIVE, NEGATIVE):
         return
 
     conn = get_db_connection()
@@ -42,8 +73,8 @@ def save_truecaller_result(phone_number: str, result: dict, user_id: int = None)
     try:
         cursor.execute("""
             INSERT OR REPLACE INTO truecaller_cache
-            (phone_number, name, carrier, is_spam, spam_type, raw_result, looked_up_by, looked_up_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            (phone_number, name, carrier, is_spam, spam_type, raw_result, looked_up_by, result_status, looked_up_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
         """, (
             phone_number,
             result.get('name'),
@@ -51,11 +82,24 @@ def save_truecaller_result(phone_number: str, result: dict, user_id: int = None)
             1 if result.get('is_spam') else 0,
             result.get('spam_type'),
             json.dumps(result),
-            user_id
+            user_id,
+            status
         ))
 
         conn.commit()
 
+        # Write-through ke memory LRU
+        now = time.time()
+        _memory_cache.set(phone_number, {
+            'name': result.get('name'),
+            'carrier': result.get('carrier'),
+            'is_spam': 1 if result.get('is_spam') else 0,
+            'spam_type': result.get('spam_type'),
+            'looked_up_at': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now)),
+            'result_status': status,
+            'looked_up_ts': now,
+        })
+
     except Exception as e:
         print(f"Failed to save Truecaller result: {e}")
         conn.rollback()
@@ -64,31 +108,104 @@ def save_truecaller_result(phone_number: str, result: dict, user_id: int = None)
         conn.close()
 
 
+def _record_to_result(record: dict) -> dict:
+    """Apply TTL / stale-while-revalidate to a cache record; None if expired."""
+    result_status = record['result_status'] or POSITIVE
+    age = time.time() - record['looked_up_ts']
+    ttl = _ttl_for(result_status)
+    stale = age >= ttl
+    if stale and age >= ttl + config.TRUECALLER_STALE_WHILE_REVALIDATE_SECONDS:
+        return None
+
+    if result_status == NEGATIVE:
+        return {
+            'status': 'no_data',
+            'name': None,
+            'carrier': None,
+            'is_spam': False,
+            'spam_type': None,
+            'message': 'No record found on Truecaller.',
+            'looked_up_at': record['looked_up_at'],
+            'from_cache': True,
+            'stale': stale
+        }
+
+    return {
+        'status': 'cached',
+        'name': record['name'],
+        'carrier': record['carrier'],
+        'is_spam': bool(record['is_spam']),
+        'spam_type': record['spam_type'],
+        'looked_up_at': record['looked_up_at'],
+        'stale': stale
+    }
+
+
 def get_truecaller_cache(phone_number: str) -> dict:
-    """Get cached Truecaller result from database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """
+    Get cached Truecaller result (memory LRU first, then database).
+    Returns None if there is no row or it has expired. Within the
+    stale-while-revalidate window after expiry the row is still returned,
+    with 'stale': True, so the caller can refresh it in the background.
+    """
+    record = _memory_cache.get(phone_number)
+
+    if record is None:
+        conn = get_db_connection()
+        cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT name, carrier, is_spam, spam_type, looked_up_at
-        FROM truecaller_cache
-        WHERE phone_number = ?
-    """, (phone_number,))
+        cursor.execute("""
+            SELECT name, carrier, is_spam, spam_type, looked_up_at, result_status,
+                   (julianday(looked_up_at) - 2440587.5) * 86400.0 AS looked_up_ts
+            FROM truecaller_cache
+            WHERE phone_number = ?
+        """, (phone_number,))
 
-    row = cursor.fetchone()
-    conn.close()
+        row = cursor.fetchone()
+        conn.close()
 
-    if row:
-        return {
-            'status': 'cached',
-            'name': row[0],
-            'carrier': row[1],
-            'is_spam': bool(row[2]),
-            'spam_type': row[3],
-            'looked_up_at': row[4]
-        }
+        if not row:
+            return None
+
+        record = dict(zip(
+            ('name', 'carrier', 'is_spam', 'spam_type', 'looked_up_at', 'result_status', 'looked_up_ts'),
+            tuple(row)
+        ))
+        _memory_cache.set(phone_number, record)
+
+    return _record_to_result(record)
+
+
+def truecaller_memory_cache_stats() -> dict:
+    """Hit/miss counters of the in-process LRU (for sizing TRUECALLER_MEMORY_CACHE_SIZE)."""
+    return _memory_cache.stats()
+
+
+def purge_truecaller_cache() -> int:
+    """Delete rows past their TTL + stale window. Returns rows deleted."""
+    grace = config.TRUECALLER_STALE_WHILE_REVALIDATE_SECONDS
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        deleted = 0
+        for result_status, ttl in (
+            (POSITIVE, config.TRUECALLER_CACHE_TTL_SECONDS),
+            (NEGATIVE, config.TRUECALLER_NEGATIVE_TTL_SECONDS),
+        ):
+            cursor.execute("""
+                DELETE FROM truecaller_cache
+                WHERE looked_up_at < datetime('now', ?)
+                  AND COALESCE(result_status, ?) = ?
+            """, (f"-{int(ttl + grace)} seconds", POSITIVE, result_status))
+            deleted += cursor.rowcount
+        conn.commit()
+    finally:
+        conn.close()
 
-    return None
+    if deleted:
+        _memory_cache.clear()
+        logger.info(f"truecaller_cache: {deleted} rekod tamat tempoh dibuang.")
+    return deleted
 
 
 # Initialize table on import
@@ -0,0 +1,192 @@
+# truecaller_sessions.py
+"""
+Session pool + circuit breaker for live Truecaller lookups.
+
+Sessions come from TRUECALLER_SESSIONS_FILE:
+    {"sessions": [{"name": "acc1", "token": "<installation id>"}, ...]}
+
+Lookups are spread round-robin across healthy sessions, taking the better
+scored of the next two (failure-rate and latency EWMAs). A session that
+keeps failing is ejected with exponential backoff. When every session is
+ejected, or lookups keep failing, the circuit breaker opens and lookups
+return status 'cooldown' immediately instead of piling up timeouts.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+EWMA_ALPHA = 0.3
+# Failure weight vs latency (seconds) in the health score; lower is better
+FAILURE_SCORE_WEIGHT = 10.0
+
+
+class TruecallerSession:
+    def __init__(self, name: str, token: str):
+        self.name = name
+        self.token = token
+        self.failure_rate = 0.0       # EWMA of 0/1 outcomes
+        self.latency = 0.0            # EWMA seconds
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def score(self) -> float:
+        return self.failure_rate * FAILURE_SCORE_WEIGHT + self.latency
+
+    def snapshot(self) -> Dict:
+        return {
+            'name': self.name,
+            'failure_rate': round(self.failure_rate, 3),
+            'latency': round(self.latency, 3),
+            'consecutive_failures': self.consecutive_failures,
+            'ejected_for': max(0, int(self.ejected_until - time.monotonic())),
+        }
+
+
+class SessionPool:
+    def __init__(self, sessions: List[TruecallerSession]):
+        self._sessions = sessions
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str) -> "SessionPool":
+        sessions = []
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for i, item in enumerate(data.get('sessions', [])):
+                    token = item.get('token') or item.get('installation_id')
+                    if token:
+                        sessions.append(TruecallerSession(item.get('name') or f"session{i + 1}", token))
+            except (OSError, ValueError) as e:
+                logger.error(f"[TruecallerPool] Gagal baca {path}: {e}")
+        if sessions:
+            logger.info(f"[TruecallerPool] {len(sessions)} session dimuatkan.")
+        return cls(sessions)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def acquire(self, exclude: Optional[set] = None) -> Optional[TruecallerSession]:
+        """Next healthy session (round-robin, better of two by score), or None."""
+        now = time.monotonic()
+        with self._lock:
+            n = len(self._sessions)
+            candidates = []
+            for i in range(n):
+                session = self._sessions[(self._cursor + i) % n]
+                if session.is_available(now) and session not in (exclude or ()):
+                    candidates.append(session)
+                    if len(candidates) == 2:
+                        break
+            if not candidates:
+                return None
+            self._cursor = (self._sessions.index(candidates[0]) + 1) % n
+            return min(candidates, key=lambda s: s.score())
+
+    def report_success(self, session: TruecallerSession, latency: float):
+        with self._lock:
+            session.failure_rate = (1 - EWMA_ALPHA) * session.failure_rate
+            session.latency = (1 - EWMA_ALPHA) * session.latency + EWMA_ALPHA * latency
+            session.consecutive_failures = 0
+            session.ejections = 0
+
+    def report_failure(self, session: TruecallerSession, latency: float):
+        with self._lock:
+            session.failure_rate = (1 - EWMA_ALPHA) * session.failure_rate + EWMA_ALPHA
+            session.latency = (1 - EWMA_ALPHA) * session.latency + EWMA_ALPHA * latency
+            session.consecutive_failures += 1
+            if session.consecutive_failures >= config.TRUECALLER_SESSION_MAX_FAILS:
+                backoff = min(
+                    config.TRUECALLER_SESSION_BACKOFF_SECONDS * (2 ** session.ejections),
+                    config.TRUECALLER_SESSION_BACKOFF_MAX_SECONDS
+                )
+                session.ejections += 1
+                session.consecutive_failures = 0
+                session.ejected_until = time.monotonic() + backoff
+                logger.warning(f"[TruecallerPool] Session {session.name} dikeluarkan selama {backoff:.0f}s")
+
+    def next_available_in(self) -> float:
+        """Seconds until the first ejected session comes back (0 if one is available)."""
+        now = time.monotonic()
+        with self._lock:
+            if not self._sessions:
+                return 0.0
+            return max(0.0, min(s.ejected_until for s in self._sessions) - now)
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [s.snapshot() for s in self._sessions]
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failed lookups -> half-open (one trial) after cooldown."""
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self._threshold = failure_threshold
+        self._cooldown = cooldown_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self._cooldown:
+                return False
+            # Trial yang tergantung (cancelled) tak boleh kunci breaker selamanya
+            if self._trial_running and now - self._trial_started < self._cooldown:
+                return False
+            self._trial_running = True   # half-open: let one lookup through
+            self._trial_started = now
+            return True
+
+    def remaining(self) -> float:
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self._cooldown - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self._threshold:
+                if self._opened_at is None or self._trial_running:
+                    logger.warning("[TruecallerPool] Circuit breaker dibuka.")
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+    def trip(self, seconds: float):
+        """Open now for `seconds` (e.g. no session available)."""
+        with self._lock:
+            self._opened_at = time.monotonic() - self._cooldown + max(seconds, 1)
+            self._trial_running = False
+
+
+truecaller_pool = SessionPool.from_file(config.TRUECALLER_SESSIONS_FILE)
+truecaller_breaker = CircuitBreaker(
+    config.TRUECALLER_BREAKER_THRESHOLD, config.TRUECALLER_BREAKER_COOLDOWN_SECONDS
+)
@@ -0,0 +1,119 @@
+# upstream_quota.py
+"""
+Global token-bucket quota per upstream source (Truecaller, SemakMule).
+The per-user limit in rate_limit.py does not stop many different users
+from using up the upstream quota together; this caps the bot as a whole.
+
+Each bucket refills at <SOURCE>_QUOTA_PER_HOUR up to <SOURCE>_QUOTA_BURST
+tokens. The last QUOTA_ADMIN_RESERVE tokens can only be taken by admins,
+and admins skip the queue. Other callers wait in FIFO order for up to
+QUOTA_WAIT_SECONDS, and are refused straight away when no token can
+arrive within that time. A rate of 0 disables the bucket.
+
+Buckets live in this process (the bot runs a single event loop).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, name: str, rate_per_hour: float, burst: int, admin_reserve: int):
+        self.name = name
+        self.enabled = rate_per_hour > 0
+        self._rate = rate_per_hour / 3600.0         # tokens per second
+        self._burst = max(1, burst)
+        self._reserve = max(0, min(admin_reserve, self._burst - 1))
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+        self._queue: Optional[asyncio.Lock] = None
+
+        self.granted = 0
+        self.granted_after_wait = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def _try_take(self, threshold: float) -> bool:
+        self._refill(time.monotonic())
+        if self._tokens >= threshold:
+            self._tokens -= 1
+            return True
+        return False
+
+    def _time_until(self, threshold: float) -> float:
+        return max(0.0, (threshold - self._tokens) / self._rate)
+
+    async def acquire(self, priority: bool = False, timeout: float = 0.0) -> bool:
+        """
+        Take one token. priority=True (admins) may use the reserve and does
+        not queue behind others. Waits up to `timeout` seconds; False if
+        throttled.
+        """
+        if not self.enabled:
+            return True
+
+        threshold = 1 if priority else 1 + self._reserve
+        if self._queue is None:
+            self._queue = asyncio.Lock()
+
+        # Don't jump ahead of callers already waiting
+        if (priority or not self._queue.locked()) and self._try_take(threshold):
+            self.granted += 1
+            return True
+
+        started = time.monotonic()
+        deadline = started + timeout
+        if priority:
+            return await self._wait(threshold, started, deadline)
+        async with self._queue:
+            return await self._wait(threshold, started, deadline)
+
+    async def _wait(self, threshold: float, started: float, deadline: float) -> bool:
+        while True:
+            if self._try_take(threshold):
+                self.granted += 1
+                self.granted_after_wait += 1
+                self.wait_seconds += time.monotonic() - started
+                return True
+            wait = self._time_until(threshold)
+            if time.monotonic() + wait > deadline:
+                self.throttled += 1
+                logger.warning(f"[Quota] {self.name}: quota habis, permintaan ditolak.")
+                return False
+            await asyncio.sleep(wait)
+
+    def metrics(self) -> Dict:
+        if not self.enabled:
+            return {'enabled': False}
+        self._refill(time.monotonic())
+        requests = self.granted + self.throttled
+        return {
+            'tokens': round(self._tokens, 2),
+            'granted': self.granted,
+            'granted_after_wait': self.granted_after_wait,
+            'throttled': self.throttled,
+            'throttle_rate': round(self.throttled / requests, 3) if requests else 0.0,
+            'avg_wait': round(self.wait_seconds / self.granted_after_wait, 3) if self.granted_after_wait else 0.0,
+        }
+
+
+truecaller_quota = TokenBucket(
+    'truecaller', config.TRUECALLER_QUOTA_PER_HOUR, config.TRUECALLER_QUOTA_BURST, config.QUOTA_ADMIN_RESERVE
+)
+semakmule_quota = TokenBucket(
+    'semakmule', config.SEMAKMULE_QUOTA_PER_HOUR, config.SEMAKMULE_QUOTA_BURST, config.QUOTA_ADMIN_RESERVE
+)
+
+
+def quota_metrics() -> Dict[str, Dict]:
+    return {bucket.name: bucket.metrics() for bucket in (truecaller_quota, semakmule_quota)}